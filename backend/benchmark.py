@@ -0,0 +1,382 @@
+"""
+HTTP benchmark over every API route at a chosen dataset scale
+
+Builds a synthetic database of --contacts contacts with seed.py, then
+drives every route in main.py in-process with --clients concurrent clients,
+one route at a time, and reports throughput and p50/p95/p99 latency per
+route. Results are written as a JSON baseline; pass a previous
+baseline with --compare to see how each route moved.
+
+Write routes run after the reads, mostly against rows the run itself
+creates: contacts, campaigns, relationships and customer products are
+created, updated and deleted again. Imported contacts, new products,
+response updates and contacts merged away stay, so rebuild the database
+(the default) before runs that will be compared; --skip-build reuses the
+existing one.
+
+    python benchmark.py --contacts 100000 --output baselines/100k.json
+    python benchmark.py --contacts 100000 --skip-build --compare baselines/100k.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+DEFAULT_DATABASE = "benchmark.db"
+
+class Targets:
+    """Ids the route requests are built from: sampled from the data, or created during the run"""
+
+    def __init__(self, db, seed: int):
+        from sqlalchemy import func, select
+
+        from main import Campaign, CampaignContact, Contact, CustomerProduct, Product, Relationship
+
+        rng = random.Random(seed)
+
+        def sample(query, size=500):
+            values = db.execute(query).all()
+            return rng.sample(values, min(size, len(values)))
+
+        self.contacts = [id for id, in sample(select(Contact.id))]
+        self.people = [id for id, in sample(
+            select(Relationship.from_contact_id).group_by(Relationship.from_contact_id)
+        )]
+        self.organisations = [id for id, in sample(
+            select(Relationship.to_contact_id).group_by(Relationship.to_contact_id)
+        )]
+        self.surnames = sorted({name.split()[-1][:4] for name, in sample(select(Contact.full_name), 50)})
+        self.campaigns = [id for id, in sample(select(Campaign.id))]
+        self.products = [id for id, in sample(select(Product.id).where(Product.status == "active"))]
+        self.customers = [id for id, in sample(
+            select(CustomerProduct.contact_id).group_by(CustomerProduct.contact_id)
+        )]
+        self.enrollments = sample(select(CampaignContact.campaign_id, Contact.email).join(
+            Contact, Contact.id == CampaignContact.contact_id
+        ).where(Contact.email.is_not(None)), 5000)
+        self.total_contacts = db.scalar(select(func.count(Contact.id)))
+        self.created = {}
+
+        if not (self.contacts and self.people and self.campaigns and self.products and self.enrollments):
+            raise SystemExit("The database needs contacts, relationships, campaigns and products")
+
+    def pick(self, values, n):
+        return values[n % len(values)]
+
+    def created_id(self, kind, n):
+        return self.created[kind][n % len(self.created[kind])]
+
+def _segment_filter(t, n):
+    """Individuals linked to an organisation who hold a product and have not responded lately"""
+    return {"and": [
+        {"field": "contact_type", "op": "eq", "value": "individual"},
+        {"related": {"direction": "outgoing",
+                     "where": {"field": "id", "op": "eq", "value": t.pick(t.organisations, n)}}},
+        {"product": {"id": t.pick(t.products, n)}},
+        {"not": {"campaign": {"last": 2, "status": ["responded", "converted"]}}},
+    ]}
+
+def _contact(n, prefix="Benchmark"):
+    return {
+        "full_name": f"{prefix} Contact {n}",
+        "contact_type": "individual",
+        "email": f"{prefix.lower()}{n}@example.com",
+        "phone": f"07000 {n:06d}",
+    }
+
+# (method, route, request builder(targets, n) -> (path, request kwargs)) in
+# run order; creates come before the updates and deletes that use their ids
+ROUTES = [
+    ("GET", "/", lambda t, n: ("/", {})),
+    ("GET", "/api/contacts", lambda t, n: ("/api/contacts", {})),
+    ("GET", "/api/contacts/search", lambda t, n: (f"/api/contacts/search?q={t.pick(t.surnames, n)}", {})),
+    ("GET", "/api/contacts/{contact_id}", lambda t, n: (f"/api/contacts/{t.pick(t.contacts, n)}", {})),
+    ("GET", "/api/contacts/{contact_id}/relationships",
+     lambda t, n: (f"/api/contacts/{t.pick(t.people, n)}/relationships", {})),
+    ("GET", "/api/contacts/{contact_id}/connected",
+     lambda t, n: (f"/api/contacts/{t.pick(t.people, n)}/connected", {})),
+    ("GET", "/api/contacts/{contact_id}/network",
+     lambda t, n: (f"/api/contacts/{t.pick(t.people, n)}/network?depth=3", {})),
+    ("GET", "/api/contacts/{contact_id}/organisations",
+     lambda t, n: (f"/api/contacts/{t.pick(t.people, n)}/organisations", {})),
+    ("GET", "/api/contacts/{contact_id}/products",
+     lambda t, n: (f"/api/contacts/{t.pick(t.customers, n)}/products", {})),
+    ("GET", "/api/contacts/export/csv",
+     lambda t, n: (f"/api/contacts/export/csv?q={t.pick(t.surnames, n)}", {})),
+    ("GET", "/api/contacts/duplicates", lambda t, n: ("/api/contacts/duplicates", {})),
+    ("POST", "/api/segments/count",
+     lambda t, n: ("/api/segments/count", {"json": {"filter": _segment_filter(t, n)}})),
+    ("POST", "/api/segments/contacts",
+     lambda t, n: ("/api/segments/contacts", {"json": {"filter": _segment_filter(t, n)}})),
+    ("GET", "/api/stats", lambda t, n: ("/api/stats", {})),
+    ("GET", "/api/campaigns", lambda t, n: ("/api/campaigns", {})),
+    ("GET", "/api/campaigns/overview", lambda t, n: ("/api/campaigns/overview", {})),
+    ("GET", "/api/campaigns/{campaign_id}", lambda t, n: (f"/api/campaigns/{t.pick(t.campaigns, n)}", {})),
+    ("GET", "/api/campaigns/{campaign_id}/contacts",
+     lambda t, n: (f"/api/campaigns/{t.pick(t.campaigns, n)}/contacts", {})),
+    ("GET", "/api/campaigns/contacts/filter",
+     lambda t, n: (f"/api/campaigns/contacts/filter?campaign_ids={t.pick(t.campaigns, n)}&status=responded", {})),
+    ("GET", "/api/organisations", lambda t, n: ("/api/organisations", {})),
+    ("GET", "/api/organisations/{org_id}", lambda t, n: (f"/api/organisations/{t.pick(t.organisations, n)}", {})),
+    ("GET", "/api/products", lambda t, n: ("/api/products", {})),
+    ("GET", "/api/products/{product_id}", lambda t, n: (f"/api/products/{t.pick(t.products, n)}", {})),
+    ("GET", "/api/diagnostics/pool", lambda t, n: ("/api/diagnostics/pool", {})),
+    ("GET", "/api/diagnostics/cache", lambda t, n: ("/api/diagnostics/cache", {})),
+    ("GET", "/api/diagnostics/relationship-index", lambda t, n: ("/api/diagnostics/relationship-index", {})),
+    ("GET", "/api/diagnostics/sqlite", lambda t, n: ("/api/diagnostics/sqlite", {})),
+    ("GET", "/metrics", lambda t, n: ("/metrics", {})),
+
+    ("POST", "/api/contacts", lambda t, n: ("/api/contacts", {"json": _contact(n)})),
+    ("PUT", "/api/contacts/{contact_id}",
+     lambda t, n: (f"/api/contacts/{t.created_id('contacts', n)}", {"json": {**_contact(n), "notes": "Updated"}})),
+    ("POST", "/api/contacts/check-duplicates",
+     lambda t, n: ("/api/contacts/check-duplicates", {"json": _contact(n, "Checked")})),
+    ("POST", "/api/contacts/import",
+     lambda t, n: ("/api/contacts/import", {"json": [_contact(n * 100 + i, "Imported") for i in range(100)]})),
+    ("POST", "/api/relationships", lambda t, n: ("/api/relationships", {"json": {
+        "from_contact_id": t.created_id("contacts", n),
+        "to_contact_id": t.pick(t.organisations, n),
+        "relationship_type": "works_for",
+    }})),
+    ("DELETE", "/api/relationships/{relationship_id}",
+     lambda t, n: (f"/api/relationships/{t.created_id('relationships', n)}", {})),
+    ("POST", "/api/customer-products", lambda t, n: ("/api/customer-products", {"json": {
+        "contact_id": t.created_id("contacts", n),
+        "product_id": t.pick(t.products, n),
+        "start_date": "2025-01-01",
+    }})),
+    ("PUT", "/api/customer-products/{customer_product_id}",
+     lambda t, n: (f"/api/customer-products/{t.created_id('customer_products', n)}", {"json": {"status": "ended"}})),
+    ("DELETE", "/api/customer-products/{customer_product_id}",
+     lambda t, n: (f"/api/customer-products/{t.created_id('customer_products', n)}", {})),
+    ("POST", "/api/campaigns", lambda t, n: ("/api/campaigns", {"json": {
+        "name": f"Benchmark Campaign {n}", "channel": "email", "send_date": "2025-01-01", "status": "draft",
+    }})),
+    ("POST", "/api/campaigns/{campaign_id}/enroll",
+     lambda t, n: (f"/api/campaigns/{t.created_id('campaigns', n)}/enroll",
+                   {"json": {"organisation_id": t.pick(t.organisations, n)}})),
+    ("POST", "/api/campaign-contacts/bulk-responses", lambda t, n: ("/api/campaign-contacts/bulk-responses", {"json": {
+        "updates": [
+            {"campaign_id": campaign_id, "email": email, "response_status": "responded"}
+            for campaign_id, email in (t.pick(t.enrollments, n * 50 + i) for i in range(50))
+        ],
+    }})),
+    ("DELETE", "/api/campaigns/{campaign_id}",
+     lambda t, n: (f"/api/campaigns/{t.created_id('campaigns', n)}", {})),
+    ("POST", "/api/products", lambda t, n: ("/api/products", {"json": {
+        "name": f"Benchmark Product {n}", "product_type": "Advisory", "base_price": "100.00",
+    }})),
+    ("POST", "/api/segments", lambda t, n: ("/api/segments", {"json": {
+        "name": f"Benchmark Segment {n}", "filter": _segment_filter(t, n),
+    }})),
+    ("GET", "/api/segments", lambda t, n: ("/api/segments", {})),
+    ("GET", "/api/segments/{segment_id}", lambda t, n: (f"/api/segments/{t.created_id('segments', n)}", {})),
+    ("GET", "/api/segments/{segment_id}/contacts",
+     lambda t, n: (f"/api/segments/{t.created_id('segments', n)}/contacts", {})),
+    ("PUT", "/api/segments/{segment_id}", lambda t, n: (f"/api/segments/{t.created_id('segments', n)}", {"json": {
+        "name": f"Benchmark Segment {n}", "filter": _segment_filter(t, n + 1),
+    }})),
+    ("DELETE", "/api/segments/{segment_id}",
+     lambda t, n: (f"/api/segments/{t.created_id('segments', n)}", {})),
+    # Folds a sampled contact into each created one, so runs of more than
+    # 500 requests repeat merges of contacts that are already gone
+    ("POST", "/api/contacts/{contact_id}/merge",
+     lambda t, n: (f"/api/contacts/{t.created_id('contacts', n)}/merge", {"json": {
+         "duplicate_id": t.pick(t.contacts, n),
+     }})),
+    ("DELETE", "/api/contacts/{contact_id}",
+     lambda t, n: (f"/api/contacts/{t.created_id('contacts', n)}", {})),
+]
+
+# Routes whose response ids later requests use, and the Targets.created key they go under
+CREATES = {
+    ("POST", "/api/contacts"): "contacts",
+    ("POST", "/api/relationships"): "relationships",
+    ("POST", "/api/customer-products"): "customer_products",
+    ("POST", "/api/campaigns"): "campaigns",
+    ("POST", "/api/segments"): "segments",
+}
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    return samples[min(len(samples) - 1, max(0, int(round(len(samples) * pct / 100 + 0.5)) - 1))]
+
+def summarise(latencies, failures: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies) + failures,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+    if latencies:
+        summary.update({
+            f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) for pct in (50, 95, 99)
+        })
+        summary["mean_ms"] = round(sum(latencies) / len(latencies) * 1000, 2)
+    return summary
+
+async def run_route(client, targets, method, route, build_request, requests: int, clients: int):
+    """Send requests to one route from concurrent clients; returns its summary"""
+    pending = iter(range(requests))  # shared by every client task
+    latencies, failures, created = [], 0, []
+    capture = CREATES.get((method, route))
+
+    async def worker():
+        nonlocal failures
+        for n in pending:
+            path, kwargs = build_request(targets, n)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            if response.status_code >= 400:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if capture:
+                created.append(response.json()["id"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(clients)])
+    elapsed = time.perf_counter() - start
+
+    if capture:
+        targets.created[capture] = sorted(created)
+    return summarise(latencies, failures, elapsed)
+
+async def run_benchmark(app, targets, requests: int, clients: int, progress=None):
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # ASGITransport does not send lifespan events, so run startup (loading
+    # the relationship index) and shutdown here
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for method, route, build_request in ROUTES:
+            key = f"{method} {route}"
+            results[key] = await run_route(client, targets, method, route, build_request, requests, clients)
+            if progress:
+                progress(key, results[key])
+    return results
+
+def missing_routes(app):
+    """API routes in the app that ROUTES does not exercise"""
+    from fastapi.routing import APIRoute
+
+    covered = {(method, route) for method, route, _ in ROUTES}
+    return sorted(
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods if (method, route.path) not in covered
+    )
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_database(path: str, contacts: int, seed: int):
+    """Create a fresh database at path and fill it with the synthetic dataset"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    import sqlite_profile
+    from database import engine
+    from seed import seed_database
+    from synthetic_data import SyntheticDataset
+
+    def progress(table, rows):
+        print(f"\r  {table:18s} {rows:>10,d}", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    counts = seed_database(engine, SyntheticDataset(contacts, seed), progress=progress)
+    sqlite_profile.run_maintenance(engine, "TRUNCATE")
+    print(f"\r  built {sum(counts.values()):,d} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return counts
+
+def compare(results: dict, baseline: dict):
+    """Print each route's p50/p95/p99 and throughput change against a previous baseline"""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} from {baseline.get('created_at')}:")
+    for key, now in results.items():
+        before = baseline.get("routes", {}).get(key)
+        if not before or "p50_ms" not in now or "p50_ms" not in before:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if before.get(metric):
+                changes.append(f"{metric.split('_')[0]} {(now[metric] - before[metric]) / before[metric]:+6.1%}")
+        print(f"  {key:55s} " + "  ".join(changes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every API route against a synthetic dataset")
+    parser.add_argument("--contacts", type=int, default=10_000, help="contacts in the generated dataset")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the dataset and request targets")
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="SQLite file to build and benchmark")
+    parser.add_argument("--skip-build", action="store_true", help="benchmark the existing database as is")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--output", help="write the results as a JSON baseline to this file")
+    parser.add_argument("--compare", help="a previous JSON baseline to compare against")
+    args = parser.parse_args()
+
+    # main reads the database URL when it is imported
+    os.environ["CRM_DATABASE_URL"] = f"sqlite:///{args.database}"
+    os.environ.pop("CRM_ASYNC_DATABASE_URL", None)
+
+    rows = None
+    if not args.skip_build:
+        print(f"Building {args.database} with {args.contacts:,d} contacts (seed {args.seed})", file=sys.stderr)
+        rows = build_database(args.database, args.contacts, args.seed)
+
+    import main
+
+    for route in missing_routes(main.app):
+        print(f"  warning: {route} is not benchmarked; add it to ROUTES", file=sys.stderr)
+
+    with main.SessionLocal() as db:
+        targets = Targets(db, args.seed)
+
+    def progress(key, summary):
+        print(
+            f"  {key:55s} {summary['throughput_rps'] or 0:8.1f} req/s  p50 {summary.get('p50_ms', 0):8.2f}"
+            f"  p95 {summary.get('p95_ms', 0):8.2f}  p99 {summary.get('p99_ms', 0):8.2f} ms"
+            + (f"  {summary['failures']} failed" if summary["failures"] else "")
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(run_benchmark(main.app, targets, args.requests, args.clients, progress))
+    elapsed = time.perf_counter() - start
+    total = sum(r["requests"] - r["failures"] for r in results.values())
+    print(f"\n{total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s overall")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {"contacts": targets.total_contacts, "seed": args.seed, "rows": rows},
+        "settings": {"requests_per_route": args.requests, "clients": args.clients},
+        "total": {"requests": total, "seconds": round(elapsed, 2), "throughput_rps": round(total / elapsed, 1)},
+        "routes": results,
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
@@ -0,0 +1,177 @@
+"""
+Benchmark the async read path against the sync SessionLocal path
+
+Runs many concurrent clients in-process against the app, mixing a slow
+endpoint (/api/campaigns/contacts/filter) with a fast one
+(/api/contacts/{id}), and reports throughput and p50/p99 latency per route.
+The sync baseline serves the same two routes from sync def handlers on
+SessionLocal, the way every endpoint worked before the async engine, so
+slow requests compete with fast ones for the request threadpool. At high
+concurrency that threadpool can fill with handlers waiting on the
+connection pool, so requests that exceed --timeout are counted as failed.
+
+Run against a seeded crm.db with:
+    python benchmark_async.py --clients 200 --requests 4000
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from main import (
+    Campaign, CampaignContact, Contact, ContactResponse, Relationship, SessionLocal,
+    app, get_db, relationship_summary
+)
+
+FAST_ROUTE = "/api/contacts/{contact_id}"
+SLOW_ROUTE = "/api/campaigns/contacts/filter"
+
+def sync_app():
+    """The benchmarked routes as sync endpoints on SessionLocal"""
+    sync = FastAPI()
+
+    @sync.get(FAST_ROUTE, response_model=ContactResponse)
+    def get_contact(contact_id: int, db: Session = Depends(get_db)):
+        contact = db.get(Contact, contact_id)
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        return contact
+
+    @sync.get(SLOW_ROUTE)
+    def get_filtered_campaign_contacts(
+        campaign_ids: Optional[str] = None,
+        status: Optional[str] = None,
+        db: Session = Depends(get_db)
+    ):
+        criteria = []
+        if campaign_ids:
+            criteria.append(CampaignContact.campaign_id.in_(
+                [int(id.strip()) for id in campaign_ids.split(",") if id.strip()]
+            ))
+        if status:
+            criteria.append(CampaignContact.response_status == status)
+
+        rows = db.execute(
+            select(CampaignContact, Contact, Campaign.name).join(
+                Contact, Contact.id == CampaignContact.contact_id
+            ).outerjoin(
+                Campaign, Campaign.id == CampaignContact.campaign_id
+            ).where(*criteria).order_by(CampaignContact.id)
+        ).all()
+
+        relationships = defaultdict(list)
+        for rel, org in db.execute(
+            select(Relationship, Contact).join(
+                Contact, Contact.id == Relationship.to_contact_id
+            ).where(
+                Relationship.from_contact_id.in_(select(CampaignContact.contact_id).where(*criteria))
+            ).order_by(Relationship.id)
+        ):
+            relationships[rel.from_contact_id].append((rel, org))
+
+        return [
+            {
+                "id": contact.id,
+                "full_name": contact.full_name,
+                "contact_type": contact.contact_type,
+                "email": contact.email,
+                "phone": contact.phone,
+                "campaign_name": campaign_name,
+                "response_status": cc.response_status,
+                "response_date": cc.response_date,
+                "relationships": relationship_summary(relationships.get(contact.id, []))
+            }
+            for cc, contact, campaign_name in rows
+        ]
+
+    return sync
+
+def build_workload(total: int, slow_share: float, seed: int):
+    """(route, path) pairs, slow_share of them to the filter endpoint"""
+    with SessionLocal() as db:
+        contact_ids = db.scalars(select(Contact.id).order_by(Contact.id).limit(10000)).all()
+        campaign_ids = db.scalars(select(Campaign.id).order_by(Campaign.id)).all()
+
+    if not contact_ids or not campaign_ids:
+        raise SystemExit("Seed the database before benchmarking")
+
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(total):
+        if rng.random() < slow_share:
+            campaign_id = rng.choice(campaign_ids)
+            workload.append((SLOW_ROUTE, f"{SLOW_ROUTE}?campaign_ids={campaign_id}"))
+        else:
+            workload.append((FAST_ROUTE, f"/api/contacts/{rng.choice(contact_ids)}"))
+    return workload
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run(target, workload, clients: int, timeout: float):
+    """
+    Replay the workload with this many concurrent clients.
+
+    Returns (seconds, {route: latencies}, {route: failed requests}); server
+    errors and requests slower than timeout count as failures, not latencies.
+    """
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    pending = iter(workload)  # shared by every client task
+
+    transport = httpx.ASGITransport(app=target, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def worker():
+            for route, path in pending:
+                start = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(client.get(path), timeout)
+                except asyncio.TimeoutError:
+                    failures[route] += 1
+                    continue
+                if response.status_code >= 500:
+                    failures[route] += 1
+                else:
+                    latencies[route].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies, failures
+
+def report(name: str, elapsed: float, latencies, failures):
+    total = sum(len(samples) for samples in latencies.values())
+    everything = [s for samples in latencies.values() for s in samples]
+    print(
+        f"{name}: {total} requests in {elapsed:.2f}s, {total / elapsed:.1f} req/s, "
+        f"{sum(failures.values())} failed"
+    )
+    for route, samples in [("all", everything)] + sorted(latencies.items()):
+        if samples:
+            print(
+                f"  {route:35s} {len(samples):6d}  p50 {percentile(samples, 50) * 1000:8.1f} ms"
+                f"  p99 {percentile(samples, 99) * 1000:8.1f} ms"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sync and async endpoint throughput")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=4000, help="total requests per run")
+    parser.add_argument("--slow-share", type=float, default=0.1, help="fraction of requests to the filter endpoint")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the workload")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a request counts as failed")
+    args = parser.parse_args()
+
+    workload = build_workload(args.requests, args.slow_share, args.seed)
+
+    for name, target in [("sync", sync_app()), ("async", app)]:
+        report(name, *asyncio.run(run(target, workload, args.clients, args.timeout)))
@@ -0,0 +1,181 @@
+"""
+Incrementally maintained campaign statistics
+
+The campaign_stats table holds one row per campaign and response status
+with the number of campaign contacts in that state and their latest
+response date. Triggers on campaign_contacts keep it current inside the
+same transaction as every insert, status change and delete, including
+set-based bulk statements, so campaign dashboards never rescan
+campaign_contacts.
+
+Check or rebuild the table for an existing database with:
+    python campaign_summary.py --verify
+    python campaign_summary.py --rebuild
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+SUMMARY_TABLE = "campaign_stats"
+
+# NULL statuses are counted under '' so they still form a key
+_NEW_KEY = "new.campaign_id, coalesce(new.response_status, '')"
+_OLD_MATCH = "campaign_id = old.campaign_id AND response_status = coalesce(old.response_status, '')"
+
+_INCREMENT = f"""
+    INSERT INTO {SUMMARY_TABLE} (campaign_id, response_status, contact_count, last_response_date)
+    VALUES ({_NEW_KEY}, 1, new.response_date)
+    ON CONFLICT (campaign_id, response_status) DO UPDATE SET
+        contact_count = contact_count + 1,
+        last_response_date = CASE
+            WHEN excluded.last_response_date > coalesce(last_response_date, '')
+            THEN excluded.last_response_date
+            ELSE last_response_date
+        END;
+"""
+
+# Latest response date for one (campaign, status) key. Status is compared
+# directly rather than through coalesce() so max() is a single seek on
+# ix_campaign_contacts_campaign_status_date; the '' key also collects NULLs.
+LATEST_RESPONSE_SQL = """
+    SELECT max(response_date) FROM (
+        SELECT max(response_date) AS response_date FROM campaign_contacts
+        WHERE campaign_id = {campaign_id} AND response_status = {status}
+        UNION ALL
+        SELECT max(response_date) FROM campaign_contacts
+        WHERE campaign_id = {campaign_id} AND response_status IS NULL AND {status} = ''
+    )
+"""
+
+# Only rescan for the latest date when the removed row held it
+_DECREMENT = f"""
+    UPDATE {SUMMARY_TABLE} SET
+        contact_count = contact_count - 1,
+        last_response_date = CASE
+            WHEN old.response_date IS NOT NULL AND old.response_date = last_response_date
+            THEN ({LATEST_RESPONSE_SQL.format(campaign_id="old.campaign_id", status="coalesce(old.response_status, '')")})
+            ELSE last_response_date
+        END
+    WHERE {_OLD_MATCH};
+    DELETE FROM {SUMMARY_TABLE} WHERE {_OLD_MATCH} AND contact_count <= 0;
+"""
+
+TRIGGERS = {
+    f"{SUMMARY_TABLE}_ai": f"""
+    CREATE TRIGGER {SUMMARY_TABLE}_ai AFTER INSERT ON campaign_contacts BEGIN
+        {_INCREMENT}
+    END
+    """,
+    f"{SUMMARY_TABLE}_ad": f"""
+    CREATE TRIGGER {SUMMARY_TABLE}_ad AFTER DELETE ON campaign_contacts BEGIN
+        {_DECREMENT}
+    END
+    """,
+    f"{SUMMARY_TABLE}_au": f"""
+    CREATE TRIGGER {SUMMARY_TABLE}_au
+    AFTER UPDATE OF campaign_id, response_status, response_date ON campaign_contacts BEGIN
+        {_DECREMENT}
+        {_INCREMENT}
+    END
+    """,
+}
+
+# Source of truth the summary must agree with
+RECOMPUTE_SQL = """
+SELECT campaign_id, coalesce(response_status, '') AS response_status,
+       count(*) AS contact_count, max(response_date) AS last_response_date
+FROM campaign_contacts
+GROUP BY campaign_id, coalesce(response_status, '')
+"""
+
+def _trigger_sql(conn, name):
+    return conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": name}
+    ).scalar()
+
+def ensure_campaign_summary(engine):
+    """
+    Install the maintenance triggers, replacing any from an older version.
+
+    The campaign_stats table itself is created with the other models. When
+    the triggers are new the table is rebuilt, bringing existing databases
+    up to date; replaced triggers kept the table current, so it is left as
+    it is. Returns False for non-SQLite databases, in which case
+    callers should aggregate campaign_contacts directly.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        with engine.begin() as conn:
+            installed = _trigger_sql(conn, f"{SUMMARY_TABLE}_ai") is not None
+            for name, trigger in TRIGGERS.items():
+                current = _trigger_sql(conn, name)
+                if current == trigger.strip():
+                    continue
+                if current is not None:
+                    conn.execute(text(f"DROP TRIGGER {name}"))
+                conn.execute(text(trigger))
+            if not installed:
+                rebuild_campaign_summary(conn)
+    except OperationalError:
+        return False
+
+    return True
+
+def rebuild_campaign_summary(conn):
+    """Recompute every campaign_stats row from campaign_contacts"""
+    conn.execute(text(f"DELETE FROM {SUMMARY_TABLE}"))
+    conn.execute(text(
+        f"INSERT INTO {SUMMARY_TABLE} (campaign_id, response_status, contact_count, last_response_date) "
+        + RECOMPUTE_SQL
+    ))
+
+def verify_campaign_summary(conn):
+    """
+    Compare campaign_stats with a fresh aggregate of campaign_contacts.
+
+    Returns a list of (campaign_id, response_status, stored, actual) tuples
+    for every row that differs, where stored and actual are
+    (contact_count, last_response_date) or None when the row is missing.
+    """
+    def rows(sql):
+        return {
+            (r.campaign_id, r.response_status): (r.contact_count, r.last_response_date)
+            for r in conn.execute(text(sql))
+        }
+
+    stored = rows(f"SELECT campaign_id, response_status, contact_count, last_response_date FROM {SUMMARY_TABLE}")
+    actual = rows(RECOMPUTE_SQL)
+
+    return [
+        (key[0], key[1], stored.get(key), actual.get(key))
+        for key in sorted(set(stored) | set(actual), key=lambda k: (k[0] or 0, k[1]))
+        if stored.get(key) != actual.get(key)
+    ]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the campaign_stats summary table")
+    parser.add_argument("--verify", action="store_true", help="report rows that differ from campaign_contacts")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the table from campaign_contacts")
+    args = parser.parse_args()
+
+    # Not from main, which creates the tables and applies migrations as it is imported
+    from database import engine
+
+    if not ensure_campaign_summary(engine):
+        raise SystemExit("campaign_stats triggers are only supported on SQLite")
+
+    with engine.begin() as conn:
+        if args.rebuild:
+            rebuild_campaign_summary(conn)
+            print("Rebuilt campaign_stats")
+
+        mismatches = verify_campaign_summary(conn)
+        for campaign_id, status, stored, actual in mismatches:
+            print(f"campaign {campaign_id} status '{status}': stored {stored}, actual {actual}")
+        print(f"{len(mismatches)} mismatched rows")
+
+    if mismatches:
+        raise SystemExit(1)
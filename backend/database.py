@@ -0,0 +1,191 @@
+"""
+Database engines, sessions and connection pool metrics
+
+The database URL and pool settings come from environment variables, so the
+app can run on the local SQLite file or on a server database (for example
+PostgreSQL in a local container) without code changes:
+
+    CRM_DATABASE_URL        sync URL (default sqlite:///./crm.db)
+    CRM_ASYNC_DATABASE_URL  async URL (default derived from CRM_DATABASE_URL)
+    CRM_DB_POOL_SIZE        connections kept open per engine (default 20)
+    CRM_DB_MAX_OVERFLOW     extra connections allowed under load (default 20)
+    CRM_DB_POOL_TIMEOUT     seconds to wait for a free connection (default 30)
+    CRM_DB_POOL_RECYCLE     replace connections older than this many seconds (default 1800, -1 never)
+    CRM_DB_POOL_PRE_PING    test each connection on checkout (default false)
+
+Both engines use pools that time every checkout, so pool_metrics() can
+report how long requests wait for a connection and how close each pool is
+to saturation.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import sqlite_profile
+
+DEFAULT_DATABASE_URL = "sqlite:///./crm.db"
+
+# Async drivers used when CRM_ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+# Upper bounds, in seconds, of the checkout wait histogram buckets
+WAIT_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0]
+
+def database_urls(environ=os.environ):
+    """(sync URL, async URL) from the environment"""
+    url = make_url(environ.get("CRM_DATABASE_URL", DEFAULT_DATABASE_URL))
+
+    async_url = environ.get("CRM_ASYNC_DATABASE_URL")
+    if async_url:
+        return url, make_url(async_url)
+
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}; set CRM_ASYNC_DATABASE_URL")
+    return url, url.set(drivername=ASYNC_DRIVERS[backend])
+
+def pool_settings(environ=os.environ):
+    """Connection pool parameters from the environment"""
+    return {
+        "pool_size": int(environ.get("CRM_DB_POOL_SIZE", 20)),
+        "max_overflow": int(environ.get("CRM_DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(environ.get("CRM_DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(environ.get("CRM_DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": environ.get("CRM_DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes"),
+    }
+
+class PoolStats:
+    """Checkout wait times and peak usage for one pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)  # last one is +Inf
+        self.peak_checked_out = 0
+
+    def record(self, wait: float, checked_out: int, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if wait <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+class _TimedCheckout:
+    """Pool mixin recording how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, self.checkedout(), timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start, self.checkedout())
+        return connection
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _engine_options(url, pool_class, settings):
+    options = {}
+    if url.get_backend_name() == "sqlite" and not url.get_driver_name().startswith("aiosqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    # In-memory SQLite keeps SQLAlchemy's single-connection pool
+    if not _is_sqlite_memory(url):
+        options.update(settings, poolclass=pool_class)
+    return options
+
+DATABASE_URL, ASYNC_DATABASE_URL = database_urls()
+POOL_SETTINGS = pool_settings()
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, TimedQueuePool, POOL_SETTINGS))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Read endpoints use an async engine on the same database so slow queries
+# wait on the driver instead of the request threadpool
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, TimedAsyncQueuePool, POOL_SETTINGS)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# WAL, cache, mmap and busy-timeout pragmas on every SQLite connection
+SQLITE_PROFILE = sqlite_profile.load_profile()
+SQLITE_MAINTENANCE_INTERVAL = sqlite_profile.maintenance_interval()
+SQLITE_PROFILE_ENABLED = sqlite_profile.install_profile(engine, SQLITE_PROFILE)
+sqlite_profile.install_profile(async_engine.sync_engine, SQLITE_PROFILE)
+
+def _pool_snapshot(pool):
+    snapshot = {"pool_class": type(pool).__name__}
+    stats = getattr(pool, "stats", None)
+    if stats is None:
+        return snapshot
+
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    with stats.lock:
+        attempts = stats.checkouts + stats.timeouts
+        snapshot.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+            "peak_checked_out": stats.peak_checked_out,
+            "peak_saturation": round(stats.peak_checked_out / capacity, 3) if capacity else None,
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "wait_seconds_avg": round(stats.wait_seconds_total / attempts, 6) if attempts else 0.0,
+            "wait_seconds_max": round(stats.wait_seconds_max, 6),
+            "wait_seconds_buckets": dict(zip([str(b) for b in WAIT_BUCKETS] + ["+Inf"], stats.wait_buckets)),
+        })
+    return snapshot
+
+def pool_metrics():
+    """Checkout wait and saturation figures for the sync and async pools"""
+    return {
+        "sync": _pool_snapshot(engine.pool),
+        "async": _pool_snapshot(async_engine.pool),
+    }
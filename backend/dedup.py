@@ -0,0 +1,304 @@
+"""
+Duplicate contact detection
+
+Contacts are never compared all against all. Each contact is put into
+blocks keyed by its normalised email, phone key, name tokens and company
+tokens, and only contacts sharing a block are scored against each other.
+Blocks bigger than max_block_size (a common name like "John Smith" on a
+large database) are skipped: they cost quadratic comparisons and say little
+on their own, and true duplicates in them still share an email or phone.
+
+A pair's score adds up the evidence: the same email is worth 0.45 (the
+same personal mailbox name at another provider 0.25, the same company
+domain 0.15), the same phone 0.3, name similarity up to 0.35 and the same
+company 0.1, and a pair of different contact types scores half. Name
+similarity only counts above NAME_SIMILARITY_FLOOR, so two people who
+merely share a surname ("John Smith", "Mary Smith") add almost nothing. So
+a matching name plus any email or phone evidence clears DEFAULT_THRESHOLD,
+while a shared household email or phone, or a common name alone, does not.
+
+find_duplicates() scans the whole contacts table; candidate_query() and
+score_pair() back the single-contact check made before an insert, which
+only touches the email key, phone key and name indexes. The email key
+drops case and any +tag, and the phone key strips separators and turns
++44/0044 into a leading 0; EMAIL_KEY_SQL and PHONE_KEY_SQL compute the same
+things in SQL for the ix_contacts_email_key and ix_contacts_phone_key
+expression indexes.
+
+    python dedup.py                        # list likely duplicates
+    python dedup.py --threshold 0.8 --limit 50
+"""
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import NamedTuple, Optional
+
+from sqlalchemy import column, select, table, text, union
+
+DEFAULT_THRESHOLD = 0.6
+MAX_BLOCK_SIZE = 20
+# Contacts fetched per IN (...) when scoring candidate pairs
+SCORE_BATCH_SIZE = 500
+# Rows the pre-insert check scores at most
+CANDIDATE_LIMIT = 50
+
+# Name similarity at or below this is no evidence; above it the name weight
+# scales up to the full amount for identical names
+NAME_SIMILARITY_FLOOR = 0.5
+
+WEIGHTS = {
+    "email": 0.45, "email_name": 0.25, "email_domain": 0.15,
+    "phone": 0.3, "name": 0.35, "company": 0.1,
+}
+
+# Shared by unrelated people, so the same domain is no evidence
+WEBMAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.uk", "hotmail.com", "hotmail.co.uk",
+    "outlook.com", "live.com", "live.co.uk", "msn.com", "icloud.com", "me.com", "aol.com",
+    "btinternet.com", "sky.com", "virginmedia.com", "talktalk.net", "protonmail.com",
+}
+
+# Role mailboxes that every organisation has
+GENERIC_MAILBOXES = {
+    "info", "office", "admin", "hello", "contact", "enquiries", "sales", "accounts", "mail", "team",
+}
+
+# Words that do not tell two names apart
+NAME_STOPWORDS = {
+    "mr", "mrs", "ms", "miss", "dr", "prof", "sir", "the", "and", "of", "late", "estate",
+    "ltd", "limited", "plc", "llp", "llc", "inc", "co", "company", "group", "uk",
+}
+
+PHONE_SEPARATORS = [" ", "-", "(", ")", "."]
+
+def _strip_separators_sql(value: str) -> str:
+    for separator in PHONE_SEPARATORS:
+        value = f"replace({value}, '{separator}', '')"
+    return value
+
+_stripped = _strip_separators_sql("phone")
+PHONE_KEY_SQL = (
+    f"CASE WHEN {_stripped} LIKE '+44%' THEN '0' || substr({_stripped}, 4) "
+    f"WHEN {_stripped} LIKE '0044%' THEN '0' || substr({_stripped}, 5) "
+    f"ELSE {_stripped} END"
+)
+
+# As email_key(): trimmed, lower-cased, without a +tag, split at the first @
+_email = "lower(trim(email, char(9, 10, 11, 12, 13, 32)))"
+_at = f"instr({_email}, '@')"
+_plus = f"instr(substr({_email}, 1, {_at} - 1), '+')"
+EMAIL_KEY_SQL = (
+    f"CASE WHEN {_at} = 0 THEN NULL "
+    f"WHEN {_plus} > 0 THEN substr({_email}, 1, {_plus} - 1) || substr({_email}, {_at}) "
+    f"ELSE {_email} END"
+)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+contacts = table(
+    "contacts",
+    column("id"), column("full_name"), column("contact_type"),
+    column("email"), column("phone"), column("company_name"),
+)
+
+class ContactKeys(NamedTuple):
+    id: Optional[int]
+    contact_type: str
+    name: tuple
+    email: Optional[str]
+    phone: Optional[str]
+    company: tuple
+
+def email_key(email: Optional[str]) -> Optional[str]:
+    """Lower-cased email without a +tag (as EMAIL_KEY_SQL)"""
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().partition("@")
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """Phone number without separators, +44/0044 as a leading 0 (as PHONE_KEY_SQL)"""
+    if not phone:
+        return None
+    for separator in PHONE_SEPARATORS:
+        phone = phone.replace(separator, "")
+    if phone.startswith("+44"):
+        phone = "0" + phone[3:]
+    elif phone.startswith("0044"):
+        phone = "0" + phone[4:]
+    return phone or None
+
+def name_tokens(name: Optional[str]) -> tuple:
+    """Sorted distinct lower-case words of a name, without titles and suffixes"""
+    if not name:
+        return ()
+    return tuple(sorted({w for w in _WORD_RE.findall(name.lower()) if w not in NAME_STOPWORDS}))
+
+def contact_keys(row) -> ContactKeys:
+    """Normalised keys of a mapping or row with the contacts columns"""
+    return ContactKeys(
+        id=row.get("id"),
+        contact_type=row.get("contact_type"),
+        name=name_tokens(row.get("full_name")),
+        email=email_key(row.get("email")),
+        phone=phone_key(row.get("phone")),
+        company=name_tokens(row.get("company_name")),
+    )
+
+def name_similarity(a: tuple, b: tuple) -> float:
+    """The better of token overlap and character similarity, 0 to 1"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    overlap = len(set(a) & set(b)) / len(set(a) | set(b))
+    return max(overlap, SequenceMatcher(None, " ".join(a), " ".join(b)).ratio())
+
+def score_pair(a: ContactKeys, b: ContactKeys):
+    """(score from 0 to 1, [reasons]) for two contacts"""
+    score, reasons = 0.0, []
+    if a.email and b.email:
+        local_a, _, domain_a = a.email.partition("@")
+        local_b, _, domain_b = b.email.partition("@")
+        if a.email == b.email:
+            score += WEIGHTS["email"]
+            reasons.append("email")
+        elif local_a == local_b and local_a not in GENERIC_MAILBOXES:
+            score += WEIGHTS["email_name"]
+            reasons.append("email_name")
+        elif domain_a == domain_b and domain_a not in WEBMAIL_DOMAINS:
+            score += WEIGHTS["email_domain"]
+            reasons.append("email_domain")
+    if a.phone and a.phone == b.phone:
+        score += WEIGHTS["phone"]
+        reasons.append("phone")
+    similarity = name_similarity(a.name, b.name)
+    score += WEIGHTS["name"] * max(0.0, similarity - NAME_SIMILARITY_FLOOR) / (1 - NAME_SIMILARITY_FLOOR)
+    if similarity >= 0.8:
+        reasons.append("name")
+    if a.company and a.company == b.company:
+        score += WEIGHTS["company"]
+        reasons.append("company")
+    if a.contact_type != b.contact_type:
+        score /= 2
+    return round(min(score, 1.0), 3), reasons
+
+# Blocking passes: (name, columns read, key function)
+BLOCKINGS = [
+    ("email", [contacts.c.email], lambda row: email_key(row.email)),
+    ("phone", [contacts.c.phone], lambda row: phone_key(row.phone)),
+    ("name", [contacts.c.full_name], lambda row: " ".join(name_tokens(row.full_name)) or None),
+    ("company", [contacts.c.company_name], lambda row: " ".join(name_tokens(row.company_name)) or None),
+]
+
+def candidate_pairs(conn, max_block_size: int = MAX_BLOCK_SIZE):
+    """
+    ({(lower id, higher id)}, {blocking: skipped block count}) from one
+    streaming pass over contacts per blocking key.
+
+    Only the first id of each key is remembered until a second contact
+    shares it, so memory stays at one dict entry per distinct key.
+    """
+    pairs = set()
+    skipped = {}
+    for blocking, columns, key_of in BLOCKINGS:
+        first, blocks = {}, {}
+        for row in conn.execute(select(contacts.c.id, *columns)):
+            key = key_of(row)
+            if key is None:
+                continue
+            seen = first.setdefault(key, row.id)
+            if seen != row.id:
+                blocks.setdefault(key, [seen]).append(row.id)
+
+        skipped[blocking] = 0
+        for ids in blocks.values():
+            if len(ids) > max_block_size:
+                skipped[blocking] += 1
+                continue
+            pairs.update(combinations(sorted(ids), 2))
+    return pairs, skipped
+
+def find_duplicates(conn, threshold: float = DEFAULT_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE):
+    """
+    Score every candidate pair in the contacts table.
+
+    Returns {"pairs": [{"contact_id", "duplicate_id", "score", "reasons"}],
+    "candidates": pairs scored, "skipped_blocks": {blocking: count}} with
+    pairs at or above threshold, best first; contact_id is the older
+    (lower id) contact of each pair.
+    """
+    pairs, skipped = candidate_pairs(conn, max_block_size)
+
+    ids = sorted({contact_id for pair in pairs for contact_id in pair})
+    keys = {}
+    for start in range(0, len(ids), SCORE_BATCH_SIZE):
+        rows = conn.execute(select(contacts).where(contacts.c.id.in_(ids[start:start + SCORE_BATCH_SIZE])))
+        for row in rows.mappings():
+            keys[row["id"]] = contact_keys(row)
+
+    results = []
+    for a, b in pairs:
+        score, reasons = score_pair(keys[a], keys[b])
+        if score >= threshold:
+            results.append({"contact_id": a, "duplicate_id": b, "score": score, "reasons": reasons})
+    results.sort(key=lambda pair: (-pair["score"], pair["contact_id"], pair["duplicate_id"]))
+    return {"pairs": results, "candidates": len(pairs), "skipped_blocks": skipped}
+
+def candidate_query(contact: dict):
+    """
+    select() of existing contacts sharing an email key, phone key or exact
+    name with a contact about to be created, or None if it has none of them.
+    Each key is looked up from its own index with its own limit, so contacts
+    that only share a common name cannot crowd out an email or phone match.
+    """
+    conditions = []
+    key = email_key(contact.get("email"))
+    if key:
+        conditions.append(text(f"{EMAIL_KEY_SQL} = :email_key").bindparams(email_key=key))
+    key = phone_key(contact.get("phone"))
+    if key:
+        conditions.append(text(f"{PHONE_KEY_SQL} = :phone_key").bindparams(phone_key=key))
+    if contact.get("full_name"):
+        conditions.append(contacts.c.full_name == contact["full_name"].strip())
+    if not conditions:
+        return None
+    lookups = [
+        select(contacts).where(condition).order_by(contacts.c.id).limit(CANDIDATE_LIMIT).subquery()
+        for condition in conditions
+    ]
+    return union(*[select(lookup) for lookup in lookups])
+
+def match_candidates(contact: dict, rows, threshold: float = DEFAULT_THRESHOLD):
+    """[{"id", "full_name", "score", "reasons"}] of rows likely to be contact, best first"""
+    new = contact_keys(contact)
+    matches = []
+    for row in rows:
+        score, reasons = score_pair(new, contact_keys(row))
+        if score >= threshold:
+            matches.append({"id": row["id"], "full_name": row["full_name"], "score": score, "reasons": reasons})
+    matches.sort(key=lambda match: (-match["score"], match["id"]))
+    return matches
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="List likely duplicate contacts")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"minimum score (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--max-block-size", type=int, default=MAX_BLOCK_SIZE,
+                        help=f"skip blocks with more contacts than this (default {MAX_BLOCK_SIZE})")
+    parser.add_argument("--limit", type=int, default=100, help="pairs to print (default 100)")
+    args = parser.parse_args()
+
+    # Not from main, which creates the tables and applies migrations as it is imported
+    from database import engine
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        result = find_duplicates(conn, args.threshold, args.max_block_size)
+    for pair in result["pairs"][:args.limit]:
+        print(f"{pair['score']:.3f}  {pair['contact_id']:>8d}  {pair['duplicate_id']:>8d}  {','.join(pair['reasons'])}")
+    print(f"{len(result['pairs']):,d} likely duplicates from {result['candidates']:,d} candidate pairs "
+          f"in {time.perf_counter() - start:.1f}s; skipped blocks: {result['skipped_blocks']}")
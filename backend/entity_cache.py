@@ -0,0 +1,122 @@
+"""
+Bounded in-process cache of rows by primary key
+
+Entries are plain {column: value} snapshots keyed by (table, id), so cached
+rows are never shared ORM instances. The least recently used entry is
+evicted once the cache is full, and entries older than the TTL are
+reloaded. Write endpoints update or invalidate entries as they commit.
+
+Changes made outside the API are caught through the table versions behind
+the ETags: pass each version read to sync_version(), and a table's entries
+stop being served once its version moves on, so a response never pairs a
+new ETag with a row cached before the write. Until a version is read, the
+TTL bounds how long such a change can go unseen.
+
+Loads that race with a write are dropped instead of cached: take a token
+with load_token() before querying and pass it to put_loaded().
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class EntityCache:
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (table, id) -> (expires_at, table version, row)
+        self._versions = {}  # table -> version last passed to sync_version()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, table: str, entity_id):
+        """The cached row, or None on a miss"""
+        key = (table, entity_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, version, row = entry
+            if version != self._versions.get(table):
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def sync_version(self, table: str, version):
+        """
+        Note the current version of a table; when it differs from the last one
+        seen, the table's cached rows are stale and loads in flight are dropped.
+        """
+        with self._lock:
+            if self._versions.get(table) != version:
+                self._versions[table] = version
+                self._writes += 1
+
+    def load_token(self) -> int:
+        """Marker for put_loaded(); taken before reading the row from the database"""
+        with self._lock:
+            return self._writes
+
+    def put_loaded(self, table: str, entity_id, row: dict, token: int):
+        """Cache a row read from the database unless a write has happened since token"""
+        with self._lock:
+            if token == self._writes:
+                self._store((table, entity_id), row)
+
+    def put(self, table: str, entity_id, row: dict):
+        """Write-through: cache the committed state of a created or updated row"""
+        with self._lock:
+            self._writes += 1
+            self._store((table, entity_id), row)
+
+    def invalidate(self, table: str, entity_id):
+        """Drop a deleted or externally changed row"""
+        with self._lock:
+            self._writes += 1
+            if self._entries.pop((table, entity_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def _store(self, key, row):
+        self._entries[key] = (time.monotonic() + self.ttl, self._versions.get(key[0]), row)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
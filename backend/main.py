@@ -1,96 +1,62 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from pydantic import BaseModel, EmailStr
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert, literal, exists, text, func, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, load_only
+from sqlalchemy.sql import Select
+from pydantic import BaseModel, EmailStr, ValidationError
+import asyncio
+import base64
+import codecs
+import csv
+import io
+import json
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime
+from email.utils import formatdate
+from io import StringIO
 from typing import List, Optional
 
-# Database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./crm.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# Database Models
-class Contact(Base):
-    __tablename__ = "contacts"
-
-    id = Column(Integer, primary_key=True, index=True)
-    full_name = Column(String, index=True)
-    contact_type = Column(String)  # individual, business, estate
-    email = Column(String, nullable=True)
-    phone = Column(String, nullable=True)
-    company_name = Column(String, nullable=True)
-    notes = Column(Text, nullable=True)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-
-class Relationship(Base):
-    __tablename__ = "relationships"
-
-    id = Column(Integer, primary_key=True, index=True)
-    from_contact_id = Column(Integer, index=True)
-    to_contact_id = Column(Integer, index=True)
-    relationship_type = Column(String)  # works_for, member_of, manages
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-
-class Campaign(Base):
-    __tablename__ = "campaigns"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    description = Column(Text, nullable=True)
-    channel = Column(String)  # email, phone, mail
-    send_date = Column(String)
-    status = Column(String)  # draft, sent, completed
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-
-class CampaignContact(Base):
-    __tablename__ = "campaign_contacts"
-
-    id = Column(Integer, primary_key=True, index=True)
-    campaign_id = Column(Integer, index=True)
-    contact_id = Column(Integer, index=True)
-    response_status = Column(String)  # pending, responded, converted, not_interested
-    response_date = Column(String, nullable=True)
-    notes = Column(Text, nullable=True)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-
-class Product(Base):
-    __tablename__ = "products"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    description = Column(Text, nullable=True)
-    status = Column(String)  # active, inactive, archived
-    product_type = Column(String, nullable=True)  # Freeform text
-    version = Column(Integer, default=1)
-    parent_product_id = Column(Integer, nullable=True, index=True)  # Links to previous version
-    effective_date = Column(String)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-    updated_at = Column(String, default=lambda: datetime.now().isoformat())
-    base_price = Column(String, nullable=True)
-    currency = Column(String, nullable=True, default="GBP")
-    billing_frequency = Column(String, nullable=True)
-
-class CustomerProduct(Base):
-    __tablename__ = "customer_products"
-
-    id = Column(Integer, primary_key=True, index=True)
-    contact_id = Column(Integer, index=True)
-    product_id = Column(Integer, index=True)
-    status = Column(String)  # active, ended, cancelled, suspended
-    start_date = Column(String)
-    end_date = Column(String, nullable=True)
-    notes = Column(Text, nullable=True)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
-    updated_at = Column(String, default=lambda: datetime.now().isoformat())
-    actual_price = Column(String, nullable=True)
-    renewal_date = Column(String, nullable=True)
-
-# Create tables
+import campaign_summary
+import dedup
+import entity_cache
+import metrics
+import migrations
+import relationship_graph
+import relationship_index
+import search_index
+import segments
+import sqlite_profile
+import table_versions
+from database import (
+    DATABASE_URL, ASYNC_DATABASE_URL, POOL_SETTINGS, engine, SessionLocal, async_engine, AsyncSessionLocal,
+    SQLITE_PROFILE, SQLITE_MAINTENANCE_INTERVAL, SQLITE_PROFILE_ENABLED, pool_metrics
+)
+from models import (
+    Base, Contact, Relationship, Campaign, CampaignContact, Product, CustomerProduct, CampaignStat, Segment,
+    TableVersion
+)
+
+# Create tables, then bring existing databases up to the current schema
 Base.metadata.create_all(bind=engine)
+migrations.migrate(engine)
+
+# Full-text search over contacts (falls back to LIKE when FTS5 is unavailable)
+SEARCH_INDEX_ENABLED = search_index.ensure_search_index(engine)
+
+# Campaign statistics summary (falls back to aggregating campaign_contacts)
+CAMPAIGN_SUMMARY_ENABLED = campaign_summary.ensure_campaign_summary(engine)
+
+# Trigger-maintained table versions (falls back to counting API writes in process)
+TABLE_VERSIONS_ENABLED = table_versions.ensure_table_versions(engine)
 
 # Pydantic models for API
 class ContactBase(BaseModel):
@@ -184,7 +150,22 @@ class CustomerProductResponse(CustomerProductBase):
         from_attributes = True
 
 # FastAPI app
-app = FastAPI(title="CRM MVP", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Checkpoint the WAL and optimize in the background while serving"""
+    maintenance = None
+    if SQLITE_PROFILE_ENABLED and SQLITE_MAINTENANCE_INTERVAL > 0:
+        maintenance = asyncio.create_task(
+            sqlite_profile.maintenance_loop(engine, SQLITE_MAINTENANCE_INTERVAL)
+        )
+    if RELATIONSHIP_INDEX_ENABLED:
+        await run_in_threadpool(load_relationship_index)
+    yield
+    if maintenance:
+        maintenance.cancel()
+    await async_engine.dispose()
+
+app = FastAPI(title="CRM MVP", version="0.1.0", lifespan=lifespan)
 
 # CORS middleware for React frontend
 app.add_middleware(
@@ -193,8 +174,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Prometheus metrics: latency, in-flight requests, response sizes and SQL
+# statements per route template, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware, router_app=app)
+metrics.instrument_engine(engine, "sync")
+metrics.instrument_engine(async_engine.sync_engine, "async")
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -203,49 +191,466 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# ==================== Change Versions ====================
+
+# Read endpoints derive their ETag from the versions of the tables they
+# read, so If-None-Match can be answered with a 304 before the endpoint's
+# queries run. On SQLite the versions live in the database, bumped by
+# triggers in the same transaction as every write (see table_versions.py),
+# so writes from scripts and other workers change them too. Elsewhere every
+# write endpoint's bump_versions() call counts in this process instead:
+# those versions restart (with a new boot id, so old ETags never match) when
+# the app restarts, and writes made outside the API are only picked up then.
+_BOOT_ID = format(int(time.time() * 1000), "x")
+_table_versions = defaultdict(int)
+_table_modified = defaultdict(time.time)
+_versions_lock = threading.Lock()
+
+def bump_versions(*tables: str):
+    """Record a committed write to each table (the triggers do it on SQLite)"""
+    if TABLE_VERSIONS_ENABLED:
+        return
+    now = time.time()
+    with _versions_lock:
+        for table in tables:
+            _table_versions[table] += 1
+            _table_modified[table] = now
+
+def read_versions(tables) -> dict:
+    """
+    {table: (version, modified_at)}, from one query when the database keeps
+    them. The entity cache drops rows of any table whose version has moved.
+    """
+    if TABLE_VERSIONS_ENABLED:
+        with engine.connect() as conn:
+            found = table_versions.read_versions(conn, tables)
+        versions = {table: found.get(table, (0, 0.0)) for table in tables}
+    else:
+        with _versions_lock:
+            versions = {table: (_table_versions[table], _table_modified[table]) for table in tables}
+    for table, (version, _) in versions.items():
+        ENTITY_CACHE.sync_version(table, version)
+    return versions
+
+def request_versions(request: Request, tables) -> tuple:
+    """
+    Versions of tables as conditional_get read them for this request, so a
+    cache keyed by them agrees with the ETag sent; read afresh otherwise.
+    """
+    known = getattr(request.state, "table_versions", {})
+    missing = [table for table in tables if table not in known]
+    if missing:
+        known = {**known, **read_versions(missing)}
+    return tuple(known[table][0] for table in tables)
+
+def table_etag(versions: dict) -> tuple:
+    """(ETag, Last-Modified) for a response built from tables at these versions"""
+    state = ",".join(f"{table}={version}" for table, (version, _) in versions.items())
+    modified = max(modified_at for _, modified_at in versions.values())
+    # Database versions are shared by every process and survive restarts
+    prefix = "" if TABLE_VERSIONS_ENABLED else f"{_BOOT_ID}-"
+    etag = f'"{prefix}{zlib.crc32(state.encode()):08x}"'
+    return etag, formatdate(modified, usegmt=True)
+
+def conditional_get(*tables: str):
+    """
+    Dependency adding ETag and Last-Modified headers for the given tables.
+
+    A request whose If-None-Match matches the current ETag is answered with
+    304 Not Modified before the endpoint (and its queries) runs. The versions
+    read are kept on request.state for request_versions().
+    """
+    def check(request: Request, response: Response):
+        versions = read_versions(tables)
+        request.state.table_versions = versions
+        etag, last_modified = table_etag(versions)
+        headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            if "*" in candidates or etag in candidates:
+                raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+
+    return check
+
+# ==================== Entity Cache ====================
+
+# Contacts, products and campaigns by id; see entity_cache.py
+ENTITY_CACHE = entity_cache.EntityCache(
+    maxsize=int(os.environ.get("CRM_ENTITY_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("CRM_ENTITY_CACHE_TTL", 300))
+)
+
+def entity_snapshot(obj) -> dict:
+    """Column values of a loaded row"""
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+def cache_entity(obj):
+    """Write-through after committing a created or updated row"""
+    ENTITY_CACHE.put(obj.__tablename__, obj.id, entity_snapshot(obj))
+
+def _cached_entity(model, entity_id):
+    row = ENTITY_CACHE.get(model.__tablename__, entity_id)
+    return None if row is None else model(**row)
+
+async def get_entity(db: AsyncSession, model, entity_id: int):
+    """
+    Look up a Contact, Product or Campaign by id through the entity cache.
+
+    Cache hits are detached copies built from the snapshot, so treat the
+    result as read-only; write endpoints load the rows they change with
+    db.get() and then update the cache.
+    """
+    cached = _cached_entity(model, entity_id)
+    if cached is not None:
+        return cached
+
+    token = ENTITY_CACHE.load_token()
+    obj = await db.get(model, entity_id)
+    if obj is not None:
+        ENTITY_CACHE.put_loaded(model.__tablename__, entity_id, entity_snapshot(obj), token)
+    return obj
+
+def load_entity(db: Session, model, entity_id: int):
+    """get_entity for the sync session, used by existence checks in write endpoints"""
+    cached = _cached_entity(model, entity_id)
+    if cached is not None:
+        return cached
+
+    token = ENTITY_CACHE.load_token()
+    obj = db.get(model, entity_id)
+    if obj is not None:
+        ENTITY_CACHE.put_loaded(model.__tablename__, entity_id, entity_snapshot(obj), token)
+    return obj
+
+# ==================== Relationship Index ====================
+
+# Forward and reverse relationship lists held in memory and patched by the
+# relationship write endpoints; see relationship_index.py. Set
+# CRM_RELATIONSHIP_INDEX=0 to answer every lookup from the database.
+RELATIONSHIP_INDEX_ENABLED = os.environ.get("CRM_RELATIONSHIP_INDEX", "1") != "0"
+RELATIONSHIP_INDEX = relationship_index.RelationshipIndex()
+
+def load_relationship_index():
+    """Build the index from the relationships table, at startup or after bulk changes"""
+    RELATIONSHIP_INDEX.begin_load()
+    with engine.connect() as conn:
+        RELATIONSHIP_INDEX.load(conn.execute(select(
+            Relationship.id, Relationship.from_contact_id,
+            Relationship.to_contact_id, Relationship.relationship_type
+        )))
+
+def relationship_index_ready() -> bool:
+    return RELATIONSHIP_INDEX_ENABLED and RELATIONSHIP_INDEX.loaded
+
+# ==================== Query Helpers ====================
+
+# Plain id lists are split into IN (...) chunks of this size to stay under
+# SQLite's bound-parameter limit. Pass a select() instead to avoid chunking.
+RELATIONSHIP_BATCH_SIZE = 500
+
+def _id_batches(contact_ids):
+    """Yield IN-clause operands for a set of contact ids or an id subquery"""
+    if isinstance(contact_ids, Select):
+        yield contact_ids
+        return
+
+    ids = sorted(set(contact_ids))
+    for start in range(0, len(ids), RELATIONSHIP_BATCH_SIZE):
+        yield ids[start:start + RELATIONSHIP_BATCH_SIZE]
+
+async def resolve_relationships(db: AsyncSession, contact_ids, direction: str = "outgoing"):
+    """
+    Fetch relationships and the contacts on the other end for many contacts at once.
+
+    contact_ids may be any iterable of ids or a select() of ids. With
+    direction="outgoing" results are keyed by from_contact_id and paired with
+    the target contact; with direction="incoming" they are keyed by
+    to_contact_id and paired with the source contact. Relationships whose
+    other end no longer exists are skipped.
+
+    Returns {contact_id: [(Relationship, Contact), ...]}.
+    """
+    if direction == "outgoing":
+        key_column, other_column = Relationship.from_contact_id, Relationship.to_contact_id
+    elif direction == "incoming":
+        key_column, other_column = Relationship.to_contact_id, Relationship.from_contact_id
+    else:
+        raise ValueError(f"Unknown relationship direction: {direction}")
+
+    resolved = defaultdict(list)
+    for batch in _id_batches(contact_ids):
+        rows = await db.execute(
+            select(Relationship, Contact).join(
+                Contact, Contact.id == other_column
+            ).where(
+                key_column.in_(batch)
+            ).order_by(Relationship.id)
+        )
+
+        for rel, other in rows:
+            resolved[getattr(rel, key_column.key)].append((rel, other))
+
+    return resolved
+
+# List endpoints return at most this many rows per page
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    """Opaque keyset cursor pointing just past the given row"""
+    payload = json.dumps({"sort": sort, "value": value, "id": row_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str, sort: str):
+    """Return (value, id) from a cursor, rejecting cursors issued for another sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, row_id = payload["value"], int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if payload.get("sort") != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+
+    return value, row_id
+
+def parse_fields(fields: Optional[str], allowed: List[str]) -> List[str]:
+    """Validate a fields= projection; id is always included"""
+    if not fields:
+        return list(allowed)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    return ["id"] + [f for f in allowed if f in requested and f != "id"]
+
+async def paginate(db: AsyncSession, query: Select, model, sort: str, cursor: Optional[str],
+                   limit: int, sortable: List[str]):
+    """
+    Run a select() of model rows with keyset pagination.
+
+    sort is a column name, optionally prefixed with "-" for descending order;
+    id breaks ties so the order is total. NULLs sort first ascending and last
+    descending (SQLite's own order, so the column indexes still serve it),
+    and a cursor on a NULL row carries on through the remaining NULLs.
+    Returns (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in sortable:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {name}")
+
+    key = getattr(model, name)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if name == "id":
+            query = query.where(model.id < last_id if descending else model.id > last_id)
+        elif value is None:
+            after_id = model.id < last_id if descending else model.id > last_id
+            nulls_after = and_(key.is_(None), after_id)
+            query = query.where(nulls_after if descending else or_(key.is_not(None), nulls_after))
+        elif descending:
+            query = query.where(or_(and_(key <= value, or_(key < value, model.id < last_id)), key.is_(None)))
+        else:
+            query = query.where(and_(key >= value, or_(key > value, model.id > last_id)))
+
+    if name == "id":
+        order = [model.id.desc() if descending else model.id]
+    else:
+        order = [key.desc().nulls_last(), model.id.desc()] if descending else [key.nulls_first(), model.id]
+
+    rows = (await db.scalars(query.order_by(*order).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, name), last.id)
+
+    return rows, next_cursor
+
+def project(row, fields: List[str]) -> dict:
+    """Serialise the selected columns of a row"""
+    return {field: getattr(row, field) for field in fields}
+
+def column_fields(fields: List[str], model) -> List[str]:
+    """The subset of projected fields that are mapped columns on model"""
+    return [f for f in fields if f in model.__table__.columns]
+
+def contact_search_filter(q: str):
+    """Filter clause matching contacts against free text"""
+    if SEARCH_INDEX_ENABLED:
+        match = search_index.build_match_query(q)
+        if match is None:
+            return Contact.id.is_(None)
+        return Contact.id.in_(search_index.match_ids(match))
+
+    search_term = f"%{q.lower()}%"
+    return (
+        Contact.full_name.ilike(search_term) |
+        Contact.email.ilike(search_term) |
+        Contact.company_name.ilike(search_term) |
+        Contact.notes.ilike(search_term)
+    )
+
+async def campaign_status_counts(db: AsyncSession, campaign_ids: Optional[List[int]] = None):
+    """
+    Count campaign contacts per campaign and response status.
+
+    Reads the campaign_stats summary when it is maintained, otherwise runs
+    one GROUP BY campaign_id, response_status over campaign_contacts.
+    Returns ({campaign_id: {status: count}}, {campaign_id: name},
+    {campaign_id: last_response_date}); campaigns with no contacts are absent.
+    """
+    if CAMPAIGN_SUMMARY_ENABLED:
+        campaign_id_col = CampaignStat.campaign_id
+        query = select(
+            CampaignStat.campaign_id,
+            Campaign.name,
+            CampaignStat.response_status,
+            CampaignStat.contact_count,
+            CampaignStat.last_response_date
+        ).outerjoin(Campaign, Campaign.id == CampaignStat.campaign_id)
+    else:
+        campaign_id_col = CampaignContact.campaign_id
+        query = select(
+            CampaignContact.campaign_id,
+            Campaign.name,
+            CampaignContact.response_status,
+            func.count(CampaignContact.id),
+            func.max(CampaignContact.response_date)
+        ).outerjoin(
+            Campaign, Campaign.id == CampaignContact.campaign_id
+        ).group_by(
+            CampaignContact.campaign_id, Campaign.name, CampaignContact.response_status
+        )
+
+    if campaign_ids is not None:
+        query = query.where(campaign_id_col.in_(campaign_ids))
+
+    counts = defaultdict(dict)
+    names = {}
+    last_dates = {}
+    for campaign_id, name, status, count, last_date in await db.execute(query):
+        counts[campaign_id][status] = counts[campaign_id].get(status, 0) + count
+        names[campaign_id] = name
+        if last_date and last_date > (last_dates.get(campaign_id) or ""):
+            last_dates[campaign_id] = last_date
+
+    return counts, names, last_dates
+
+def campaign_stats(status_counts: dict, last_response_date: Optional[str] = None) -> dict:
+    """Response statistics for one campaign from its {status: count} map"""
+    total_sent = sum(status_counts.values())
+    responded = status_counts.get("responded", 0)
+    converted = status_counts.get("converted", 0)
+    not_interested = status_counts.get("not_interested", 0)
+    pending = total_sent - responded - converted - not_interested
+
+    response_rate = (responded + converted) / total_sent * 100 if total_sent > 0 else 0
+
+    return {
+        "total_sent": total_sent,
+        "responded": responded,
+        "converted": converted,
+        "not_interested": not_interested,
+        "pending": pending,
+        "response_rate": round(response_rate, 1),
+        "last_response_date": last_response_date
+    }
+
+def relationship_summary(pairs):
+    """Compact relationship listing used by the campaign contact endpoints"""
+    return [
+        {"type": rel.relationship_type, "organisation": other.full_name}
+        for rel, other in pairs
+    ]
+
 # API Endpoints
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "CRM API is running", "version": "0.1.0"}
 
-@app.get("/api/contacts", response_model=List[ContactResponse])
-def get_contacts(db: Session = Depends(get_db)):
-    """Get all contacts"""
-    contacts = db.query(Contact).all()
-    return contacts
+CONTACT_FIELDS = ["id", "full_name", "contact_type", "email", "phone", "company_name", "notes", "created_at"]
+
+@app.get("/api/contacts", dependencies=[Depends(conditional_get("contacts"))])
+async def get_contacts(
+    response: Response,
+    contact_type: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a page of contacts.
+
+    Filter by contact_type and/or a free-text q, order by sort (prefix with
+    "-" for descending) and restrict columns with fields. The cursor for the
+    next page is returned in the X-Next-Cursor header.
+    """
+    selected = parse_fields(fields, CONTACT_FIELDS)
+    query = select(Contact).options(load_only(*[getattr(Contact, f) for f in selected]))
 
-@app.get("/api/contacts/search")
-def search_contacts(q: str, db: Session = Depends(get_db)):
-    """Global contact search across name, email, and company name"""
+    if contact_type:
+        query = query.where(Contact.contact_type == contact_type)
+
+    if q and q.strip():
+        query = query.where(contact_search_filter(q))
+
+    contacts, next_cursor = await paginate(
+        db, query, Contact, sort, cursor, limit, ["id", "full_name", "created_at"]
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [project(c, selected) for c in contacts]
+
+@app.get("/api/contacts/search", dependencies=[Depends(conditional_get("contacts", "relationships"))])
+async def search_contacts(q: str, db: AsyncSession = Depends(get_async_db)):
+    """Global contact search across name, email, company name, and notes"""
     if not q or len(q.strip()) == 0:
         return []
 
-    search_term = f"%{q.lower()}%"
+    if SEARCH_INDEX_ENABLED:
+        # Ranked, prefix-matched lookup through the FTS index
+        match = search_index.build_match_query(q)
+        if match is None:
+            return []
+
+        contacts = (await db.scalars(
+            select(Contact).from_statement(text(search_index.SEARCH_SQL)),
+            {"match": match, "limit": 10}
+        )).all()
+    else:
+        # Search across full_name, email, company_name, and notes
+        contacts = (await db.scalars(select(Contact).where(contact_search_filter(q)).limit(10))).all()
 
-    # Search across full_name, email, and company_name
-    contacts = db.query(Contact).filter(
-        (Contact.full_name.ilike(search_term)) |
-        (Contact.email.ilike(search_term)) |
-        (Contact.company_name.ilike(search_term))
-    ).limit(10).all()
+    # Linked organisations are only shown for individuals
+    linked = await resolve_relationships(
+        db, [c.id for c in contacts if c.contact_type == "individual"]
+    )
 
     # Build results with linked organisations
     results = []
     for contact in contacts:
-        # Get linked organisations (for individuals)
-        linked_orgs = []
-        if contact.contact_type == "individual":
-            relationships = db.query(Relationship).filter(
-                Relationship.from_contact_id == contact.id
-            ).all()
-
-            for rel in relationships:
-                org = db.query(Contact).filter(Contact.id == rel.to_contact_id).first()
-                if org:
-                    linked_orgs.append({
-                        "name": org.full_name,
-                        "type": rel.relationship_type
-                    })
+        linked_orgs = [
+            {"name": org.full_name, "type": rel.relationship_type}
+            for rel, org in linked.get(contact.id, [])
+        ]
 
         results.append({
             "id": contact.id,
@@ -258,233 +663,551 @@ def search_contacts(q: str, db: Session = Depends(get_db)):
 
     return results
 
-@app.get("/api/contacts/{contact_id}", response_model=ContactResponse)
-def get_contact(contact_id: int, db: Session = Depends(get_db)):
+# ==================== Duplicate Contacts ====================
+
+def find_contact_duplicates(db: Session, contact: dict) -> List[dict]:
+    """Existing contacts likely to be the same as contact, from one indexed query"""
+    query = dedup.candidate_query(contact)
+    if query is None:
+        return []
+    return dedup.match_candidates(contact, db.execute(query).mappings())
+
+# The last full scan, reused until a contact write changes the contacts
+# version; the lock lets one request scan while concurrent ones wait for it
+_duplicate_scan = {"key": None, "result": None}
+_duplicate_scan_lock = threading.Lock()
+
+def scan_duplicates(contacts_version: int, threshold: float, max_block_size: int) -> dict:
+    with _duplicate_scan_lock:
+        key = (contacts_version, threshold, max_block_size)
+        if _duplicate_scan["key"] != key:
+            with engine.connect() as conn:
+                _duplicate_scan["result"] = dedup.find_duplicates(conn, threshold, max_block_size)
+            _duplicate_scan["key"] = key
+        return _duplicate_scan["result"]
+
+@app.get("/api/contacts/duplicates", dependencies=[Depends(conditional_get("contacts"))])
+async def get_duplicate_contacts(
+    request: Request,
+    threshold: float = Query(dedup.DEFAULT_THRESHOLD, ge=0, le=1),
+    max_block_size: int = Query(dedup.MAX_BLOCK_SIZE, ge=2, le=1000),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Scan all contacts for likely duplicate pairs, best first.
+
+    Each pair names the older contact as contact_id; merge the duplicate into
+    it with POST /api/contacts/{contact_id}/merge. See dedup.py for scoring.
+    The scan is reused until the contacts version changes.
+    """
+    (contacts_version,) = request_versions(request, ["contacts"])
+    result = await run_in_threadpool(scan_duplicates, contacts_version, threshold, max_block_size)
+    return {
+        "threshold": threshold,
+        "total": len(result["pairs"]),
+        "candidates": result["candidates"],
+        "skipped_blocks": result["skipped_blocks"],
+        "pairs": result["pairs"][:limit]
+    }
+
+@app.post("/api/contacts/check-duplicates")
+def check_duplicate_contacts(contact: ContactCreate, db: Session = Depends(get_db)):
+    """Existing contacts likely to be the same as a contact about to be created"""
+    return {"duplicates": find_contact_duplicates(db, contact.dict())}
+
+@app.get(
+    "/api/contacts/{contact_id}", response_model=ContactResponse,
+    dependencies=[Depends(conditional_get("contacts"))]
+)
+async def get_contact(contact_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific contact"""
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
+    contact = await get_entity(db, Contact, contact_id)
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
     return contact
 
 @app.post("/api/contacts", response_model=ContactResponse)
-def create_contact(contact: ContactCreate, db: Session = Depends(get_db)):
-    """Create a new contact"""
+def create_contact(contact: ContactCreate, allow_duplicate: bool = False, db: Session = Depends(get_db)):
+    """Create a new contact, refusing likely duplicates unless allow_duplicate is set"""
+    if not allow_duplicate:
+        duplicates = find_contact_duplicates(db, contact.dict())
+        if duplicates:
+            raise HTTPException(status_code=400, detail={
+                "message": "Contact looks like a duplicate; resend with allow_duplicate=true to create it anyway",
+                "duplicates": duplicates
+            })
+
     db_contact = Contact(**contact.dict())
     db.add(db_contact)
     db.commit()
+    bump_versions("contacts")
     db.refresh(db_contact)
+    cache_entity(db_contact)
+    invalidate_stats_cache()
     return db_contact
 
 @app.put("/api/contacts/{contact_id}", response_model=ContactResponse)
 def update_contact(contact_id: int, contact: ContactUpdate, db: Session = Depends(get_db)):
     """Update a contact"""
-    db_contact = db.query(Contact).filter(Contact.id == contact_id).first()
+    db_contact = db.get(Contact, contact_id)
     if not db_contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
+    type_changed = db_contact.contact_type != contact.contact_type
     for key, value in contact.dict().items():
         setattr(db_contact, key, value)
 
     db.commit()
+    bump_versions("contacts")
     db.refresh(db_contact)
+    cache_entity(db_contact)
+    if type_changed:
+        invalidate_stats_cache()
     return db_contact
 
 @app.delete("/api/contacts/{contact_id}")
 def delete_contact(contact_id: int, db: Session = Depends(get_db)):
     """Delete a contact"""
-    db_contact = db.query(Contact).filter(Contact.id == contact_id).first()
+    db_contact = db.get(Contact, contact_id)
     if not db_contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
     db.delete(db_contact)
     db.commit()
+    bump_versions("contacts")
+    ENTITY_CACHE.invalidate("contacts", contact_id)
+    invalidate_stats_cache()
     return {"message": "Contact deleted successfully"}
 
-@app.get("/api/stats")
-def get_stats(db: Session = Depends(get_db)):
-    """Get basic statistics"""
-    total_contacts = db.query(Contact).count()
-    individuals = db.query(Contact).filter(Contact.contact_type == "individual").count()
-    businesses = db.query(Contact).filter(Contact.contact_type == "business").count()
-    estates = db.query(Contact).filter(Contact.contact_type == "estate").count()
-    total_campaigns = db.query(Campaign).count()
+class ContactMerge(BaseModel):
+    duplicate_id: int
+
+# Columns copied from the duplicate when the kept contact has no value
+MERGE_FILL_FIELDS = ["email", "phone", "company_name", "notes"]
+
+@app.post("/api/contacts/{contact_id}/merge", response_model=ContactResponse)
+def merge_contacts(contact_id: int, merge: ContactMerge, db: Session = Depends(get_db)):
+    """
+    Merge a duplicate into this contact and delete the duplicate.
+
+    The duplicate's relationships, campaign enrollments and products move to
+    this contact in one transaction, and its email, phone, company and notes
+    fill any this contact lacks. Links this contact already has are dropped
+    rather than repeated: a relationship to the same contact (or between the
+    two), an enrollment in the same campaign (keeping the duplicate's
+    response if this contact's is still pending) and an active holding of
+    the same product.
+    """
+    if merge.duplicate_id == contact_id:
+        raise HTTPException(status_code=400, detail="A contact cannot be merged into itself")
+    keep = db.get(Contact, contact_id)
+    duplicate = db.get(Contact, merge.duplicate_id)
+    if not keep or not duplicate:
+        raise HTTPException(status_code=404, detail="Contact not found")
+
+    for field in MERGE_FILL_FIELDS:
+        if not getattr(keep, field) and getattr(duplicate, field):
+            setattr(keep, field, getattr(duplicate, field))
+
+    # Relationships: drop the duplicate's links that would become self-links
+    # or repeat a (from, to) pair this contact has, then repoint the rest
+    rel_table = Relationship.__table__
+    affected = db.execute(select(rel_table).where(or_(
+        rel_table.c.from_contact_id == duplicate.id, rel_table.c.to_contact_id == duplicate.id
+    ))).all()
+    db.execute(rel_table.delete().where(or_(
+        and_(rel_table.c.from_contact_id == duplicate.id, or_(
+            rel_table.c.to_contact_id.in_([contact_id, duplicate.id]),
+            rel_table.c.to_contact_id.in_(
+                select(Relationship.to_contact_id).where(Relationship.from_contact_id == contact_id)
+            )
+        )),
+        and_(rel_table.c.to_contact_id == duplicate.id, or_(
+            rel_table.c.from_contact_id == contact_id,
+            rel_table.c.from_contact_id.in_(
+                select(Relationship.from_contact_id).where(Relationship.to_contact_id == contact_id)
+            )
+        ))
+    )))
+    kept_relationships = set(db.scalars(select(rel_table.c.id).where(or_(
+        rel_table.c.from_contact_id == duplicate.id, rel_table.c.to_contact_id == duplicate.id
+    ))))
+    db.execute(rel_table.update().where(rel_table.c.from_contact_id == duplicate.id).values(from_contact_id=contact_id))
+    db.execute(rel_table.update().where(rel_table.c.to_contact_id == duplicate.id).values(to_contact_id=contact_id))
+
+    # Campaign enrollments: one per campaign, taking the duplicate's response
+    # where this contact's is still pending
+    enrollments = CampaignContact.__table__
+    same_campaign = aliased(CampaignContact)
+    duplicate_response = select(same_campaign).where(
+        same_campaign.contact_id == duplicate.id,
+        same_campaign.campaign_id == enrollments.c.campaign_id
+    )
+    db.execute(enrollments.update().where(
+        enrollments.c.contact_id == contact_id,
+        enrollments.c.response_status == "pending",
+        duplicate_response.where(same_campaign.response_status != "pending").exists()
+    ).values(
+        response_status=duplicate_response.with_only_columns(same_campaign.response_status).scalar_subquery(),
+        response_date=duplicate_response.with_only_columns(same_campaign.response_date).scalar_subquery()
+    ))
+    db.execute(enrollments.delete().where(
+        enrollments.c.contact_id == duplicate.id,
+        enrollments.c.campaign_id.in_(
+            select(CampaignContact.campaign_id).where(CampaignContact.contact_id == contact_id)
+        )
+    ))
+    db.execute(enrollments.update().where(enrollments.c.contact_id == duplicate.id).values(contact_id=contact_id))
+
+    # Products: drop the duplicate's active holdings of products this contact
+    # already holds actively, then move the rest
+    holdings = CustomerProduct.__table__
+    db.execute(holdings.delete().where(
+        holdings.c.contact_id == duplicate.id,
+        holdings.c.status == "active",
+        holdings.c.product_id.in_(select(CustomerProduct.product_id).where(
+            CustomerProduct.contact_id == contact_id, CustomerProduct.status == "active"
+        ))
+    ))
+    db.execute(holdings.update().where(holdings.c.contact_id == duplicate.id).values(contact_id=contact_id))
+
+    db.delete(duplicate)
+    db.commit()
+    bump_versions("contacts", "relationships", "campaign_contacts", "customer_products")
+    db.refresh(keep)
+    cache_entity(keep)
+    ENTITY_CACHE.invalidate("contacts", merge.duplicate_id)
+    if RELATIONSHIP_INDEX_ENABLED:
+        for rel in affected:
+            RELATIONSHIP_INDEX.remove(rel.id)
+            if rel.id in kept_relationships:
+                RELATIONSHIP_INDEX.add(
+                    rel.id,
+                    contact_id if rel.from_contact_id == duplicate.id else rel.from_contact_id,
+                    contact_id if rel.to_contact_id == duplicate.id else rel.to_contact_id,
+                    rel.relationship_type
+                )
+    invalidate_stats_cache()
+    return keep
+
+# /api/stats is served from memory until a contact or campaign write
+# invalidates it; the TTL bounds staleness from writes made outside the API
+STATS_CACHE_TTL_SECONDS = 300
+# generation counts invalidations; a result is only stored if none happened
+# while it was being computed, as with the entity cache's load tokens
+_stats_cache = {"value": None, "computed_at": 0.0, "generation": 0}
+_stats_cache_lock = threading.Lock()
+
+def invalidate_stats_cache():
+    """Drop the cached /api/stats result"""
+    with _stats_cache_lock:
+        _stats_cache["value"] = None
+        _stats_cache["generation"] += 1
+
+async def compute_stats(db: AsyncSession) -> dict:
+    """Contact counts by type and the campaign count in one grouped query"""
+    campaign_count = select(func.count(Campaign.id)).scalar_subquery()
+    rows = (await db.execute(
+        select(Contact.contact_type, func.count(Contact.id), campaign_count).group_by(Contact.contact_type)
+    )).all()
+
+    by_type = {contact_type: count for contact_type, count, _ in rows}
+    total_campaigns = rows[0][2] if rows else await db.scalar(select(func.count(Campaign.id)))
 
     return {
-        "total_contacts": total_contacts,
+        "total_contacts": sum(by_type.values()),
         "total_campaigns": total_campaigns,
         "by_type": {
-            "individual": individuals,
-            "business": businesses,
-            "estate": estates
+            "individual": by_type.get("individual", 0),
+            "business": by_type.get("business", 0),
+            "estate": by_type.get("estate", 0)
         }
     }
 
-@app.get("/api/contacts/{contact_id}/relationships")
-def get_contact_relationships(contact_id: int, db: Session = Depends(get_db)):
+@app.get("/api/stats")
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get basic statistics, cached in-process"""
+    now = time.monotonic()
+    with _stats_cache_lock:
+        value, computed_at = _stats_cache["value"], _stats_cache["computed_at"]
+        generation = _stats_cache["generation"]
+
+    if value is None or now - computed_at > STATS_CACHE_TTL_SECONDS:
+        value, computed_at = await compute_stats(db), now
+        with _stats_cache_lock:
+            # A write invalidated the cache meanwhile, so this result may predate it
+            if _stats_cache["generation"] == generation:
+                _stats_cache["value"], _stats_cache["computed_at"] = value, computed_at
+
+    return {**value, "cache_age_seconds": round(now - computed_at, 1)}
+
+@app.get("/api/diagnostics/pool")
+async def get_pool_diagnostics():
+    """Database settings, connection pool saturation and checkout wait times"""
+    return {
+        "database_url": DATABASE_URL.render_as_string(hide_password=True),
+        "async_database_url": ASYNC_DATABASE_URL.render_as_string(hide_password=True),
+        "settings": POOL_SETTINGS,
+        "pools": pool_metrics()
+    }
+
+@app.get("/api/diagnostics/cache")
+async def get_cache_diagnostics():
+    """Entity cache size and hit/miss/eviction counters"""
+    return ENTITY_CACHE.stats()
+
+@app.get("/api/diagnostics/relationship-index")
+async def get_relationship_index_diagnostics():
+    """Relationship index size and overlay counters"""
+    return {"enabled": RELATIONSHIP_INDEX_ENABLED, **RELATIONSHIP_INDEX.stats()}
+
+metrics.register_stats(pool_metrics, ENTITY_CACHE.stats)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text-format metrics"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/diagnostics/sqlite")
+async def get_sqlite_diagnostics(db: AsyncSession = Depends(get_async_db)):
+    """Configured and active SQLite connection settings and the last maintenance run"""
+    if not SQLITE_PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Database is not SQLite")
+
+    conn = await db.connection()
+    return {
+        "profile": SQLITE_PROFILE,
+        "active": await conn.run_sync(sqlite_profile.active_settings),
+        "maintenance_interval_seconds": SQLITE_MAINTENANCE_INTERVAL,
+        "last_maintenance": sqlite_profile.last_maintenance
+    }
+
+@app.get(
+    "/api/contacts/{contact_id}/relationships",
+    dependencies=[Depends(conditional_get("relationships", "contacts"))]
+)
+async def get_contact_relationships(contact_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all contacts related to this contact"""
     # Get relationships where this contact is the source
-    relationships = db.query(Relationship).filter(
-        Relationship.from_contact_id == contact_id
-    ).all()
+    pairs = (await resolve_relationships(db, [contact_id])).get(contact_id, [])
 
     related_contacts = []
-    for rel in relationships:
-        contact = db.query(Contact).filter(Contact.id == rel.to_contact_id).first()
-        if contact:
-            related_contacts.append({
-                "id": contact.id,
-                "full_name": contact.full_name,
-                "contact_type": contact.contact_type,
-                "relationship_type": rel.relationship_type,
-                "email": contact.email,
-                "phone": contact.phone
-            })
+    for rel, contact in pairs:
+        related_contacts.append({
+            "id": contact.id,
+            "full_name": contact.full_name,
+            "contact_type": contact.contact_type,
+            "relationship_type": rel.relationship_type,
+            "email": contact.email,
+            "phone": contact.phone
+        })
 
     return related_contacts
 
-@app.get("/api/campaigns", response_model=List[CampaignResponse])
-def get_campaigns(db: Session = Depends(get_db)):
-    """Get all campaigns"""
-    campaigns = db.query(Campaign).all()
-    return campaigns
+# Network walks follow at most this many hops and return at most this many contacts
+MAX_NETWORK_DEPTH = 5
+MAX_NETWORK_SIZE = 2000
+# Rows the recursive walk may produce before it stops (SQLite only)
+NETWORK_WALK_LIMIT = int(os.environ.get("CRM_NETWORK_WALK_LIMIT", 100000))
 
-@app.get("/api/campaigns/{campaign_id}")
-def get_campaign_details(campaign_id: int, db: Session = Depends(get_db)):
-    """Get campaign with response statistics"""
-    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-    if not campaign:
-        raise HTTPException(status_code=404, detail="Campaign not found")
-
-    # Get campaign contacts and statistics
-    campaign_contacts = db.query(CampaignContact).filter(
-        CampaignContact.campaign_id == campaign_id
-    ).all()
-
-    total_sent = len(campaign_contacts)
-    responded = sum(1 for cc in campaign_contacts if cc.response_status == "responded")
-    converted = sum(1 for cc in campaign_contacts if cc.response_status == "converted")
-    not_interested = sum(1 for cc in campaign_contacts if cc.response_status == "not_interested")
-    pending = total_sent - responded - converted - not_interested
+@app.get(
+    "/api/contacts/{contact_id}/network",
+    dependencies=[Depends(conditional_get("contacts", "relationships"))]
+)
+async def get_contact_network(
+    contact_id: int,
+    depth: int = Query(2, ge=1, le=MAX_NETWORK_DEPTH),
+    types: Optional[str] = Query(None, description="Comma-separated relationship types to follow"),
+    limit: int = Query(500, ge=1, le=MAX_NETWORK_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the contacts within depth hops of this contact.
+
+    Relationships are followed in both directions, optionally only those of
+    the given types. Each contact appears once with its shortest distance;
+    edges are the followed relationships between the returned contacts.
+    truncated is true when more than limit contacts were reached, or when
+    the walk stopped at CRM_NETWORK_WALK_LIMIT rows before reaching depth.
+    """
+    contact = await get_entity(db, Contact, contact_id)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
 
-    response_rate = (responded + converted) / total_sent * 100 if total_sent > 0 else 0
+    type_list = sorted({t.strip() for t in types.split(",") if t.strip()}) if types else None
+    params = {"contact_id": contact_id, "depth": depth, "limit": limit + 1, "walk_limit": NETWORK_WALK_LIMIT}
+    if type_list:
+        params["types"] = type_list
+    rows = (await db.execute(relationship_graph.network_query(engine.dialect.name, type_list), params)).all()
+
+    walk_capped = engine.dialect.name == "sqlite" and bool(rows) and rows[0].walked >= NETWORK_WALK_LIMIT
+    truncated = len(rows) > limit or walk_capped
+    rows = rows[:limit]
+    nodes = [
+        {"id": row.id, "full_name": row.full_name, "contact_type": row.contact_type, "depth": row.depth}
+        for row in rows
+    ]
+
+    node_ids = {row.id for row in rows}
+    if relationship_index_ready():
+        edges = [
+            {"id": rel_id, "from_contact_id": source, "to_contact_id": target, "relationship_type": rel_type}
+            for rel_id, source, target, rel_type in RELATIONSHIP_INDEX.edges_between(node_ids, type_list)
+        ]
+    else:
+        edges = await network_edges(db, node_ids, type_list)
 
     return {
-        "id": campaign.id,
-        "name": campaign.name,
-        "description": campaign.description,
-        "channel": campaign.channel,
-        "send_date": campaign.send_date,
-        "status": campaign.status,
-        "created_at": campaign.created_at,
-        "stats": {
-            "total_sent": total_sent,
-            "responded": responded,
-            "converted": converted,
-            "not_interested": not_interested,
-            "pending": pending,
-            "response_rate": round(response_rate, 1)
-        }
+        "contact_id": contact_id,
+        "depth": depth,
+        "types": type_list,
+        "nodes": nodes,
+        "edges": edges,
+        "truncated": truncated
     }
 
-@app.get("/api/contacts/export/csv")
-def export_contacts_csv(db: Session = Depends(get_db)):
-    """Export all contacts as CSV"""
-    from fastapi.responses import Response
-    import csv
-    from io import StringIO
+async def network_edges(db: AsyncSession, node_ids, type_list) -> List[dict]:
+    """Relationships of the given types with both ends in node_ids, from the database"""
+    edges = []
+    for batch in _id_batches(node_ids):
+        query = select(Relationship).where(Relationship.from_contact_id.in_(batch))
+        if type_list:
+            query = query.where(Relationship.relationship_type.in_(type_list))
+        for rel in (await db.scalars(query.order_by(Relationship.id))).all():
+            if rel.to_contact_id in node_ids:
+                edges.append({
+                    "id": rel.id,
+                    "from_contact_id": rel.from_contact_id,
+                    "to_contact_id": rel.to_contact_id,
+                    "relationship_type": rel.relationship_type
+                })
+    return edges
+
+@app.get(
+    "/api/contacts/{contact_id}/connected",
+    dependencies=[Depends(conditional_get("contacts", "relationships"))]
+)
+async def get_connected_contacts(
+    contact_id: int,
+    types: Optional[str] = Query(None, description="Comma-separated relationship types to follow"),
+    limit: int = Query(500, ge=1, le=MAX_NETWORK_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get everyone tied to this contact by any chain of relationships.
 
-    contacts = db.query(Contact).all()
+    Answered from the relationship index, nearest contacts first (the
+    contact itself comes first). size is the number of contacts in the
+    component, or null when it has more than limit.
+    """
+    if not relationship_index_ready():
+        raise HTTPException(status_code=503, detail="Relationship index is not enabled")
+
+    contact = await get_entity(db, Contact, contact_id)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
 
-    output = StringIO()
-    writer = csv.writer(output)
+    type_list = sorted({t.strip() for t in types.split(",") if t.strip()}) if types else None
+    component, complete = RELATIONSHIP_INDEX.component(contact_id, type_list, limit=limit)
 
-    # Write header
-    writer.writerow(["Full Name", "Contact Type", "Email", "Phone", "Company", "Notes"])
+    # Relationships may still point at deleted contacts; those are left out
+    found = {}
+    for batch in _id_batches(component):
+        for row in (await db.execute(
+            select(Contact.id, Contact.full_name, Contact.contact_type).where(Contact.id.in_(batch))
+        )).all():
+            found[row.id] = {"id": row.id, "full_name": row.full_name, "contact_type": row.contact_type}
 
-    # Write data
-    for contact in contacts:
-        writer.writerow([
-            contact.full_name,
-            contact.contact_type,
-            contact.email or "",
-            contact.phone or "",
-            contact.company_name or "",
-            contact.notes or ""
-        ])
-
-    csv_content = output.getvalue()
-    output.close()
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=contacts.csv"}
-    )
+    return {
+        "contact_id": contact_id,
+        "types": type_list,
+        "size": len(component) if complete else None,
+        "contacts": [found[c] for c in component if c in found],
+        "truncated": not complete
+    }
 
-@app.get("/api/campaigns/{campaign_id}/contacts")
-def get_campaign_contacts(campaign_id: int, status: Optional[str] = None, db: Session = Depends(get_db)):
-    """Get contacts for a campaign, optionally filtered by response status"""
-    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-    if not campaign:
-        raise HTTPException(status_code=404, detail="Campaign not found")
+CAMPAIGN_FIELDS = ["id", "name", "description", "channel", "send_date", "status", "created_at"]
 
-    # Build query for campaign contacts
-    query = db.query(CampaignContact).filter(CampaignContact.campaign_id == campaign_id)
+@app.get("/api/campaigns", dependencies=[Depends(conditional_get("campaigns"))])
+async def get_campaigns(
+    response: Response,
+    status: Optional[str] = None,
+    channel: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of campaigns, optionally filtered by status and channel"""
+    selected = parse_fields(fields, CAMPAIGN_FIELDS)
+    query = select(Campaign).options(load_only(*[getattr(Campaign, f) for f in selected]))
 
     if status:
-        query = query.filter(CampaignContact.response_status == status)
+        query = query.where(Campaign.status == status)
+    if channel:
+        query = query.where(Campaign.channel == channel)
 
-    campaign_contacts = query.all()
+    campaigns, next_cursor = await paginate(
+        db, query, Campaign, sort, cursor, limit, ["id", "name", "send_date", "created_at"]
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    # Get full contact details and relationships for each
-    results = []
-    for cc in campaign_contacts:
-        contact = db.query(Contact).filter(Contact.id == cc.contact_id).first()
-        if contact:
-            # Get relationships for this contact
-            relationships = db.query(Relationship).filter(
-                Relationship.from_contact_id == contact.id
-            ).all()
-
-            relationship_summary = []
-            for rel in relationships:
-                related_contact = db.query(Contact).filter(Contact.id == rel.to_contact_id).first()
-                if related_contact:
-                    relationship_summary.append({
-                        "type": rel.relationship_type,
-                        "organisation": related_contact.full_name
-                    })
-
-            results.append({
-                "id": contact.id,
-                "full_name": contact.full_name,
-                "contact_type": contact.contact_type,
-                "email": contact.email,
-                "phone": contact.phone,
-                "response_status": cc.response_status,
-                "response_date": cc.response_date,
-                "relationships": relationship_summary
-            })
+    return [project(c, selected) for c in campaigns]
 
-    return results
+@app.post("/api/campaigns", response_model=CampaignResponse)
+def create_campaign(campaign: CampaignCreate, db: Session = Depends(get_db)):
+    """Create a new campaign"""
+    db_campaign = Campaign(**campaign.dict())
+    db.add(db_campaign)
+    db.commit()
+    bump_versions("campaigns")
+    db.refresh(db_campaign)
+    cache_entity(db_campaign)
+    invalidate_stats_cache()
+    return db_campaign
+
+@app.delete("/api/campaigns/{campaign_id}")
+def delete_campaign(campaign_id: int, db: Session = Depends(get_db)):
+    """Delete a campaign and its contact links"""
+    campaign = db.get(Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
 
-@app.get("/api/campaigns/overview")
-def get_campaigns_overview(campaign_ids: Optional[str] = None, db: Session = Depends(get_db)):
+    db.query(CampaignContact).filter(
+        CampaignContact.campaign_id == campaign_id
+    ).delete(synchronize_session=False)
+    db.delete(campaign)
+    db.commit()
+    bump_versions("campaigns", "campaign_contacts")
+    ENTITY_CACHE.invalidate("campaigns", campaign_id)
+    invalidate_stats_cache()
+    return {"message": "Campaign deleted successfully"}
+
+@app.get("/api/campaigns/overview", dependencies=[Depends(conditional_get("campaigns", "campaign_contacts"))])
+async def get_campaigns_overview(campaign_ids: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     """Get aggregate statistics across all campaigns or selected campaigns"""
-    query = db.query(CampaignContact)
+    id_list = None
 
     # Filter by campaign IDs if provided
     if campaign_ids:
         id_list = [int(id.strip()) for id in campaign_ids.split(',') if id.strip()]
-        query = query.filter(CampaignContact.campaign_id.in_(id_list))
 
-    campaign_contacts = query.all()
+    counts, names, last_dates = await campaign_status_counts(db, id_list)
+
+    # Combine the per-campaign counts
+    totals = defaultdict(int)
+    for status_counts in counts.values():
+        for status, count in status_counts.items():
+            totals[status] += count
 
-    total_contacts = len(campaign_contacts)
-    total_responded = sum(1 for cc in campaign_contacts if cc.response_status == "responded")
-    total_converted = sum(1 for cc in campaign_contacts if cc.response_status == "converted")
-    total_not_interested = sum(1 for cc in campaign_contacts if cc.response_status == "not_interested")
-    total_pending = sum(1 for cc in campaign_contacts if cc.response_status == "pending")
+    total_contacts = sum(totals.values())
+    total_responded = totals["responded"]
+    total_converted = totals["converted"]
+    total_not_interested = totals["not_interested"]
+    total_pending = totals["pending"]
 
     # Calculate response rate
     response_rate = ((total_responded + total_converted) / total_contacts * 100) if total_contacts > 0 else 0
@@ -495,96 +1218,463 @@ def get_campaigns_overview(campaign_ids: Optional[str] = None, db: Session = Dep
         "total_converted": total_converted,
         "total_not_interested": total_not_interested,
         "total_pending": total_pending,
-        "response_rate": round(response_rate, 1)
+        "response_rate": round(response_rate, 1),
+        "campaigns": [
+            {
+                "campaign_id": campaign_id,
+                "name": names[campaign_id],
+                **campaign_stats(counts[campaign_id], last_dates.get(campaign_id))
+            }
+            for campaign_id in sorted(counts)
+        ]
+    }
+
+@app.get(
+    "/api/campaigns/{campaign_id}",
+    dependencies=[Depends(conditional_get("campaigns", "campaign_contacts"))]
+)
+async def get_campaign_details(campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get campaign with response statistics"""
+    campaign = await get_entity(db, Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    # Get campaign statistics
+    counts, _, last_dates = await campaign_status_counts(db, [campaign_id])
+
+    return {
+        "id": campaign.id,
+        "name": campaign.name,
+        "description": campaign.description,
+        "channel": campaign.channel,
+        "send_date": campaign.send_date,
+        "status": campaign.status,
+        "created_at": campaign.created_at,
+        "stats": campaign_stats(counts.get(campaign_id, {}), last_dates.get(campaign_id))
     }
 
-@app.get("/api/campaigns/contacts/filter")
-def get_filtered_campaign_contacts(
+# Exportable columns and their CSV headers; the first six are the default export
+EXPORT_COLUMNS = {
+    "full_name": "Full Name",
+    "contact_type": "Contact Type",
+    "email": "Email",
+    "phone": "Phone",
+    "company_name": "Company",
+    "notes": "Notes",
+    "id": "ID",
+    "created_at": "Created At",
+}
+DEFAULT_EXPORT_COLUMNS = ["full_name", "contact_type", "email", "phone", "company_name", "notes"]
+
+# Rows fetched from the cursor and written per streamed chunk
+EXPORT_CHUNK_ROWS = 1000
+
+def stream_contacts_csv(columns: List[str], criteria, compress: bool):
+    """
+    Yield a CSV export of contacts in chunks.
+
+    Rows are read through a streaming cursor with yield_per, so memory stays
+    flat however many contacts match. Uses its own session because the
+    response body is produced after the request's dependencies have finished.
+    """
+    db = SessionLocal()
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    try:
+        writer.writerow([EXPORT_COLUMNS[c] for c in columns])
+
+        query = db.query(*[getattr(Contact, c) for c in columns]).filter(
+            *criteria
+        ).order_by(Contact.id).execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS)
+
+        for i, row in enumerate(query, 1):
+            writer.writerow(["" if value is None else value for value in row])
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield flush()
+
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+    finally:
+        db.close()
+
+@app.get("/api/contacts/export/csv")
+def export_contacts_csv(
+    columns: Optional[str] = None,
+    contact_type: Optional[str] = None,
+    q: Optional[str] = None,
+    gzip: bool = False
+):
+    """
+    Export contacts as CSV, streamed in chunks.
+
+    columns picks and orders the exported fields, contact_type and q filter
+    the contacts, and gzip=true returns a compressed contacts.csv.gz.
+    """
+    if columns:
+        selected = [c.strip() for c in columns.split(",") if c.strip()]
+        unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+        if unknown or not selected:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+    else:
+        selected = DEFAULT_EXPORT_COLUMNS
+
+    criteria = []
+    if contact_type:
+        criteria.append(Contact.contact_type == contact_type)
+    if q and q.strip():
+        criteria.append(contact_search_filter(q))
+
+    filename = "contacts.csv.gz" if gzip else "contacts.csv"
+    return StreamingResponse(
+        stream_contacts_csv(selected, criteria, compress=gzip),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.get(
+    "/api/campaigns/{campaign_id}/contacts",
+    dependencies=[Depends(conditional_get("campaigns", "campaign_contacts", "contacts", "relationships"))]
+)
+async def get_campaign_contacts(
+    campaign_id: int,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get contacts for a campaign, optionally filtered by response status"""
+    campaign = await get_entity(db, Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    # Build filter for campaign contacts
+    criteria = [CampaignContact.campaign_id == campaign_id]
+
+    if status:
+        criteria.append(CampaignContact.response_status == status)
+
+    campaign_contacts = await db.execute(
+        select(CampaignContact, Contact).join(
+            Contact, Contact.id == CampaignContact.contact_id
+        ).where(*criteria).order_by(CampaignContact.id)
+    )
+
+    # Relationships for every matching contact in one query
+    relationships = await resolve_relationships(
+        db, select(CampaignContact.contact_id).where(*criteria)
+    )
+
+    results = []
+    for cc, contact in campaign_contacts:
+        results.append({
+            "id": contact.id,
+            "full_name": contact.full_name,
+            "contact_type": contact.contact_type,
+            "email": contact.email,
+            "phone": contact.phone,
+            "response_status": cc.response_status,
+            "response_date": cc.response_date,
+            "relationships": relationship_summary(relationships.get(contact.id, []))
+        })
+
+    return results
+
+@app.get(
+    "/api/campaigns/contacts/filter",
+    dependencies=[Depends(conditional_get("campaigns", "campaign_contacts", "contacts", "relationships"))]
+)
+async def get_filtered_campaign_contacts(
     campaign_ids: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get contacts across multiple campaigns with optional status filter"""
-    query = db.query(CampaignContact)
+    criteria = []
 
     # Filter by campaign IDs if provided
     if campaign_ids:
         id_list = [int(id.strip()) for id in campaign_ids.split(',') if id.strip()]
-        query = query.filter(CampaignContact.campaign_id.in_(id_list))
+        criteria.append(CampaignContact.campaign_id.in_(id_list))
 
     # Filter by status if provided
     if status:
-        query = query.filter(CampaignContact.response_status == status)
+        criteria.append(CampaignContact.response_status == status)
+
+    # Contact and campaign name come back with each row
+    campaign_contacts = await db.execute(
+        select(CampaignContact, Contact, Campaign.name).join(
+            Contact, Contact.id == CampaignContact.contact_id
+        ).outerjoin(
+            Campaign, Campaign.id == CampaignContact.campaign_id
+        ).where(*criteria).order_by(CampaignContact.id)
+    )
 
-    campaign_contacts = query.all()
+    # Relationships for every matching contact in one query
+    relationships = await resolve_relationships(
+        db, select(CampaignContact.contact_id).where(*criteria)
+    )
 
-    # Get full contact details
     results = []
-    for cc in campaign_contacts:
-        contact = db.query(Contact).filter(Contact.id == cc.contact_id).first()
-        if contact:
-            # Get campaign name
-            campaign = db.query(Campaign).filter(Campaign.id == cc.campaign_id).first()
-
-            # Get relationships for this contact
-            relationships = db.query(Relationship).filter(
-                Relationship.from_contact_id == contact.id
-            ).all()
-
-            relationship_summary = []
-            for rel in relationships:
-                related_contact = db.query(Contact).filter(Contact.id == rel.to_contact_id).first()
-                if related_contact:
-                    relationship_summary.append({
-                        "type": rel.relationship_type,
-                        "organisation": related_contact.full_name
-                    })
-
-            results.append({
-                "id": contact.id,
-                "full_name": contact.full_name,
-                "contact_type": contact.contact_type,
-                "email": contact.email,
-                "phone": contact.phone,
-                "campaign_name": campaign.name if campaign else None,
-                "response_status": cc.response_status,
-                "response_date": cc.response_date,
-                "relationships": relationship_summary
-            })
+    for cc, contact, campaign_name in campaign_contacts:
+        results.append({
+            "id": contact.id,
+            "full_name": contact.full_name,
+            "contact_type": contact.contact_type,
+            "email": contact.email,
+            "phone": contact.phone,
+            "campaign_name": campaign_name,
+            "response_status": cc.response_status,
+            "response_date": cc.response_date,
+            "relationships": relationship_summary(relationships.get(contact.id, []))
+        })
 
     return results
 
-@app.get("/api/organisations")
-def get_organisations(db: Session = Depends(get_db)):
-    """Get all business and estate contacts"""
-    organisations = db.query(Contact).filter(
-        Contact.contact_type.in_(["business", "estate"])
-    ).all()
+class CampaignEnrollment(BaseModel):
+    """Segment filter selecting contacts to enroll; all given criteria must match"""
+    contact_type: Optional[str] = None
+    organisation_id: Optional[int] = None  # linked to this business/estate
+    product_id: Optional[int] = None  # holds this product...
+    product_status: str = "active"  # ...with this customer-product status
+    prior_response_status: Optional[str] = None  # responded this way before...
+    prior_campaign_id: Optional[int] = None  # ...in this campaign (any campaign if omitted)
+
+@app.post("/api/campaigns/{campaign_id}/enroll")
+def enroll_campaign_contacts(campaign_id: int, enrollment: CampaignEnrollment, db: Session = Depends(get_db)):
+    """
+    Enroll every contact matching a segment filter into a campaign.
+
+    Runs as a single INSERT ... SELECT; contacts already in the campaign
+    are skipped. New enrollments start as pending.
+    """
+    campaign = load_entity(db, Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    criteria = []
+
+    if enrollment.contact_type:
+        criteria.append(Contact.contact_type == enrollment.contact_type)
+
+    if enrollment.organisation_id is not None:
+        criteria.append(exists().where(
+            Relationship.from_contact_id == Contact.id,
+            Relationship.to_contact_id == enrollment.organisation_id
+        ))
+
+    if enrollment.product_id is not None:
+        criteria.append(exists().where(
+            CustomerProduct.contact_id == Contact.id,
+            CustomerProduct.product_id == enrollment.product_id,
+            CustomerProduct.status == enrollment.product_status
+        ))
+
+    if enrollment.prior_response_status or enrollment.prior_campaign_id is not None:
+        prior = aliased(CampaignContact)
+        prior_criteria = [prior.contact_id == Contact.id]
+        if enrollment.prior_response_status:
+            prior_criteria.append(prior.response_status == enrollment.prior_response_status)
+        if enrollment.prior_campaign_id is not None:
+            prior_criteria.append(prior.campaign_id == enrollment.prior_campaign_id)
+        criteria.append(exists().where(*prior_criteria))
+
+    if not criteria:
+        raise HTTPException(status_code=400, detail="Provide at least one filter")
+
+    # Skip contacts already enrolled
+    criteria.append(~exists().where(
+        CampaignContact.campaign_id == campaign_id,
+        CampaignContact.contact_id == Contact.id
+    ))
+
+    matching = select(
+        Contact.id,
+        literal(campaign_id),
+        literal("pending"),
+        literal(datetime.now().isoformat())
+    ).where(*criteria)
+
+    result = db.execute(insert(CampaignContact).from_select(
+        ["contact_id", "campaign_id", "response_status", "created_at"], matching
+    ))
+    db.commit()
+    bump_versions("campaign_contacts")
+
+    return {"campaign_id": campaign_id, "enrolled": result.rowcount}
+
+RESPONSE_STATUSES = ["pending", "responded", "converted", "not_interested"]
+
+# Contact ids per IN (...) list in bulk response updates
+BULK_UPDATE_CHUNK_SIZE = 500
+# Cap on not-found rows listed in the bulk update report
+BULK_UPDATE_MAX_NOT_FOUND = 1000
+# Cap on validation errors listed in a rejected bulk update
+BULK_UPDATE_MAX_ERRORS = 1000
+
+class ResponseUpdate(BaseModel):
+    """One response result, keyed by contact_id or by email"""
+    campaign_id: Optional[int] = None  # defaults to the request's campaign_id
+    contact_id: Optional[int] = None
+    email: Optional[str] = None
+    response_status: str
+    response_date: Optional[str] = None  # defaults to now
+
+class BulkResponseUpdate(BaseModel):
+    campaign_id: Optional[int] = None
+    updates: List[ResponseUpdate]
+
+@app.post("/api/campaign-contacts/bulk-responses")
+def bulk_update_responses(body: BulkResponseUpdate, db: Session = Depends(get_db)):
+    """
+    Apply many campaign response results at once.
+
+    Updates are grouped by campaign, status and date and applied with
+    chunked UPDATE ... WHERE contact_id IN (...) statements in a single
+    transaction. When a contact appears twice for a campaign the later
+    update wins. Rows already in the requested status are left untouched.
+    Reports how many campaign contacts matched, how many changed, and the
+    rows whose contact or enrollment was not found.
+    """
+    now = datetime.now().isoformat()
+    errors = []
+    for row_number, update in enumerate(body.updates, 1):
+        if (update.campaign_id or body.campaign_id) is None:
+            errors.append(f"row {row_number}: campaign_id is required")
+        if update.contact_id is None and not update.email:
+            errors.append(f"row {row_number}: contact_id or email is required")
+        if update.response_status not in RESPONSE_STATUSES:
+            errors.append(f"row {row_number}: unknown response_status '{update.response_status}'")
+    if errors:
+        raise HTTPException(status_code=400, detail=errors[:BULK_UPDATE_MAX_ERRORS])
+
+    # Resolve emails to contact ids (one email may belong to several contacts)
+    emails = sorted({u.email.strip().lower() for u in body.updates if u.contact_id is None})
+    email_ids = defaultdict(list)
+    for start in range(0, len(emails), BULK_UPDATE_CHUNK_SIZE):
+        for contact_id, email in db.query(Contact.id, func.lower(Contact.email)).filter(
+            func.lower(Contact.email).in_(emails[start:start + BULK_UPDATE_CHUNK_SIZE])
+        ):
+            email_ids[email].append(contact_id)
+
+    # Latest update per (campaign, contact), and the keys each row targets
+    latest = {}
+    row_keys = []
+    for row_number, update in enumerate(body.updates, 1):
+        campaign_id = update.campaign_id or body.campaign_id
+        contact_ids = [update.contact_id] if update.contact_id is not None else email_ids.get(update.email.strip().lower(), [])
+        keys = [(campaign_id, contact_id) for contact_id in contact_ids]
+        for key in keys:
+            latest[key] = (update.response_status, update.response_date or now)
+        row_keys.append((row_number, update, keys))
+
+    groups = defaultdict(list)
+    for (campaign_id, contact_id), (status, response_date) in latest.items():
+        groups[(campaign_id, status, response_date)].append(contact_id)
+
+    matched = changed = 0
+    matched_keys = set()
+    for (campaign_id, status, response_date), contact_ids in groups.items():
+        for start in range(0, len(contact_ids), BULK_UPDATE_CHUNK_SIZE):
+            chunk = contact_ids[start:start + BULK_UPDATE_CHUNK_SIZE]
+            in_chunk = [CampaignContact.campaign_id == campaign_id, CampaignContact.contact_id.in_(chunk)]
+
+            found = db.query(CampaignContact.contact_id).filter(*in_chunk).all()
+            matched += len(found)
+            matched_keys.update((campaign_id, contact_id) for contact_id, in found)
+
+            changed += db.query(CampaignContact).filter(
+                *in_chunk,
+                or_(CampaignContact.response_status.is_(None), CampaignContact.response_status != status)
+            ).update(
+                {CampaignContact.response_status: status, CampaignContact.response_date: response_date},
+                synchronize_session=False
+            )
+
+    db.commit()
+    bump_versions("campaign_contacts")
+
+    not_found = [
+        {"row": row_number, "campaign_id": update.campaign_id or body.campaign_id,
+         "contact_id": update.contact_id, "email": update.email}
+        for row_number, update, keys in row_keys
+        if not any(key in matched_keys for key in keys)
+    ]
+
+    return {
+        "received": len(body.updates),
+        "matched": matched,
+        "changed": changed,
+        "not_found": len(not_found),
+        "not_found_rows": not_found[:BULK_UPDATE_MAX_NOT_FOUND]
+    }
+
+ORGANISATION_FIELDS = ["id", "full_name", "contact_type", "email", "phone", "notes", "linked_people_count"]
+
+@app.get("/api/organisations", dependencies=[Depends(conditional_get("contacts", "relationships"))])
+async def get_organisations(
+    response: Response,
+    contact_type: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of business and estate contacts"""
+    if contact_type and contact_type not in ["business", "estate"]:
+        raise HTTPException(status_code=400, detail="contact_type must be business or estate")
+
+    selected = parse_fields(fields, ORGANISATION_FIELDS)
+    query = select(Contact).options(
+        load_only(*[getattr(Contact, f) for f in column_fields(selected, Contact)])
+    ).where(
+        Contact.contact_type.in_([contact_type] if contact_type else ["business", "estate"])
+    )
+
+    if q and q.strip():
+        query = query.where(contact_search_filter(q))
+
+    organisations, next_cursor = await paginate(
+        db, query, Contact, sort, cursor, limit, ["id", "full_name", "created_at"]
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    # Count relationships where each org on this page is the target
+    linked_counts = {}
+    if "linked_people_count" in selected and organisations:
+        if relationship_index_ready():
+            linked_counts = RELATIONSHIP_INDEX.linked_counts([org.id for org in organisations])
+        else:
+            linked_counts = dict((await db.execute(
+                select(Relationship.to_contact_id, func.count(Relationship.id)).where(
+                    Relationship.to_contact_id.in_([org.id for org in organisations])
+                ).group_by(Relationship.to_contact_id)
+            )).all())
 
-    # Add count of linked people for each org
     results = []
     for org in organisations:
-        # Count relationships where this org is the target
-        linked_people = db.query(Relationship).filter(
-            Relationship.to_contact_id == org.id
-        ).count()
-
-        results.append({
-            "id": org.id,
-            "full_name": org.full_name,
-            "contact_type": org.contact_type,
-            "email": org.email,
-            "phone": org.phone,
-            "notes": org.notes,
-            "linked_people_count": linked_people
-        })
+        result = project(org, column_fields(selected, Contact))
+        if "linked_people_count" in selected:
+            result["linked_people_count"] = linked_counts.get(org.id, 0)
+        results.append(result)
 
     return results
 
-@app.get("/api/organisations/{org_id}")
-def get_organisation_detail(org_id: int, db: Session = Depends(get_db)):
+@app.get("/api/organisations/{org_id}", dependencies=[Depends(conditional_get("contacts", "relationships"))])
+async def get_organisation_detail(org_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get organisation detail with all linked people"""
-    org = db.query(Contact).filter(Contact.id == org_id).first()
+    org = await get_entity(db, Contact, org_id)
     if not org:
         raise HTTPException(status_code=404, detail="Organisation not found")
 
@@ -592,24 +1682,20 @@ def get_organisation_detail(org_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Contact is not a business or estate")
 
     # Get all relationships where this org is the target (people linked TO this org)
-    relationships = db.query(Relationship).filter(
-        Relationship.to_contact_id == org_id
-    ).all()
+    pairs = (await resolve_relationships(db, [org_id], direction="incoming")).get(org_id, [])
 
     linked_people = []
-    for rel in relationships:
-        person = db.query(Contact).filter(Contact.id == rel.from_contact_id).first()
-        if person:
-            linked_people.append({
-                "relationship_id": rel.id,
-                "person_id": person.id,
-                "full_name": person.full_name,
-                "contact_type": person.contact_type,
-                "email": person.email,
-                "phone": person.phone,
-                "relationship_type": rel.relationship_type,
-                "created_at": rel.created_at
-            })
+    for rel, person in pairs:
+        linked_people.append({
+            "relationship_id": rel.id,
+            "person_id": person.id,
+            "full_name": person.full_name,
+            "contact_type": person.contact_type,
+            "email": person.email,
+            "phone": person.phone,
+            "relationship_type": rel.relationship_type,
+            "created_at": rel.created_at
+        })
 
     return {
         "id": org.id,
@@ -631,8 +1717,8 @@ class RelationshipCreate(BaseModel):
 def create_relationship(relationship: RelationshipCreate, db: Session = Depends(get_db)):
     """Create a new relationship between contacts"""
     # Verify both contacts exist
-    from_contact = db.query(Contact).filter(Contact.id == relationship.from_contact_id).first()
-    to_contact = db.query(Contact).filter(Contact.id == relationship.to_contact_id).first()
+    from_contact = load_entity(db, Contact, relationship.from_contact_id)
+    to_contact = load_entity(db, Contact, relationship.to_contact_id)
 
     if not from_contact or not to_contact:
         raise HTTPException(status_code=404, detail="One or both contacts not found")
@@ -648,8 +1734,19 @@ def create_relationship(relationship: RelationshipCreate, db: Session = Depends(
 
     db_relationship = Relationship(**relationship.dict())
     db.add(db_relationship)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent insert of the same link
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Relationship already exists")
+    bump_versions("relationships")
     db.refresh(db_relationship)
+    if RELATIONSHIP_INDEX_ENABLED:
+        RELATIONSHIP_INDEX.add(
+            db_relationship.id, db_relationship.from_contact_id,
+            db_relationship.to_contact_id, db_relationship.relationship_type
+        )
 
     return {
         "id": db_relationship.id,
@@ -668,76 +1765,247 @@ def delete_relationship(relationship_id: int, db: Session = Depends(get_db)):
 
     db.delete(relationship)
     db.commit()
+    bump_versions("relationships")
+    if RELATIONSHIP_INDEX_ENABLED:
+        RELATIONSHIP_INDEX.remove(relationship_id)
     return {"message": "Relationship deleted successfully"}
 
-@app.get("/api/contacts/{contact_id}/organisations")
-def get_contact_organisations(contact_id: int, db: Session = Depends(get_db)):
+@app.get(
+    "/api/contacts/{contact_id}/organisations",
+    dependencies=[Depends(conditional_get("contacts", "relationships"))]
+)
+async def get_contact_organisations(contact_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all organisations linked to this contact"""
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
+    contact = await get_entity(db, Contact, contact_id)
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
     # Get relationships where this contact is the source
-    relationships = db.query(Relationship).filter(
-        Relationship.from_contact_id == contact_id
-    ).all()
+    pairs = (await resolve_relationships(db, [contact_id])).get(contact_id, [])
 
     organisations = []
-    for rel in relationships:
-        org = db.query(Contact).filter(Contact.id == rel.to_contact_id).first()
-        if org:
-            organisations.append({
-                "relationship_id": rel.id,
-                "organisation_id": org.id,
-                "full_name": org.full_name,
-                "contact_type": org.contact_type,
-                "relationship_type": rel.relationship_type
-            })
+    for rel, org in pairs:
+        organisations.append({
+            "relationship_id": rel.id,
+            "organisation_id": org.id,
+            "full_name": org.full_name,
+            "contact_type": org.contact_type,
+            "relationship_type": rel.relationship_type
+        })
 
     return organisations
 
+# ==================== Bulk Import ====================
+
+# Rows validated and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+# Cap on per-row errors returned; failures beyond it are only counted
+IMPORT_MAX_ERRORS = 1000
+
+# CSV headers accepted for each field, including the export headers
+IMPORT_HEADERS = {
+    **{field: field for field in ContactCreate.model_fields},
+    **{header.lower(): field for field, header in EXPORT_COLUMNS.items() if field in ContactCreate.model_fields},
+}
+
+def import_contact_batch(db: Session, batch, report: dict):
+    """
+    Validate (row_number, row) pairs against ContactCreate and insert the
+    valid ones with a single executemany in their own transaction.
+    """
+    valid = []
+    for row_number, row in batch:
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("Row must be an object")
+            valid.append(ContactCreate.model_validate(row).model_dump())
+        except (ValidationError, ValueError) as e:
+            report["failed"] += 1
+            if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                errors = e.errors(include_url=False, include_context=False) if isinstance(e, ValidationError) else [str(e)]
+                report["errors"].append({"row": row_number, "errors": errors})
+
+    if valid:
+        db.execute(insert(Contact), valid)
+        db.commit()
+        bump_versions("contacts")
+        report["imported"] += len(valid)
+
+def csv_import_rows(file):
+    """Yield (row_number, row) from an uploaded CSV, mapping headers to fields"""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    fields = {header: IMPORT_HEADERS.get((header or "").strip().lower()) for header in reader.fieldnames or []}
+
+    for row_number, raw in enumerate(reader, 1):
+        # Blank optional cells become None rather than empty strings
+        yield row_number, {
+            fields[header]: (value.strip() or None) if isinstance(value, str) else value
+            for header, value in raw.items()
+            if fields.get(header)
+        }
+
+def import_csv(db: Session, file, report: dict):
+    """Stream an uploaded CSV into the contacts table batch by batch"""
+    batch = []
+    for item in csv_import_rows(file):
+        batch.append(item)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            import_contact_batch(db, batch, report)
+            batch = []
+    if batch:
+        import_contact_batch(db, batch, report)
+
+async def iter_json_array(chunks):
+    """
+    Yield the elements of a JSON array as its bytes arrive.
+
+    Elements are decoded one at a time, so the array is never held in
+    memory as a whole. Raises ValueError if the body is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = finished = False
+
+    async for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer or finished:
+                break
+            if not started:
+                if buffer[0] != "[":
+                    raise ValueError("Expected a JSON array")
+                buffer, started = buffer[1:], True
+            elif buffer[0] == ",":
+                buffer = buffer[1:]
+            elif buffer[0] == "]":
+                buffer, finished = buffer[1:], True
+            else:
+                try:
+                    element, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    break  # element continues in the next chunk
+                buffer = buffer[end:]
+                yield element
+
+    if not finished or buffer.strip():
+        raise ValueError("Invalid JSON array")
+
+@app.post("/api/contacts/import")
+async def import_contacts(request: Request, db: Session = Depends(get_db)):
+    """
+    Bulk-create contacts from a CSV upload or a JSON array.
+
+    Send multipart/form-data with a CSV in the "file" field (headers are
+    field names or the CSV export headers), or a JSON array of contact
+    objects. Rows are validated against ContactCreate and inserted in
+    batches of IMPORT_BATCH_SIZE, each in its own transaction; rows that
+    fail validation are skipped and reported by row number.
+    """
+    report = {"imported": 0, "failed": 0, "errors": []}
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload a CSV file in the 'file' field")
+        try:
+            await run_in_threadpool(import_csv, db, upload.file, report)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid CSV after {report['imported']} imported rows: {e}")
+    elif content_type.startswith("application/json"):
+        batch = []
+        row_number = 0
+        try:
+            async for element in iter_json_array(request.stream()):
+                row_number += 1
+                batch.append((row_number, element))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await run_in_threadpool(import_contact_batch, db, batch, report)
+                    batch = []
+        except (UnicodeDecodeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON after {report['imported']} imported rows: {e}")
+        if batch:
+            await run_in_threadpool(import_contact_batch, db, batch, report)
+    else:
+        raise HTTPException(status_code=415, detail="Send multipart/form-data with a CSV file or a JSON array")
+
+    if report["imported"]:
+        invalidate_stats_cache()
+
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
+
 # ==================== Product Endpoints ====================
 
-@app.get("/api/products")
-def get_products(status: Optional[str] = None, product_type: Optional[str] = None, db: Session = Depends(get_db)):
-    """Get all products with optional filtering"""
-    query = db.query(Product)
+PRODUCT_FIELDS = [
+    "id", "name", "description", "status", "product_type", "version", "parent_product_id",
+    "effective_date", "created_at", "updated_at", "base_price", "currency", "billing_frequency",
+    "active_customers_count", "ended_customers_count", "cancelled_customers_count",
+    "suspended_customers_count"
+]
+
+# Customer-product statuses reported as <status>_customers_count on each product
+CUSTOMER_PRODUCT_STATUSES = ["active", "ended", "cancelled", "suspended"]
+
+@app.get("/api/products", dependencies=[Depends(conditional_get("products", "customer_products"))])
+async def get_products(
+    response: Response,
+    status: Optional[str] = None,
+    product_type: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of products with optional filtering"""
+    selected = parse_fields(fields, PRODUCT_FIELDS)
+    query = select(Product).options(
+        load_only(*[getattr(Product, f) for f in column_fields(selected, Product)])
+    )
 
     # Exclude archived by default unless specifically requested
     if status:
-        query = query.filter(Product.status == status)
+        query = query.where(Product.status == status)
     else:
-        query = query.filter(Product.status != "archived")
+        query = query.where(Product.status != "archived")
 
     if product_type:
-        query = query.filter(Product.product_type == product_type)
+        query = query.where(Product.product_type == product_type)
 
-    products = query.all()
+    products, next_cursor = await paginate(
+        db, query, Product, sort, cursor, limit, ["id", "name", "effective_date", "created_at"]
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    # Customer counts by status for every product on this page in one query
+    count_fields = [f"{status}_customers_count" for status in CUSTOMER_PRODUCT_STATUSES]
+    counts = defaultdict(dict)
+    if products and any(f in selected for f in count_fields):
+        rows = await db.execute(
+            select(
+                CustomerProduct.product_id, CustomerProduct.status, func.count(CustomerProduct.id)
+            ).where(
+                CustomerProduct.product_id.in_([p.id for p in products])
+            ).group_by(CustomerProduct.product_id, CustomerProduct.status)
+        )
+
+        for product_id, status, count in rows:
+            counts[product_id][status] = count
 
-    # Add active customers count for each product
     results = []
     for product in products:
-        active_count = db.query(CustomerProduct).filter(
-            CustomerProduct.product_id == product.id,
-            CustomerProduct.status == "active"
-        ).count()
-
-        product_dict = {
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "status": product.status,
-            "product_type": product.product_type,
-            "version": product.version,
-            "parent_product_id": product.parent_product_id,
-            "effective_date": product.effective_date,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            "base_price": product.base_price,
-            "currency": product.currency,
-            "billing_frequency": product.billing_frequency,
-            "active_customers_count": active_count
-        }
+        product_dict = project(product, column_fields(selected, Product))
+
+        for status in CUSTOMER_PRODUCT_STATUSES:
+            field = f"{status}_customers_count"
+            if field in selected:
+                product_dict[field] = counts[product.id].get(status, 0)
+
         results.append(product_dict)
 
     return results
@@ -759,37 +2027,44 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     )
     db.add(db_product)
     db.commit()
+    bump_versions("products")
     db.refresh(db_product)
+    cache_entity(db_product)
     return db_product
 
-@app.get("/api/products/{product_id}")
-def get_product_detail(product_id: int, db: Session = Depends(get_db)):
+@app.get(
+    "/api/products/{product_id}",
+    dependencies=[Depends(conditional_get("products", "customer_products", "contacts"))]
+)
+async def get_product_detail(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get product details with list of customers"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await get_entity(db, Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    # Get all customer-product relationships
-    customer_products = db.query(CustomerProduct).filter(
-        CustomerProduct.product_id == product_id
-    ).all()
+    # Customer-product links with their contacts in one query
+    customer_products = await db.execute(
+        select(CustomerProduct, Contact).join(
+            Contact, Contact.id == CustomerProduct.contact_id
+        ).where(
+            CustomerProduct.product_id == product_id
+        ).order_by(CustomerProduct.id)
+    )
 
     customers = []
-    for cp in customer_products:
-        contact = db.query(Contact).filter(Contact.id == cp.contact_id).first()
-        if contact:
-            customers.append({
-                "customer_product_id": cp.id,
-                "contact_id": contact.id,
-                "full_name": contact.full_name,
-                "contact_type": contact.contact_type,
-                "email": contact.email,
-                "status": cp.status,
-                "start_date": cp.start_date,
-                "end_date": cp.end_date,
-                "actual_price": cp.actual_price,
-                "notes": cp.notes
-            })
+    for cp, contact in customer_products:
+        customers.append({
+            "customer_product_id": cp.id,
+            "contact_id": contact.id,
+            "full_name": contact.full_name,
+            "contact_type": contact.contact_type,
+            "email": contact.email,
+            "status": cp.status,
+            "start_date": cp.start_date,
+            "end_date": cp.end_date,
+            "actual_price": cp.actual_price,
+            "notes": cp.notes
+        })
 
     return {
         "id": product.id,
@@ -810,33 +2085,39 @@ def get_product_detail(product_id: int, db: Session = Depends(get_db)):
 
 # ==================== Customer-Product Endpoints ====================
 
-@app.get("/api/contacts/{contact_id}/products")
-def get_contact_products(contact_id: int, db: Session = Depends(get_db)):
+@app.get(
+    "/api/contacts/{contact_id}/products",
+    dependencies=[Depends(conditional_get("contacts", "customer_products", "products"))]
+)
+async def get_contact_products(contact_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all products for a specific contact"""
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
+    contact = await get_entity(db, Contact, contact_id)
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
-    customer_products = db.query(CustomerProduct).filter(
-        CustomerProduct.contact_id == contact_id
-    ).all()
+    # Customer-product links with their products in one query
+    customer_products = await db.execute(
+        select(CustomerProduct, Product).join(
+            Product, Product.id == CustomerProduct.product_id
+        ).where(
+            CustomerProduct.contact_id == contact_id
+        ).order_by(CustomerProduct.id)
+    )
 
     results = []
-    for cp in customer_products:
-        product = db.query(Product).filter(Product.id == cp.product_id).first()
-        if product:
-            results.append({
-                "customer_product_id": cp.id,
-                "product_id": product.id,
-                "product_name": product.name,
-                "product_type": product.product_type,
-                "status": cp.status,
-                "start_date": cp.start_date,
-                "end_date": cp.end_date,
-                "actual_price": cp.actual_price,
-                "notes": cp.notes,
-                "created_at": cp.created_at
-            })
+    for cp, product in customer_products:
+        results.append({
+            "customer_product_id": cp.id,
+            "product_id": product.id,
+            "product_name": product.name,
+            "product_type": product.product_type,
+            "status": cp.status,
+            "start_date": cp.start_date,
+            "end_date": cp.end_date,
+            "actual_price": cp.actual_price,
+            "notes": cp.notes,
+            "created_at": cp.created_at
+        })
 
     return results
 
@@ -844,12 +2125,12 @@ def get_contact_products(contact_id: int, db: Session = Depends(get_db)):
 def create_customer_product(customer_product: CustomerProductCreate, db: Session = Depends(get_db)):
     """Assign a product to a customer"""
     # Verify contact exists
-    contact = db.query(Contact).filter(Contact.id == customer_product.contact_id).first()
+    contact = load_entity(db, Contact, customer_product.contact_id)
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
 
     # Verify product exists and is active
-    product = db.query(Product).filter(Product.id == customer_product.product_id).first()
+    product = load_entity(db, Product, customer_product.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     if product.status != "active":
@@ -868,6 +2149,7 @@ def create_customer_product(customer_product: CustomerProductCreate, db: Session
     db_customer_product = CustomerProduct(**customer_product.dict())
     db.add(db_customer_product)
     db.commit()
+    bump_versions("customer_products")
     db.refresh(db_customer_product)
     return db_customer_product
 
@@ -884,6 +2166,7 @@ def update_customer_product(customer_product_id: int, update: CustomerProductUpd
 
     cp.updated_at = datetime.now().isoformat()
     db.commit()
+    bump_versions("customer_products")
     db.refresh(cp)
     return cp
 
@@ -896,8 +2179,209 @@ def delete_customer_product(customer_product_id: int, db: Session = Depends(get_
 
     db.delete(cp)
     db.commit()
+    bump_versions("customer_products")
     return {"message": "Customer-product relationship deleted successfully"}
 
+# ==================== Segment Endpoints ====================
+
+class SegmentFilter(BaseModel):
+    filter: dict
+
+class SegmentCreate(SegmentFilter):
+    name: str
+    description: Optional[str] = None
+
+class SegmentUpdate(SegmentCreate):
+    pass
+
+# Tables a segment filter can read; their versions key the count cache
+SEGMENT_TABLES = ("contacts", "relationships", "customer_products", "products", "campaign_contacts", "campaigns")
+SEGMENT_SORTS = ["id", "name", "created_at"]
+SEGMENT_CONTACT_SORTS = ["id", "full_name", "created_at"]
+
+# Saved segment counts, reused until a write to one of SEGMENT_TABLES; the
+# TTL bounds staleness where versions are only counted in process
+SEGMENT_COUNT_TTL_SECONDS = 300
+_segment_counts = {}  # segment id -> (table versions, filter JSON, computed at, count)
+_segment_counts_lock = threading.Lock()
+
+def compile_segment(segment_filter: dict, build):
+    """Build a segments.py query, turning filter errors into 400s"""
+    try:
+        return build(segment_filter)
+    except segments.SegmentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def saved_segment_counts(db: AsyncSession, versions: tuple, saved) -> dict:
+    """
+    {segment id: matching contacts} for saved segments, given the versions
+    of SEGMENT_TABLES.
+
+    Cached counts are reused while the tables are unchanged; the rest are
+    counted together in one statement of scalar subqueries.
+    """
+    now = time.monotonic()
+
+    counts, stale = {}, []
+    with _segment_counts_lock:
+        for segment in saved:
+            entry = _segment_counts.get(segment.id)
+            if entry and entry[:2] == (versions, segment.filter) and now - entry[2] <= SEGMENT_COUNT_TTL_SECONDS:
+                counts[segment.id] = entry[3]
+            else:
+                stale.append(segment)
+
+    if stale:
+        row = (await db.execute(select(*[
+            segments.count_query(json.loads(segment.filter)).scalar_subquery() for segment in stale
+        ]))).one()
+        with _segment_counts_lock:
+            for segment, count in zip(stale, row):
+                counts[segment.id] = count
+                _segment_counts[segment.id] = (versions, segment.filter, now, count)
+
+    return counts
+
+def segment_response(segment, count: Optional[int] = None) -> dict:
+    return {
+        "id": segment.id,
+        "name": segment.name,
+        "description": segment.description,
+        "filter": json.loads(segment.filter),
+        "count": count,
+        "created_at": segment.created_at,
+        "updated_at": segment.updated_at
+    }
+
+async def segment_contacts_page(db: AsyncSession, response: Response, segment_filter: dict,
+                                sort: str, cursor: Optional[str], limit: int, fields: Optional[str]):
+    """One page of the contacts matching a filter, as get_contacts returns them"""
+    selected = parse_fields(fields, CONTACT_FIELDS)
+    query = compile_segment(segment_filter, segments.contacts_query).options(
+        load_only(*[getattr(Contact, f) for f in selected])
+    )
+    contacts, next_cursor = await paginate(db, query, Contact, sort, cursor, limit, SEGMENT_CONTACT_SORTS)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [project(c, selected) for c in contacts]
+
+@app.post("/api/segments/count")
+async def count_segment(query: SegmentFilter, db: AsyncSession = Depends(get_async_db)):
+    """Count the contacts matching a filter, for live previews while it is edited"""
+    return {"count": await db.scalar(compile_segment(query.filter, segments.count_query))}
+
+@app.post("/api/segments/contacts")
+async def list_segment_contacts(
+    query: SegmentFilter,
+    response: Response,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a page of the contacts matching a filter.
+
+    Paged like GET /api/contacts: order by sort, restrict columns with fields
+    and follow the cursor in the X-Next-Cursor header.
+    """
+    return await segment_contacts_page(db, response, query.filter, sort, cursor, limit, fields)
+
+@app.get("/api/segments", dependencies=[Depends(conditional_get("segments", *SEGMENT_TABLES))])
+async def get_segments(
+    request: Request,
+    response: Response,
+    sort: str = "name",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of saved segments with their (cached) counts"""
+    saved, next_cursor = await paginate(db, select(Segment), Segment, sort, cursor, limit, SEGMENT_SORTS)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    counts = await saved_segment_counts(db, request_versions(request, SEGMENT_TABLES), saved)
+    return [segment_response(segment, counts[segment.id]) for segment in saved]
+
+@app.post("/api/segments")
+def create_segment(segment: SegmentCreate, db: Session = Depends(get_db)):
+    """Save a filter as a named segment"""
+    compile_segment(segment.filter, segments.compile_filter)
+
+    db_segment = Segment(name=segment.name, description=segment.description, filter=json.dumps(segment.filter))
+    db.add(db_segment)
+    db.commit()
+    bump_versions("segments")
+    db.refresh(db_segment)
+    return segment_response(db_segment)
+
+@app.get(
+    "/api/segments/{segment_id}",
+    dependencies=[Depends(conditional_get("segments", *SEGMENT_TABLES))]
+)
+async def get_segment(segment_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get a saved segment with its (cached) count"""
+    segment = await db.get(Segment, segment_id)
+    if not segment:
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    counts = await saved_segment_counts(db, request_versions(request, SEGMENT_TABLES), [segment])
+    return segment_response(segment, counts[segment.id])
+
+@app.put("/api/segments/{segment_id}")
+def update_segment(segment_id: int, segment: SegmentUpdate, db: Session = Depends(get_db)):
+    """Update a saved segment"""
+    db_segment = db.get(Segment, segment_id)
+    if not db_segment:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    compile_segment(segment.filter, segments.compile_filter)
+
+    db_segment.name = segment.name
+    db_segment.description = segment.description
+    db_segment.filter = json.dumps(segment.filter)
+    db_segment.updated_at = datetime.now().isoformat()
+    db.commit()
+    bump_versions("segments")
+    db.refresh(db_segment)
+    return segment_response(db_segment)
+
+@app.delete("/api/segments/{segment_id}")
+def delete_segment(segment_id: int, db: Session = Depends(get_db)):
+    """Delete a saved segment"""
+    segment = db.get(Segment, segment_id)
+    if not segment:
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    db.delete(segment)
+    db.commit()
+    bump_versions("segments")
+    with _segment_counts_lock:
+        _segment_counts.pop(segment_id, None)
+    return {"message": "Segment deleted successfully"}
+
+@app.get(
+    "/api/segments/{segment_id}/contacts",
+    dependencies=[Depends(conditional_get("segments", *SEGMENT_TABLES))]
+)
+async def get_segment_contacts(
+    segment_id: int,
+    response: Response,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of the contacts in a saved segment"""
+    segment = await db.get(Segment, segment_id)
+    if not segment:
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    return await segment_contacts_page(db, response, json.loads(segment.filter), sort, cursor, limit, fields)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
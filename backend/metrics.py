@@ -0,0 +1,208 @@
+"""
+Prometheus metrics for HTTP requests and database work
+
+MetricsMiddleware records, per route template (/api/contacts/{contact_id},
+not the raw path), request latency, requests in flight and response sizes.
+SQL statements are counted with cursor execute and handle_error listeners on the
+engines, attributed to the request that ran them, and observed per request:
+an endpoint that starts issuing one query per row shows up as a jump in
+crm_db_statements_per_request for its route.
+
+Connection pool and entity cache figures are exported alongside, read from
+the same sources as the diagnostics endpoints when /metrics is scraped.
+"""
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Label for requests that matched no route, so unknown paths can't create new series
+UNMATCHED_ROUTE = "<unmatched>"
+
+STATEMENT_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000]
+DB_TIME_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+SIZE_BUCKETS = [100, 1000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+REQUEST_LATENCY = Histogram(
+    "crm_http_request_duration_seconds", "Time to send the full response",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "crm_http_requests_in_progress", "Requests being handled",
+    ["method", "route"]
+)
+RESPONSE_SIZE = Histogram(
+    "crm_http_response_size_bytes", "Response body size",
+    ["method", "route"], buckets=SIZE_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "crm_db_statements_per_request", "SQL statements executed while handling a request",
+    ["method", "route"], buckets=STATEMENT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "crm_db_time_per_request_seconds", "Time spent executing SQL while handling a request",
+    ["method", "route"], buckets=DB_TIME_BUCKETS
+)
+STATEMENTS = Counter(
+    "crm_db_statements", "SQL statements executed, including those outside requests",
+    ["engine"]
+)
+
+class RequestDatabaseUsage:
+    """SQL statement count and execution time for one request"""
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+# Set by the middleware; shared with threadpool workers and the async
+# engine's greenlets because both run in a copy of the request's context
+_request_usage: ContextVar = ContextVar("crm_request_db_usage", default=None)
+
+def current_usage():
+    """The running request's database usage, or None outside a request"""
+    return _request_usage.get()
+
+def instrument_engine(engine, name: str):
+    """
+    Count and time every statement the engine executes.
+
+    Pass async_engine.sync_engine for async engines. Statements that raise
+    are counted and timed too.
+    """
+    statements = STATEMENTS.labels(engine=name)
+
+    def record(started):
+        elapsed = time.perf_counter() - started
+        statements.inc()
+        usage = _request_usage.get()
+        if usage is not None:
+            usage.statements += 1
+            usage.seconds += elapsed
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("crm_query_start", []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record(conn.info["crm_query_start"].pop()[1])
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Errors raised before the cursor ran (connecting, compiling) pushed nothing
+        conn, context = exception_context.connection, exception_context.execution_context
+        starts = conn.info.get("crm_query_start") if conn is not None else None
+        if starts and context is not None and starts[-1][0] is context:
+            record(starts.pop()[1])
+
+def route_template(app, scope) -> str:
+    """The path template of the route that will handle this request"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """ASGI middleware recording the HTTP and per-request database metrics"""
+
+    def __init__(self, app, router_app):
+        self.app = app
+        self.router_app = router_app  # the FastAPI app whose routes name requests
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.router_app, scope)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method, route=route)
+        usage = RequestDatabaseUsage()
+        token = _request_usage.set(usage)
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_usage.reset(token)
+            REQUEST_LATENCY.labels(method=method, route=route, status=str(status)).observe(elapsed)
+            RESPONSE_SIZE.labels(method=method, route=route).observe(size)
+            REQUEST_STATEMENTS.labels(method=method, route=route).observe(usage.statements)
+            REQUEST_DB_TIME.labels(method=method, route=route).observe(usage.seconds)
+
+class _StatsCollector:
+    """Exports pool_metrics() and entity cache stats at scrape time"""
+
+    def __init__(self, pool_metrics, cache_stats):
+        self.pool_metrics = pool_metrics
+        self.cache_stats = cache_stats
+
+    def collect(self):
+        checked_out = GaugeMetricFamily(
+            "crm_db_pool_checked_out", "Connections currently checked out", labels=["pool"]
+        )
+        peak = GaugeMetricFamily(
+            "crm_db_pool_peak_checked_out", "Most connections checked out at once", labels=["pool"]
+        )
+        capacity = GaugeMetricFamily(
+            "crm_db_pool_capacity", "Pool size plus overflow", labels=["pool"]
+        )
+        checkouts = CounterMetricFamily(
+            "crm_db_pool_checkouts", "Connection checkouts", labels=["pool"]
+        )
+        timeouts = CounterMetricFamily(
+            "crm_db_pool_timeouts", "Checkouts that timed out waiting for a connection", labels=["pool"]
+        )
+        wait = CounterMetricFamily(
+            "crm_db_pool_wait_seconds", "Total time spent waiting for a connection", labels=["pool"]
+        )
+        for name, pool in self.pool_metrics().items():
+            if "checkouts" not in pool:
+                continue
+            checked_out.add_metric([name], pool["checked_out"])
+            peak.add_metric([name], pool["peak_checked_out"])
+            capacity.add_metric([name], pool["size"] + max(pool["max_overflow"], 0))
+            checkouts.add_metric([name], pool["checkouts"])
+            timeouts.add_metric([name], pool["timeouts"])
+            wait.add_metric([name], pool["wait_seconds_total"])
+        yield from (checked_out, peak, capacity, checkouts, timeouts, wait)
+
+        stats = self.cache_stats()
+        yield GaugeMetricFamily("crm_entity_cache_size", "Rows in the entity cache", value=stats["size"])
+        for counter in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            yield CounterMetricFamily(
+                f"crm_entity_cache_{counter}", f"Entity cache {counter}", value=stats[counter]
+            )
+
+_stats_collector = None
+
+def register_stats(pool_metrics, cache_stats):
+    """Export pool and entity cache figures; later calls replace the sources"""
+    global _stats_collector
+    if _stats_collector is not None:
+        REGISTRY.unregister(_stats_collector)
+    _stats_collector = _StatsCollector(pool_metrics, cache_stats)
+    REGISTRY.register(_stats_collector)
+
+def render():
+    """(body, content type) of the Prometheus text exposition"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
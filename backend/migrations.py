@@ -0,0 +1,210 @@
+"""
+Versioned schema migrations
+
+Base.metadata.create_all only creates missing tables, so changes to
+existing tables go here. Each migration runs once, in version order, in
+its own transaction, and is recorded in the schema_migrations table.
+Fresh databases get the same schema from the models, so every migration
+must be a no-op when its change is already in place (hence IF NOT EXISTS).
+
+Pending migrations are applied at startup. From the command line:
+    python migrations.py              apply pending migrations
+    python migrations.py --status     list applied and pending migrations
+    python migrations.py --check-plans
+        check that each hot endpoint query is answered from an index
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from dedup import EMAIL_KEY_SQL, PHONE_KEY_SQL
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+MIGRATIONS = [
+    (1, "customer_products(product_id, status) index", [
+        "CREATE INDEX IF NOT EXISTS ix_customer_products_product_status "
+        "ON customer_products (product_id, status)",
+    ]),
+    (2, "campaign_contacts(campaign_id, response_status) index", [
+        "CREATE INDEX IF NOT EXISTS ix_campaign_contacts_campaign_status "
+        "ON campaign_contacts (campaign_id, response_status)",
+    ]),
+    (3, "unique relationships(from_contact_id, to_contact_id)", [
+        # Keep the oldest of any duplicate links so the unique index can be built
+        "DELETE FROM relationships WHERE id NOT IN ("
+        "SELECT min(id) FROM relationships GROUP BY from_contact_id, to_contact_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_relationships_from_to "
+        "ON relationships (from_contact_id, to_contact_id)",
+    ]),
+    (4, "customer_products(contact_id, product_id, status) index", [
+        "CREATE INDEX IF NOT EXISTS ix_customer_products_contact_product_status "
+        "ON customer_products (contact_id, product_id, status)",
+    ]),
+    # Also declared with index=True on Contact.contact_type, which only covers
+    # fresh databases: create_all skips existing tables along with their
+    # indexes, so databases created before the index existed need this
+    (5, "contacts(contact_type) index", [
+        "CREATE INDEX IF NOT EXISTS ix_contacts_contact_type ON contacts (contact_type)",
+    ]),
+    (6, "campaign_contacts(campaign_id, contact_id) index", [
+        "CREATE INDEX IF NOT EXISTS ix_campaign_contacts_campaign_contact "
+        "ON campaign_contacts (campaign_id, contact_id)",
+    ]),
+    (7, "contacts(lower(email)) index", [
+        "CREATE INDEX IF NOT EXISTS ix_contacts_email_lower ON contacts (lower(email))",
+    ]),
+    (8, "contacts phone key index", [
+        f"CREATE INDEX IF NOT EXISTS ix_contacts_phone_key ON contacts ({PHONE_KEY_SQL})",
+    ]),
+    # Replaces the index from migration 2, which is a prefix of this one
+    (9, "campaign_contacts(campaign_id, response_status, response_date) index", [
+        "CREATE INDEX IF NOT EXISTS ix_campaign_contacts_campaign_status_date "
+        "ON campaign_contacts (campaign_id, response_status, response_date)",
+        "DROP INDEX IF EXISTS ix_campaign_contacts_campaign_status",
+    ]),
+    (10, "contacts email key index", [
+        f"CREATE INDEX IF NOT EXISTS ix_contacts_email_key ON contacts ({EMAIL_KEY_SQL})",
+    ]),
+]
+
+# Representative queries behind the hot endpoints, with sample parameters
+HOT_QUERIES = {
+    "campaign stats by status": (
+        "SELECT campaign_id, response_status, count(id) FROM campaign_contacts "
+        "WHERE campaign_id IN (:a, :b) GROUP BY campaign_id, response_status",
+        {"a": 1, "b": 2},
+    ),
+    "campaign contacts by status": (
+        "SELECT * FROM campaign_contacts WHERE campaign_id = :campaign_id AND response_status = :status",
+        {"campaign_id": 1, "status": "pending"},
+    ),
+    "campaign enrollment check": (
+        "SELECT 1 FROM campaign_contacts WHERE campaign_id = :campaign_id AND contact_id = :contact_id",
+        {"campaign_id": 1, "contact_id": 1},
+    ),
+    "outgoing relationships": (
+        "SELECT * FROM relationships WHERE from_contact_id IN (:a, :b)",
+        {"a": 1, "b": 2},
+    ),
+    "incoming relationships": (
+        "SELECT * FROM relationships WHERE to_contact_id IN (:a, :b)",
+        {"a": 1, "b": 2},
+    ),
+    "relationship exists": (
+        "SELECT id FROM relationships WHERE from_contact_id = :from_id AND to_contact_id = :to_id",
+        {"from_id": 1, "to_id": 2},
+    ),
+    "customer product duplicate check": (
+        "SELECT id FROM customer_products "
+        "WHERE contact_id = :contact_id AND product_id = :product_id AND status = :status",
+        {"contact_id": 1, "product_id": 1, "status": "active"},
+    ),
+    "product customer counts": (
+        "SELECT product_id, status, count(id) FROM customer_products "
+        "WHERE product_id IN (:a, :b) GROUP BY product_id, status",
+        {"a": 1, "b": 2},
+    ),
+    "contacts by email": (
+        "SELECT id FROM contacts WHERE lower(email) IN (:a, :b)",
+        {"a": "a@example.com", "b": "b@example.com"},
+    ),
+    "contact duplicate check": (
+        f"SELECT * FROM (SELECT id FROM contacts WHERE {EMAIL_KEY_SQL} = :email ORDER BY id LIMIT 50) "
+        f"UNION SELECT * FROM (SELECT id FROM contacts WHERE {PHONE_KEY_SQL} = :phone ORDER BY id LIMIT 50) "
+        "UNION SELECT * FROM (SELECT id FROM contacts WHERE full_name = :name ORDER BY id LIMIT 50)",
+        {"email": "a@example.com", "phone": "07700900123", "name": "Jane Smith"},
+    ),
+    "contacts by type": (
+        "SELECT contact_type, count(id) FROM contacts GROUP BY contact_type",
+        {},
+    ),
+    "organisations": (
+        "SELECT * FROM contacts WHERE contact_type IN ('business', 'estate') ORDER BY id LIMIT 100",
+        {},
+    ),
+}
+
+def _ensure_migrations_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+    ))
+
+def applied_versions(engine):
+    """Versions already recorded in schema_migrations"""
+    with engine.begin() as conn:
+        _ensure_migrations_table(conn)
+        return {row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+def migrate(engine):
+    """Apply pending migrations in order; returns the versions applied"""
+    done = applied_versions(engine)
+    applied = []
+
+    for version, name, statements in sorted(MIGRATIONS):
+        if version in done:
+            continue
+
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.now().isoformat()}
+            )
+        applied.append(version)
+
+    return applied
+
+def check_query_plans(engine):
+    """
+    Run EXPLAIN QUERY PLAN over HOT_QUERIES (SQLite only).
+
+    Returns {query name: [plan details that scan a table without an index]};
+    an empty list means the query is fully index-backed. A scan in rowid
+    order passes when the query has a LIMIT and nothing is sorted, since it
+    stops after the first LIMIT matching rows.
+    """
+    problems = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+            stops_early = " LIMIT " in sql.upper() and not any("TEMP B-TREE" in detail for detail in plan)
+            problems[name] = [
+                detail for detail in plan
+                if detail.startswith("SCAN") and not detail.startswith("SCAN (subquery")
+                and "INDEX" not in detail and not stops_early
+            ]
+    return problems
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage database schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--check-plans", action="store_true", help="check hot queries use an index")
+    args = parser.parse_args()
+
+    # Not from main, which applies pending migrations as it is imported
+    from database import engine
+
+    if args.status:
+        done = applied_versions(engine)
+        for version, name, _ in sorted(MIGRATIONS):
+            print(f"{'applied' if version in done else 'pending'}  {version:3d}  {name}")
+    elif args.check_plans:
+        if engine.dialect.name != "sqlite":
+            raise SystemExit("Query plan checks are only supported on SQLite")
+
+        failures = 0
+        for name, scans in check_query_plans(engine).items():
+            print(f"{'FAIL' if scans else 'ok  '}  {name}" + (f": {'; '.join(scans)}" if scans else ""))
+            failures += bool(scans)
+        if failures:
+            raise SystemExit(1)
+    else:
+        names = {version: name for version, name, _ in MIGRATIONS}
+        for version in migrate(engine):
+            print(f"applied  {version:3d}  {names[version]}")
+        print(f"Schema is at version {max(applied_versions(engine), default=0)}")
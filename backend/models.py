@@ -0,0 +1,142 @@
+"""
+Database models
+
+Kept apart from main.py so scripts such as seed.py can use the tables
+without creating the FastAPI app.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Float, Index, Integer, String, Text, func, text
+from sqlalchemy.ext.declarative import declarative_base
+
+from dedup import EMAIL_KEY_SQL, PHONE_KEY_SQL
+
+Base = declarative_base()
+
+class Contact(Base):
+    __tablename__ = "contacts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    full_name = Column(String, index=True)
+    contact_type = Column(String, index=True)  # individual, business, estate
+    email = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    company_name = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+
+    __table_args__ = (
+        # Case-insensitive email lookups
+        Index("ix_contacts_email_lower", func.lower(email)),
+        # Emails and phone numbers however they were written, for duplicate checks
+        Index("ix_contacts_email_key", text(EMAIL_KEY_SQL)),
+        Index("ix_contacts_phone_key", text(PHONE_KEY_SQL)),
+    )
+
+class Relationship(Base):
+    __tablename__ = "relationships"
+
+    id = Column(Integer, primary_key=True, index=True)
+    from_contact_id = Column(Integer, index=True)
+    to_contact_id = Column(Integer, index=True)
+    relationship_type = Column(String)  # works_for, member_of, manages
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+
+    __table_args__ = (
+        Index("uq_relationships_from_to", "from_contact_id", "to_contact_id", unique=True),
+    )
+
+class Campaign(Base):
+    __tablename__ = "campaigns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    description = Column(Text, nullable=True)
+    channel = Column(String)  # email, phone, mail
+    send_date = Column(String)
+    status = Column(String)  # draft, sent, completed
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+
+class CampaignContact(Base):
+    __tablename__ = "campaign_contacts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, index=True)
+    contact_id = Column(Integer, index=True)
+    response_status = Column(String)  # pending, responded, converted, not_interested
+    response_date = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+
+    __table_args__ = (
+        # response_date last so the campaign_stats triggers find a status's latest date by a seek
+        Index("ix_campaign_contacts_campaign_status_date", "campaign_id", "response_status", "response_date"),
+        Index("ix_campaign_contacts_campaign_contact", "campaign_id", "contact_id"),
+    )
+
+class Product(Base):
+    __tablename__ = "products"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    description = Column(Text, nullable=True)
+    status = Column(String)  # active, inactive, archived
+    product_type = Column(String, nullable=True)  # Freeform text
+    version = Column(Integer, default=1)
+    parent_product_id = Column(Integer, nullable=True, index=True)  # Links to previous version
+    effective_date = Column(String)
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+    updated_at = Column(String, default=lambda: datetime.now().isoformat())
+    base_price = Column(String, nullable=True)
+    currency = Column(String, nullable=True, default="GBP")
+    billing_frequency = Column(String, nullable=True)
+
+class CustomerProduct(Base):
+    __tablename__ = "customer_products"
+
+    id = Column(Integer, primary_key=True, index=True)
+    contact_id = Column(Integer, index=True)
+    product_id = Column(Integer, index=True)
+    status = Column(String)  # active, ended, cancelled, suspended
+    start_date = Column(String)
+    end_date = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+    updated_at = Column(String, default=lambda: datetime.now().isoformat())
+    actual_price = Column(String, nullable=True)
+    renewal_date = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Per-product customer counts by status
+        Index("ix_customer_products_product_status", "product_id", "status"),
+        # Duplicate-assignment checks and per-contact product lookups
+        Index("ix_customer_products_contact_product_status", "contact_id", "product_id", "status"),
+    )
+
+class Segment(Base):
+    """A saved audience filter; see segments.py for the filter language"""
+    __tablename__ = "segments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    description = Column(Text, nullable=True)
+    filter = Column(Text)  # JSON
+    created_at = Column(String, default=lambda: datetime.now().isoformat())
+    updated_at = Column(String, default=lambda: datetime.now().isoformat())
+
+class CampaignStat(Base):
+    """Per-campaign, per-status counters maintained by campaign_summary triggers"""
+    __tablename__ = "campaign_stats"
+
+    campaign_id = Column(Integer, primary_key=True)
+    response_status = Column(String, primary_key=True)
+    contact_count = Column(Integer, default=0)
+    last_response_date = Column(String, nullable=True)
+
+class TableVersion(Base):
+    """Per-table write counters maintained by table_versions triggers"""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, default=0)
+    modified_at = Column(Float)  # Unix time of the last write
@@ -0,0 +1,283 @@
+"""
+In-process adjacency index over relationships
+
+Edges are held in compressed sparse row form: parallel arrays of
+relationship id, source, target and interned type, sorted by id, plus
+forward and reverse offset/slot arrays indexed by contact id, so a
+contact's links are one slice away and a million relationships take tens
+of megabytes rather than a dict per edge. Relationships created after the
+arrays were built live in a small overlay and deleted ones are masked; the
+arrays are rebuilt in memory once the overlay grows past an eighth of them.
+The write that crosses that line copies the overlay under the lock and
+rebuilds outside it, so lookups are not held up, then swaps the new arrays
+in and replays the patches made meanwhile.
+
+The index mirrors the relationships table, including links whose contacts
+have since been deleted, exactly as the SQL queries it replaces see it.
+Write endpoints patch it after committing, so changes made outside the API
+are only picked up by load(), e.g. after a restart.
+
+Patches that arrive while load() is reading the table are replayed on top
+of the freshly built arrays once it finishes, as are those that arrive
+during a compaction; add() and remove() are idempotent, so replaying one
+already in the snapshot is harmless.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+def _offsets(keys, size):
+    """CSR offsets and slots grouping edge slots by key (a contact id)"""
+    offsets = array("q", bytes(8 * (size + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    slots = array("q", bytes(8 * len(keys)))
+    fill = array("q", offsets)
+    for slot, key in enumerate(keys):
+        slots[fill[key]] = slot
+        fill[key] += 1
+    return offsets, slots
+
+class RelationshipIndex:
+    def __init__(self, compact_ratio: float = 0.125):
+        self.compact_ratio = compact_ratio
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._pending = None  # patches seen during load(), replayed afterwards
+        self._compacting = None  # patches seen during a compaction, replayed afterwards
+        self._generation = 0  # bumped by load(), so a compaction overlapping one is dropped
+        self._types = []
+        self._type_codes = {}
+        self._build([])
+
+    def _type_code(self, relationship_type):
+        code = self._type_codes.get(relationship_type)
+        if code is None:
+            code = self._type_codes[relationship_type] = len(self._types)
+            self._types.append(relationship_type)
+        return code
+
+    @staticmethod
+    def _arrays(edges) -> dict:
+        """Index state for edges: (id, from, to, type code) sorted by id"""
+        ids = array("q", (edge[0] for edge in edges))
+        sources = array("q", (edge[1] for edge in edges))
+        targets = array("q", (edge[2] for edge in edges))
+        size = max(max(sources, default=0), max(targets, default=0)) + 1
+        out_offsets, out_slots = _offsets(sources, size)
+        in_offsets, in_slots = _offsets(targets, size)
+        return {
+            "_ids": ids, "_from": sources, "_to": targets,
+            "_type": array("H", (edge[3] for edge in edges)),
+            "_out_offsets": out_offsets, "_out_slots": out_slots,
+            "_in_offsets": in_offsets, "_in_slots": in_slots,
+            "_removed": set(),  # base slots deleted since the build
+            "_extra": {},       # relationship id -> (from, to, type code)
+            "_extra_out": {},   # contact id -> [relationship id]
+            "_extra_in": {},
+        }
+
+    def _build(self, edges):
+        self.__dict__.update(self._arrays(edges))
+
+    def begin_load(self):
+        """Start queueing patches; call before reading the table for load()"""
+        with self._lock:
+            self._pending = []
+
+    def load(self, rows):
+        """
+        Rebuild from (id, from_contact_id, to_contact_id, relationship_type) rows.
+
+        The arrays are built without holding the lock, so lookups keep being
+        answered from the previous state meanwhile. Call begin_load() before
+        running the query that produces rows so that writes committed
+        meanwhile are not lost.
+        """
+        types, type_codes = [], {}
+        edges = []
+        for rel_id, source, target, rel_type in rows:
+            code = type_codes.get(rel_type)
+            if code is None:
+                code = type_codes[rel_type] = len(types)
+                types.append(rel_type)
+            edges.append((rel_id, source, target, code))
+        edges.sort()
+        state = self._arrays(edges)
+
+        with self._lock:
+            self.__dict__.update(state, _types=types, _type_codes=type_codes)
+            self._generation += 1
+            pending, self._pending = self._pending or [], None
+            for patch, args in pending:
+                patch(*args)
+            self.loaded = True
+
+    def _compaction_snapshot(self):
+        """
+        What _compact() needs, if the overlay has outgrown the arrays and no
+        compaction is running yet; call with the lock held. The arrays are
+        never changed after a build, so only the overlay is copied.
+        """
+        if self._compacting is not None:
+            return None
+        if len(self._extra) + len(self._removed) <= max(1024, len(self._ids) * self.compact_ratio):
+            return None
+        self._compacting = []
+        return (self._generation, self._ids, self._from, self._to, self._type,
+                set(self._removed), dict(self._extra))
+
+    def _compact(self, snapshot):
+        """Rebuild the arrays from a snapshot without holding the lock, then swap them in"""
+        generation, ids, sources, targets, types, removed, extra = snapshot
+        try:
+            edges = [(ids[slot], sources[slot], targets[slot], types[slot])
+                     for slot in range(len(ids)) if slot not in removed]
+            edges.extend((rel_id, *edge) for rel_id, edge in extra.items())
+            edges.sort()
+            state = self._arrays(edges)
+        except BaseException:
+            with self._lock:
+                self._compacting = None
+            raise
+
+        with self._lock:
+            pending, self._compacting = self._compacting, None
+            if generation != self._generation:
+                return  # load() replaced everything meanwhile
+            self.__dict__.update(state)
+            for patch, args in pending:
+                patch(*args)
+
+    def _record(self, patch, args):
+        """Queue a patch for replay after a running load() or compaction; call with the lock held"""
+        if self._pending is not None:
+            self._pending.append((patch, args))
+        if self._compacting is not None:
+            self._compacting.append((patch, args))
+
+    def _slot(self, relationship_id):
+        slot = bisect_left(self._ids, relationship_id)
+        if slot < len(self._ids) and self._ids[slot] == relationship_id and slot not in self._removed:
+            return slot
+        return None
+
+    def add(self, relationship_id, from_contact_id, to_contact_id, relationship_type):
+        """Record a committed relationship"""
+        args = (relationship_id, from_contact_id, to_contact_id, relationship_type)
+        with self._lock:
+            self._record(self._add, args)
+            self._add(*args)
+            snapshot = self._compaction_snapshot()
+        if snapshot:
+            self._compact(snapshot)
+
+    def _add(self, relationship_id, from_contact_id, to_contact_id, relationship_type):
+        if relationship_id in self._extra or self._slot(relationship_id) is not None:
+            return
+        self._extra[relationship_id] = (from_contact_id, to_contact_id, self._type_code(relationship_type))
+        self._extra_out.setdefault(from_contact_id, []).append(relationship_id)
+        self._extra_in.setdefault(to_contact_id, []).append(relationship_id)
+
+    def remove(self, relationship_id):
+        """Record a deleted relationship"""
+        with self._lock:
+            self._record(self._remove, (relationship_id,))
+            self._remove(relationship_id)
+            snapshot = self._compaction_snapshot()
+        if snapshot:
+            self._compact(snapshot)
+
+    def _remove(self, relationship_id):
+        edge = self._extra.pop(relationship_id, None)
+        if edge is not None:
+            self._extra_out[edge[0]].remove(relationship_id)
+            self._extra_in[edge[1]].remove(relationship_id)
+            return
+        slot = self._slot(relationship_id)
+        if slot is not None:
+            self._removed.add(slot)
+
+    def _edges(self, contact_id, incoming):
+        """(relationship id, other contact id, type code) for one side of a contact"""
+        offsets, slots = (self._in_offsets, self._in_slots) if incoming else (self._out_offsets, self._out_slots)
+        others = self._from if incoming else self._to
+        if 0 <= contact_id < len(offsets) - 1:
+            for slot in slots[offsets[contact_id]:offsets[contact_id + 1]]:
+                if slot not in self._removed:
+                    yield self._ids[slot], others[slot], self._type[slot]
+        for rel_id in (self._extra_in if incoming else self._extra_out).get(contact_id, ()):
+            source, target, code = self._extra[rel_id]
+            yield rel_id, source if incoming else target, code
+
+    def _type_filter(self, types):
+        """Type codes to keep, or None for every type"""
+        if types is None:
+            return None
+        return {self._type_codes[t] for t in types if t in self._type_codes}
+
+    def linked_counts(self, contact_ids):
+        """{contact id: incoming relationship count} for contacts with any"""
+        counts = {}
+        with self._lock:
+            for contact_id in contact_ids:
+                count = sum(1 for _ in self._edges(contact_id, incoming=True))
+                if count:
+                    counts[contact_id] = count
+        return counts
+
+    def component(self, contact_id, types=None, limit=None):
+        """
+        Contacts linked to contact_id by any chain of relationships.
+
+        Links are followed in both directions, optionally only those of the
+        given types. Returns (contact ids in breadth-first order starting
+        with contact_id, complete), stopping early once limit ids are found.
+        """
+        with self._lock:
+            codes = self._type_filter(types)
+            seen = {contact_id}
+            order = [contact_id]
+            queue = deque(order)
+            while queue:
+                current = queue.popleft()
+                for incoming in (False, True):
+                    for _, other, code in self._edges(current, incoming):
+                        if other in seen or (codes is not None and code not in codes):
+                            continue
+                        if limit is not None and len(order) >= limit:
+                            return order, False
+                        seen.add(other)
+                        order.append(other)
+                        queue.append(other)
+        return order, True
+
+    def edges_between(self, contact_ids, types=None):
+        """[(relationship id, from, to, type)] with both ends in contact_ids, ordered by id"""
+        contact_ids = set(contact_ids)
+        with self._lock:
+            codes = self._type_filter(types)
+            edges = [(rel_id, source, target, self._types[code])
+                     for source in contact_ids
+                     for rel_id, target, code in self._edges(source, incoming=False)
+                     if target in contact_ids and (codes is None or code in codes)]
+        edges.sort()
+        return edges
+
+    def stats(self) -> dict:
+        with self._lock:
+            arrays = (self._ids, self._from, self._to, self._type,
+                      self._out_offsets, self._out_slots, self._in_offsets, self._in_slots)
+            return {
+                "loaded": self.loaded,
+                "relationships": len(self._ids) - len(self._removed) + len(self._extra),
+                "overlay_added": len(self._extra),
+                "overlay_removed": len(self._removed),
+                "compacting": self._compacting is not None,
+                "relationship_types": len(self._types),
+                "array_bytes": sum(a.itemsize * len(a) for a in arrays),
+            }
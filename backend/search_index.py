@@ -0,0 +1,135 @@
+"""
+SQLite FTS5 full-text index over contacts
+
+The contacts_fts virtual table mirrors full_name, email, company_name and
+notes from the contacts table (external content, so the text is not stored
+twice) and is kept in sync by triggers. Searches are ranked with bm25 and
+every term is prefix-matched, so "joh smi" finds "John Smith".
+
+Rebuild the index for an existing database with:
+    python search_index.py --rebuild
+"""
+import re
+
+from sqlalchemy import column, select, table, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "contacts_fts"
+
+# Columns in index order; weights feed bm25() so a name match outranks a notes match
+FTS_COLUMNS = ["full_name", "email", "company_name", "notes"]
+FTS_WEIGHTS = [10.0, 5.0, 5.0, 1.0]
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    {", ".join(FTS_COLUMNS)},
+    content='contacts',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+"""
+
+_new_values = ", ".join(f"new.{col}" for col in FTS_COLUMNS)
+_old_values = ", ".join(f"old.{col}" for col in FTS_COLUMNS)
+_column_list = ", ".join(FTS_COLUMNS)
+
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_column_list}) VALUES (new.id, {_new_values});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_column_list}) VALUES ('delete', old.id, {_old_values});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_column_list} ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_column_list}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {_column_list}) VALUES (new.id, {_new_values});
+    END
+    """,
+]
+
+SEARCH_SQL = f"""
+SELECT contacts.* FROM {FTS_TABLE}
+JOIN contacts ON contacts.id = {FTS_TABLE}.rowid
+WHERE {FTS_TABLE} MATCH :match
+ORDER BY bm25({FTS_TABLE}, {", ".join(str(w) for w in FTS_WEIGHTS)}), contacts.full_name
+LIMIT :limit
+"""
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+def _table_exists(conn, name):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+    ).first() is not None
+
+def ensure_search_index(engine):
+    """
+    Create the FTS table and sync triggers if they are missing.
+
+    A freshly created index is populated from the existing contacts. Returns
+    False when the database is not SQLite or was built without FTS5, in
+    which case callers should fall back to LIKE matching.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        with engine.begin() as conn:
+            created = not _table_exists(conn, FTS_TABLE)
+            conn.execute(text(CREATE_TABLE))
+            for trigger in CREATE_TRIGGERS:
+                conn.execute(text(trigger))
+            if created:
+                rebuild_search_index(conn)
+    except OperationalError:
+        return False
+
+    return True
+
+def rebuild_search_index(conn):
+    """Repopulate the index from the contacts table"""
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def build_match_query(q: str):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Each word becomes a quoted prefix term and all terms must match, so user
+    input can never inject FTS query syntax. Returns None if q has no words.
+    """
+    terms = _TERM_RE.findall(q.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def match_ids(match: str):
+    """select() of contact ids matching an expression from build_match_query"""
+    return select(column("rowid")).select_from(table(FTS_TABLE)).where(
+        text(f"{FTS_TABLE} MATCH :match").bindparams(match=match)
+    )
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the contacts full-text index")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index from the contacts table")
+    args = parser.parse_args()
+
+    # Not from main, which creates the tables and applies migrations as it is imported
+    from database import engine
+
+    if not ensure_search_index(engine):
+        raise SystemExit("FTS5 is not available for this database")
+
+    if args.rebuild:
+        with engine.begin() as conn:
+            rebuild_search_index(conn)
+        print("Rebuilt contacts full-text index")
+    else:
+        print("Contacts full-text index is in place")
@@ -0,0 +1,123 @@
+"""
+Seed the database with a reproducible synthetic dataset
+
+Generates contacts, relationships, campaigns with responses, products and
+customer products (see synthetic_data.py) and bulk-inserts them with Core
+executemany batches, one transaction per table. Only database.py and
+models.py are imported, never the web app.
+
+Secondary indexes and the full-text, campaign-summary and table-version
+triggers are dropped while loading and rebuilt once at the end, which is
+much faster than maintaining them row by row. The same --contacts and
+--seed always produce the same rows.
+
+    python seed.py                                  # 50 contacts for a demo
+    python seed.py --contacts 1000000 --reset       # large test database
+    python seed.py --contacts 100000 --seed 7 --batch-size 50000
+
+The database comes from CRM_DATABASE_URL, as for the app.
+"""
+import time
+
+from sqlalchemy import func, inspect, select, text
+
+import campaign_summary
+import migrations
+import search_index
+import table_versions
+from models import Base, Contact
+from synthetic_data import DEFAULT_BATCH_SIZE, DEFAULT_SEED, SyntheticDataset, load_dataset
+
+class DatabaseNotEmpty(Exception):
+    pass
+
+def reset_database(engine):
+    """Drop every table seed_database() fills"""
+    Base.metadata.drop_all(engine)
+
+def _drop_triggers(engine):
+    """
+    Drop the SQLite triggers on the model tables and the full-text index.
+
+    seed_database() reinstalls them afterwards through ensure_search_index(),
+    ensure_campaign_summary() and ensure_table_versions(), which rebuild the
+    index and summary from the loaded rows and bump the table versions
+    because they find them missing.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        names = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN "
+            f"({', '.join(repr(name) for name in Base.metadata.tables)})"
+        )).scalars().all()
+        for name in names:
+            conn.execute(text(f'DROP TRIGGER "{name}"'))
+        conn.execute(text(f"DROP TABLE IF EXISTS {search_index.FTS_TABLE}"))
+
+def seed_database(engine, dataset: SyntheticDataset, reset: bool = False, progress=None):
+    """
+    Fill an empty database with the dataset.
+
+    Raises DatabaseNotEmpty if there are already contacts, unless reset
+    drops the existing tables first. Returns {table name: rows inserted}.
+    """
+    if reset:
+        reset_database(engine)
+    elif inspect(engine).has_table(Contact.__tablename__):
+        with engine.connect() as conn:
+            if conn.scalar(select(func.count()).select_from(Contact)):
+                raise DatabaseNotEmpty("The database already has contacts")
+
+    Base.metadata.create_all(engine)
+    # By name, because the inspector used by checkfirst skips expression indexes
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    with engine.begin() as conn:
+        for index in indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+    _drop_triggers(engine)
+
+    counts = load_dataset(engine, Base.metadata.tables, dataset, progress)
+
+    for index in indexes:
+        index.create(engine)
+    migrations.migrate(engine)
+
+    search_index.ensure_search_index(engine)
+    campaign_summary.ensure_campaign_summary(engine)
+    table_versions.ensure_table_versions(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Seed the CRM database with synthetic data")
+    parser.add_argument("--contacts", type=int, default=50, help="number of contacts (default 50)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"random seed (default {DEFAULT_SEED})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per insert batch")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the tables first")
+    args = parser.parse_args()
+
+    from database import DATABASE_URL, engine
+
+    def progress(table, rows):
+        print(f"\r  {table:18s} {rows:>10,d}", end="", file=sys.stderr, flush=True)
+
+    print(f"Seeding {DATABASE_URL.render_as_string(hide_password=True)} "
+          f"with {args.contacts:,d} contacts (seed {args.seed})")
+    start = time.perf_counter()
+    try:
+        counts = seed_database(
+            engine, SyntheticDataset(args.contacts, args.seed, args.batch_size), args.reset, progress
+        )
+    except DatabaseNotEmpty as e:
+        raise SystemExit(f"{e}; rerun with --reset to replace them")
+    print("\r" + " " * 40 + "\r", end="", file=sys.stderr)
+
+    for table, rows in counts.items():
+        print(f"  {table:18s} {rows:>10,d}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,238 @@
+"""
+Audience segments: a JSON filter language over contacts
+
+A filter is a tree of conditions compiled into one WHERE clause on
+contacts, with an EXISTS subquery for each condition on a related table,
+so counting or listing a segment is always a single SQL statement.
+
+Combinators:
+    {"and": [filter, ...]}  {"or": [filter, ...]}  {"not": filter}
+
+Contact columns (see FIELDS and OPERATORS):
+    {"field": "contact_type", "op": "eq", "value": "individual"}
+    {"field": "email", "op": "contains", "value": "@example.com"}
+    {"field": "phone", "op": "is_null"}
+
+Relationships, optionally of some types and in one direction ("outgoing"
+from this contact, "incoming" to it, or "any"), with a filter on the
+contact at the other end:
+    {"related": {"type": "member_of", "direction": "outgoing",
+                 "where": {"field": "contact_type", "op": "eq", "value": "estate"}}}
+
+Products held, by product id, name or type and holding status (default
+"active"):
+    {"product": {"name": "Tax Services"}}
+
+Campaign enrollments, in given campaigns or the last N by send date, with
+given response statuses:
+    {"campaign": {"last": 2, "status": ["responded", "converted"]}}
+
+So "individuals linked to an estate, holding Tax Services, who didn't
+respond to the last two campaigns" is:
+    {"and": [
+        {"field": "contact_type", "op": "eq", "value": "individual"},
+        {"related": {"direction": "outgoing",
+                     "where": {"field": "contact_type", "op": "eq", "value": "estate"}}},
+        {"product": {"name": "Tax Services"}},
+        {"not": {"campaign": {"last": 2, "status": ["responded", "converted"]}}}
+    ]}
+
+Invalid filters raise SegmentError naming the offending part.
+"""
+from sqlalchemy import and_, func, literal, not_, or_, select
+from sqlalchemy.orm import aliased
+
+from models import Campaign, CampaignContact, Contact, CustomerProduct, Product, Relationship
+
+FIELDS = ["id", "full_name", "contact_type", "email", "phone", "company_name", "notes", "created_at"]
+
+# op -> whether it takes a value
+OPERATORS = {
+    "eq": True, "ne": True, "in": True, "not_in": True, "contains": True, "starts_with": True,
+    "gt": True, "gte": True, "lt": True, "lte": True, "is_null": False, "not_null": False,
+}
+
+DIRECTIONS = ["outgoing", "incoming", "any"]
+
+# Bounds on how expensive a filter can get
+MAX_DEPTH = 8
+MAX_CONDITIONS = 50
+MAX_LAST_CAMPAIGNS = 100
+
+class SegmentError(ValueError):
+    pass
+
+# SQLite integers are signed 64-bit
+_MIN_INT, _MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+def _int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and _MIN_INT <= value <= _MAX_INT
+
+def _scalar(value):
+    """Whether value can be compared with a column: a string or number, not a bool"""
+    return isinstance(value, (str, float)) or _int(value)
+
+def _strings(value, path):
+    """A string or list of strings as a list"""
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+        raise SegmentError(f"{path}: expected a string or a non-empty list of strings")
+    return values
+
+def _ids(value, path):
+    """An id or list of ids as a list"""
+    values = [value] if isinstance(value, int) else value
+    if not isinstance(values, list) or not values or not all(_int(v) for v in values):
+        raise SegmentError(f"{path}: expected an id or a non-empty list of ids")
+    return values
+
+def _options(spec, path, allowed):
+    if not isinstance(spec, dict):
+        raise SegmentError(f"{path}: expected an object")
+    unknown = sorted(set(spec) - set(allowed))
+    if unknown:
+        raise SegmentError(f"{path}: unknown keys {', '.join(unknown)}")
+    return spec
+
+class _Compiler:
+    def __init__(self):
+        self.conditions = 0
+
+    def compile(self, node, contact, path="filter", depth=0):
+        if depth > MAX_DEPTH:
+            raise SegmentError(f"{path}: filters nest at most {MAX_DEPTH} deep")
+        if not isinstance(node, dict) or ("field" not in node and len(node) != 1):
+            raise SegmentError(f"{path}: expected an object with one condition")
+        self.conditions += 1
+        if self.conditions > MAX_CONDITIONS:
+            raise SegmentError(f"filter: at most {MAX_CONDITIONS} conditions are allowed")
+
+        if "field" in node:
+            return self.field(node, contact, path)
+
+        (kind, spec), = node.items()
+        if kind in ("and", "or"):
+            if not isinstance(spec, list) or not spec:
+                raise SegmentError(f"{path}.{kind}: expected a non-empty list")
+            clauses = [
+                self.compile(child, contact, f"{path}.{kind}[{i}]", depth + 1) for i, child in enumerate(spec)
+            ]
+            return and_(*clauses) if kind == "and" else or_(*clauses)
+        if kind == "not":
+            return not_(self.compile(spec, contact, f"{path}.not", depth + 1))
+        if kind == "related":
+            return self.related(spec, contact, f"{path}.related", depth)
+        if kind == "product":
+            return self.product(spec, contact, f"{path}.product")
+        if kind == "campaign":
+            return self.campaign(spec, contact, f"{path}.campaign")
+        raise SegmentError(f"{path}: unknown condition {kind!r}")
+
+    def field(self, node, contact, path):
+        _options(node, path, ["field", "op", "value"])
+        name, op = node.get("field"), node.get("op", "eq")
+        if name not in FIELDS:
+            raise SegmentError(f"{path}: unknown field {name!r}")
+        if op not in OPERATORS:
+            raise SegmentError(f"{path}: unknown op {op!r}")
+        column = getattr(contact, name)
+
+        if not OPERATORS[op]:
+            return column.is_(None) if op == "is_null" else column.is_not(None)
+        if "value" not in node:
+            raise SegmentError(f"{path}: op {op!r} needs a value")
+        value = node["value"]
+
+        if op in ("in", "not_in"):
+            if not isinstance(value, list) or not value:
+                raise SegmentError(f"{path}: op {op!r} needs a non-empty list")
+            for i, item in enumerate(value):
+                if not _scalar(item):
+                    raise SegmentError(f"{path}.value[{i}]: expected a string or number")
+            return column.in_(value) if op == "in" else column.not_in(value)
+        if not _scalar(value):
+            raise SegmentError(f"{path}: op {op!r} needs a single string or number")
+        if op in ("contains", "starts_with"):
+            if not isinstance(value, str):
+                raise SegmentError(f"{path}: op {op!r} needs a string")
+            lowered = func.lower(column)
+            if op == "contains":
+                return lowered.contains(value.lower(), autoescape=True)
+            return lowered.startswith(value.lower(), autoescape=True)
+        return {
+            "eq": column.__eq__, "ne": column.__ne__, "gt": column.__gt__,
+            "gte": column.__ge__, "lt": column.__lt__, "lte": column.__le__,
+        }[op](value)
+
+    def related(self, spec, contact, path, depth):
+        _options(spec, path, ["type", "direction", "where"])
+        direction = spec.get("direction", "any")
+        if direction not in DIRECTIONS:
+            raise SegmentError(f"{path}.direction: expected one of {', '.join(DIRECTIONS)}")
+        types = _strings(spec["type"], f"{path}.type") if "type" in spec else None
+        where = spec.get("where")
+
+        def linked(outgoing):
+            rel, other = aliased(Relationship), aliased(Contact)
+            own, other_end = (
+                (rel.from_contact_id, rel.to_contact_id) if outgoing else (rel.to_contact_id, rel.from_contact_id)
+            )
+            query = select(literal(1)).select_from(rel).where(own == contact.id)
+            if types:
+                query = query.where(rel.relationship_type.in_(types))
+            if where is not None:
+                query = query.join(other, other.id == other_end).where(
+                    self.compile(where, other, f"{path}.where", depth + 1)
+                )
+            return query.exists()
+
+        if direction == "any":
+            return or_(linked(True), linked(False))
+        return linked(direction == "outgoing")
+
+    def product(self, spec, contact, path):
+        _options(spec, path, ["id", "name", "product_type", "status"])
+        holding = aliased(CustomerProduct)
+        query = select(literal(1)).select_from(holding).where(
+            holding.contact_id == contact.id,
+            holding.status.in_(_strings(spec.get("status", "active"), f"{path}.status"))
+        )
+        if "id" in spec:
+            query = query.where(holding.product_id.in_(_ids(spec["id"], f"{path}.id")))
+        if "name" in spec or "product_type" in spec:
+            product = aliased(Product)
+            query = query.join(product, product.id == holding.product_id)
+            if "name" in spec:
+                query = query.where(product.name.in_(_strings(spec["name"], f"{path}.name")))
+            if "product_type" in spec:
+                query = query.where(product.product_type.in_(_strings(spec["product_type"], f"{path}.product_type")))
+        return query.exists()
+
+    def campaign(self, spec, contact, path):
+        _options(spec, path, ["id", "last", "status"])
+        enrollment = aliased(CampaignContact)
+        query = select(literal(1)).select_from(enrollment).where(enrollment.contact_id == contact.id)
+        if "id" in spec:
+            query = query.where(enrollment.campaign_id.in_(_ids(spec["id"], f"{path}.id")))
+        if "last" in spec:
+            last = spec["last"]
+            if not _int(last) or not 1 <= last <= MAX_LAST_CAMPAIGNS:
+                raise SegmentError(f"{path}.last: expected a number from 1 to {MAX_LAST_CAMPAIGNS}")
+            query = query.where(enrollment.campaign_id.in_(
+                select(Campaign.id).order_by(Campaign.send_date.desc(), Campaign.id.desc()).limit(last)
+            ))
+        if "status" in spec:
+            query = query.where(enrollment.response_status.in_(_strings(spec["status"], f"{path}.status")))
+        return query.exists()
+
+def compile_filter(node, contact=Contact):
+    """WHERE clause selecting the contacts matching a filter"""
+    return _Compiler().compile(node, contact)
+
+def count_query(node):
+    """select() of the number of contacts matching a filter"""
+    return select(func.count(Contact.id)).where(compile_filter(node))
+
+def contacts_query(node):
+    """select() of the contacts matching a filter"""
+    return select(Contact).where(compile_filter(node))
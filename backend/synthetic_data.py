@@ -0,0 +1,409 @@
+"""
+Deterministic synthetic CRM dataset at any scale
+
+SyntheticDataset(contacts, seed) describes a dataset of that many contacts
+with the fan-out seen in the real data: most contacts are individuals, a
+skewed few businesses and estates have most of the linked people, campaigns
+enroll hundreds to thousands of contacts each, and customers hold zero to
+three products. Around 2% of individuals are near-duplicates of an earlier
+contact (same name, email in different case, phone formatted differently),
+as repeated imports produce.
+
+The same contacts and seed always give the same rows, ids included, so
+benchmark runs against different builds of the app are comparable. Rows are
+produced in batches per table and never held in memory all at once, so 1M
+contacts needs little more memory than 10k.
+
+    dataset = SyntheticDataset(100_000, seed=42)
+    for table, batches in dataset.tables():
+        for rows in batches:
+            conn.execute(insert(metadata.tables[table]), rows)
+"""
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from operator import itemgetter
+
+DEFAULT_SEED = 42
+DEFAULT_BATCH_SIZE = 10_000
+
+# Share of contacts of each type
+TYPE_SHARES = [("individual", 0.80), ("business", 0.15), ("estate", 0.05)]
+DUPLICATE_SHARE = 0.02
+
+# Share of individuals linked to a business (5% of them as "manages") and to an estate
+WORKS_FOR_SHARE = 0.70
+MANAGES_SHARE = 0.05
+ESTATE_MEMBER_SHARE = 0.25
+
+CONTACTS_PER_CAMPAIGN = 1000  # one campaign per this many contacts, at least MIN_CAMPAIGNS
+MIN_CAMPAIGNS = 5
+CAMPAIGN_SIZE = (200, 2000)
+
+# (weight, status) of completed campaign responses
+RESPONSE_MIX = [(40, "pending"), (30, "responded"), (10, "converted"), (20, "not_interested")]
+
+# Probability of a customer holding 0, 1, 2 or 3 products, and of each holding's status
+PRODUCT_COUNT_MIX = [(35, 0), (40, 1), (20, 2), (5, 3)]
+HOLDING_STATUS_MIX = [(80, "active"), (15, "ended"), (5, "cancelled")]
+
+# Rows are dated within this window
+EPOCH = datetime(2022, 1, 1)
+SPAN_DAYS = 3 * 365
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Christopher", "Karen", "Charles", "Nancy", "Daniel", "Lisa",
+    "Matthew", "Margaret", "Anthony", "Betty", "Mark", "Sandra", "Donald", "Ashley",
+    "Steven", "Dorothy", "Andrew", "Kimberly", "Paul", "Emily", "Joshua", "Donna",
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+    "Thompson", "White", "Harris", "Clark", "Lewis", "Robinson", "Walker", "Young",
+    "Allen", "King", "Wright", "Scott", "Hill", "Green", "Adams", "Nelson",
+    "Baker", "Hall", "Campbell", "Mitchell", "Carter", "Morrison", "Pemberton", "Ashworth",
+]
+
+BUSINESS_WORDS = [
+    "Accounting", "Financial Services", "Consulting", "Property Management", "Investments",
+    "Business Solutions", "Wealth Management", "Trust Services", "Capital Partners", "Advisors",
+]
+BUSINESS_SUFFIXES = ["Ltd", "LLP", "Group", "Holdings", "& Co"]
+
+DOMAINS = ["gmail.com", "outlook.com", "yahoo.co.uk", "btinternet.com", "hotmail.co.uk"]
+
+NOTES = [
+    "Referred by an existing client.",
+    "Annual review scheduled for next quarter.",
+    "Interested in estate planning services.",
+    "Looking for tax optimisation advice.",
+    "Family business with complex structure.",
+    "Recently inherited property. Requires probate services.",
+]
+
+CAMPAIGN_TOPICS = [
+    ("Tax Year End Planning", "Annual tax planning services reminder"),
+    ("Estate Planning Workshop", "Invitation to our quarterly estate planning seminar"),
+    ("Wealth Management Services", "Introduction to our wealth management offerings"),
+    ("Year-End Financial Review", "Annual portfolio review and planning session"),
+    ("Trust Administration Update", "Updates to trust administration services"),
+]
+CHANNELS = ["email", "email", "phone", "mail"]
+
+# (name, product_type, base_price, billing_frequency); products with a
+# version 2 follow their version 1, which is archived
+PRODUCT_CATALOGUE = [
+    ("Annual Tax Return Preparation", "Tax Services", "500.00", "annual"),
+    ("Quarterly Bookkeeping", "Bookkeeping", "750.00", "quarterly"),
+    ("VAT Returns", "Tax Services", "300.00", "quarterly"),
+    ("Estate Planning Consultation", "Estate Planning", "1200.00", "one-time"),
+    ("Payroll Management", "Payroll Services", "400.00", "monthly"),
+    ("Financial Statement Audit", "Audit Services", "2500.00", "annual"),
+    ("Trust Administration", "Trust Services", "1500.00", "annual"),
+    ("Self-Assessment Tax Returns", "Tax Services", "350.00", "annual"),
+    ("Business Advisory Services", "Advisory", "1000.00", "monthly"),
+    ("Corporation Tax Services", "Tax Services", "800.00", "annual"),
+]
+VERSIONED_PRODUCTS = {"Quarterly Bookkeeping", "Payroll Management", "Trust Administration"}
+
+_MASK = (1 << 64) - 1
+
+def _mix(seed: int, value: int) -> int:
+    """A well-spread 64-bit hash of value, stable across runs (splitmix64)"""
+    z = (value * 0x9E3779B97F4A7C15 + seed) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+def _chooser(mix):
+    """A function drawing a value from a (weight, value) mix with the given rng"""
+    values = [value for _, value in mix]
+    bounds, total = [], 0
+    for weight, _ in mix:
+        total += weight
+        bounds.append(total)
+    bounds[-1] = float("inf")  # rng.random() * total can round up to total
+    return lambda rng: values[bisect(bounds, rng.random() * total)]
+
+_response = _chooser(RESPONSE_MIX)
+_product_count = _chooser(PRODUCT_COUNT_MIX)
+_holding_status = _chooser(HOLDING_STATUS_MIX)
+
+def _skewed(rng, items):
+    """An item from the list, favouring the front so a few get most links"""
+    return items[int(len(items) * rng.random() ** 2)]
+
+# Formatting dates is a large share of generation time, so day and
+# minute-of-day strings are looked up; rows may be dated up to a year past
+# the window
+_DAYS = [(EPOCH + timedelta(days=day)).date().isoformat() for day in range(SPAN_DAYS + 366)]
+_MINUTES = [f"T{minute // 60:02d}:{minute % 60:02d}:00" for minute in range(1440)]
+
+def _date(day: float) -> str:
+    return _DAYS[int(day)]
+
+def _timestamp(day: float) -> str:
+    return _DAYS[int(day)] + _MINUTES[int(day % 1 * 1440)]
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class SyntheticDataset:
+    def __init__(self, contacts: int, seed: int = DEFAULT_SEED, batch_size: int = DEFAULT_BATCH_SIZE):
+        if contacts < 1:
+            raise ValueError("contacts must be at least 1")
+        self.contacts = contacts
+        self.seed = seed
+        self.batch_size = batch_size
+
+        # Contact types and duplicate sources are needed by every table, so
+        # they are drawn up front; ids are 1..contacts
+        rng = self._rng("types")
+        self.types = bytearray(contacts + 1)  # index = contact id; 0 individual, 1 business, 2 estate
+        self.duplicate_of = {}
+        self.individuals, self.businesses, self.estates = [], [], []
+        groups = [self.individuals, self.businesses, self.estates]
+        thresholds = [TYPE_SHARES[0][1], TYPE_SHARES[0][1] + TYPE_SHARES[1][1]]
+        for contact_id in range(1, contacts + 1):
+            pick = rng.random()
+            kind = 0 if pick < thresholds[0] else 1 if pick < thresholds[1] else 2
+            if kind == 0 and self.individuals and rng.random() < DUPLICATE_SHARE:
+                self.duplicate_of[contact_id] = rng.choice(self.individuals)
+            self.types[contact_id] = kind
+            groups[kind].append(contact_id)
+
+        self.campaign_count = max(MIN_CAMPAIGNS, contacts // CONTACTS_PER_CAMPAIGN)
+
+    def _rng(self, table: str):
+        # One generator per table, so each table's rows don't depend on how
+        # far the others have been read
+        return random.Random(f"{self.seed}:{table}")
+
+    def tables(self):
+        """(table name, iterator of row batches) in foreign-key order"""
+        return [
+            ("contacts", _batched(self.contact_rows(), self.batch_size)),
+            ("relationships", _batched(self.relationship_rows(), self.batch_size)),
+            ("campaigns", _batched(self.campaign_rows(), self.batch_size)),
+            ("campaign_contacts", _batched(self.campaign_contact_rows(), self.batch_size)),
+            ("products", _batched(self.product_rows(), self.batch_size)),
+            ("customer_products", _batched(self.customer_product_rows(), self.batch_size)),
+        ]
+
+    # ---- contacts ----
+
+    def _person(self, contact_id: int):
+        h = _mix(self.seed, contact_id)
+        first = FIRST_NAMES[h % len(FIRST_NAMES)]
+        last = LAST_NAMES[(h >> 8) % len(LAST_NAMES)]
+        domain = DOMAINS[(h >> 16) % len(DOMAINS)]
+        email = f"{first}.{last}{contact_id}@{domain}".lower()
+        phone = f"07{(h >> 24) % 1_000_000_000:09d}"
+        return f"{first} {last}", email, phone
+
+    def contact_rows(self):
+        rng = self._rng("contacts")
+        slugs = {}  # business name -> email domain stem
+        for contact_id in range(1, self.contacts + 1):
+            kind = self.types[contact_id]
+            h = _mix(self.seed, contact_id)
+            notes = NOTES[h % len(NOTES)] if rng.random() < 0.4 else None
+            created_at = _timestamp(rng.random() * SPAN_DAYS)
+
+            if kind == 0:
+                source = self.duplicate_of.get(contact_id)
+                full_name, email, phone = self._person(source or contact_id)
+                if source:
+                    email = email.upper() if rng.random() < 0.5 else email.capitalize()
+                    phone = f"+44 {phone[1:5]} {phone[5:]}"
+                elif rng.random() < 0.1:
+                    email = None
+                row = ("individual", full_name, email, phone, None)
+            elif kind == 1:
+                last = LAST_NAMES[(h >> 8) % len(LAST_NAMES)]
+                name = f"{last} {BUSINESS_WORDS[(h >> 16) % len(BUSINESS_WORDS)]} {BUSINESS_SUFFIXES[(h >> 24) % len(BUSINESS_SUFFIXES)]}"
+                slug = slugs.get(name)
+                if slug is None:
+                    slug = slugs[name] = "".join(ch for ch in name.lower() if ch.isalnum())[:20]
+                row = ("business", name, f"info@{slug}{contact_id}.co.uk", f"020 {(h >> 32) % 10000:04d} {(h >> 48) % 10000:04d}", name)
+            else:
+                first = FIRST_NAMES[h % len(FIRST_NAMES)]
+                last = LAST_NAMES[(h >> 8) % len(LAST_NAMES)]
+                row = ("estate", f"Estate of {first} {last}", None, None, None)
+
+            contact_type, full_name, email, phone, company_name = row
+            yield {
+                "id": contact_id,
+                "full_name": full_name,
+                "contact_type": contact_type,
+                "email": email,
+                "phone": phone,
+                "company_name": company_name,
+                "notes": notes,
+                "created_at": created_at,
+            }
+
+    # ---- relationships ----
+
+    def relationship_rows(self):
+        rng = self._rng("relationships")
+        relationship_id = 0
+        for person in self.individuals:
+            links = []
+            if self.businesses and rng.random() < WORKS_FOR_SHARE:
+                kind = "manages" if rng.random() < MANAGES_SHARE else "works_for"
+                links.append((_skewed(rng, self.businesses), kind))
+            if self.estates and rng.random() < ESTATE_MEMBER_SHARE:
+                links.append((_skewed(rng, self.estates), "member_of"))
+            for org, kind in links:
+                relationship_id += 1
+                yield {
+                    "id": relationship_id,
+                    "from_contact_id": person,
+                    "to_contact_id": org,
+                    "relationship_type": kind,
+                    "created_at": _timestamp(rng.random() * SPAN_DAYS),
+                }
+
+    # ---- campaigns ----
+
+    def _campaign(self, campaign_id: int):
+        """(send day, status) of a campaign; the most recent ones are not completed yet"""
+        send_day = SPAN_DAYS * campaign_id / (self.campaign_count + 1)
+        from_end = self.campaign_count - campaign_id
+        status = "draft" if from_end == 0 else "sent" if from_end < 3 else "completed"
+        return send_day, status
+
+    def campaign_rows(self):
+        for campaign_id in range(1, self.campaign_count + 1):
+            topic, description = CAMPAIGN_TOPICS[campaign_id % len(CAMPAIGN_TOPICS)]
+            send_day, status = self._campaign(campaign_id)
+            yield {
+                "id": campaign_id,
+                "name": f"{topic} {(EPOCH + timedelta(days=send_day)).year} #{campaign_id}",
+                "description": description,
+                "channel": CHANNELS[campaign_id % len(CHANNELS)],
+                "send_date": _date(send_day),
+                "status": status,
+                "created_at": _timestamp(max(send_day - 14, 0)),
+            }
+
+    def campaign_contact_rows(self):
+        rng = self._rng("campaign_contacts")
+        audience = self.individuals or self.businesses or self.estates
+        row_id = 0
+        for campaign_id in range(1, self.campaign_count + 1):
+            send_day, status = self._campaign(campaign_id)
+            low, high = (min(bound, len(audience)) for bound in CAMPAIGN_SIZE)
+            for contact_id in sorted(rng.sample(audience, rng.randint(low, high))):
+                response = "pending" if status != "completed" else _response(rng)
+                row_id += 1
+                yield {
+                    "id": row_id,
+                    "campaign_id": campaign_id,
+                    "contact_id": contact_id,
+                    "response_status": response,
+                    "response_date": None if response == "pending" else _timestamp(send_day + rng.random() * 30),
+                    "notes": None,
+                    "created_at": _timestamp(max(send_day - 7, 0)),
+                }
+
+    # ---- products ----
+
+    def _catalogue(self):
+        """(id, name, product_type, price, frequency, version, parent id, status) rows"""
+        products = []
+        for name, product_type, price, frequency in PRODUCT_CATALOGUE:
+            product_id = len(products) + 1
+            if name in VERSIONED_PRODUCTS:
+                products.append((product_id, name, product_type, price, frequency, 1, None, "archived"))
+                raised = f"{float(price) * 1.1:.2f}"
+                products.append((product_id + 1, name, product_type, raised, frequency, 2, product_id, "active"))
+            else:
+                products.append((product_id, name, product_type, price, frequency, 1, None, "active"))
+        return products
+
+    def product_rows(self):
+        for product_id, name, product_type, price, frequency, version, parent_id, status in self._catalogue():
+            effective = _date(0 if version == 1 else SPAN_DAYS / 2)
+            yield {
+                "id": product_id,
+                "name": name,
+                "description": f"{name} ({product_type.lower()})",
+                "status": status,
+                "product_type": product_type,
+                "version": version,
+                "parent_product_id": parent_id,
+                "effective_date": effective,
+                "created_at": f"{effective}T09:00:00",
+                "updated_at": f"{effective}T09:00:00",
+                "base_price": price,
+                "currency": "GBP",
+                "billing_frequency": frequency,
+            }
+
+    def customer_product_rows(self):
+        rng = self._rng("customer_products")
+        products = self._catalogue()
+        row_id = 0
+        for contact_id in range(1, self.contacts + 1):
+            if self.types[contact_id] == 2:
+                continue
+            count = _product_count(rng)
+            if not count:
+                continue
+            for product_id, _, _, price, _, _, _, product_status in rng.sample(products, count):
+                status = "ended" if product_status == "archived" else _holding_status(rng)
+                start_day = rng.random() * SPAN_DAYS * 0.8
+                created_at = _timestamp(start_day)
+                row_id += 1
+                yield {
+                    "id": row_id,
+                    "contact_id": contact_id,
+                    "product_id": product_id,
+                    "status": status,
+                    "start_date": _date(start_day),
+                    "end_date": None if status == "active" else _date(start_day + 30 + rng.random() * 300),
+                    "notes": None,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "actual_price": price,
+                    "renewal_date": None,
+                }
+
+def load_dataset(engine, tables, dataset: SyntheticDataset, progress=None):
+    """
+    Insert the dataset through the engine, one transaction per table.
+
+    tables maps table names to Table objects (e.g. Base.metadata.tables).
+    Returns {table name: rows inserted}; progress(table, rows) is called
+    after each batch.
+    """
+    counts = {}
+    for name, batches in dataset.tables():
+        table = tables[name]
+        counts[name] = 0
+        with engine.begin() as conn:
+            statement = None
+            for rows in batches:
+                if statement is None:
+                    # Compile the Core insert once and hand the driver plain
+                    # tuples, skipping per-row parameter processing
+                    compiled = table.insert().compile(dialect=engine.dialect, column_keys=list(rows[0]))
+                    statement = str(compiled)
+                    to_params = itemgetter(*compiled.positiontup) if compiled.positional else None
+                conn.exec_driver_sql(statement, list(map(to_params, rows)) if to_params else rows)
+                counts[name] += len(rows)
+                if progress:
+                    progress(name, counts[name])
+    return counts
@@ -0,0 +1,98 @@
+"""
+Database-maintained table versions
+
+The table_versions table holds one row per tracked table with a counter
+and the time of the last write. Triggers on each tracked table bump its row
+inside the same transaction as every insert, update and delete, so every
+writer is seen: the API, the seed and maintenance scripts, another worker
+process or a plain sqlite3 shell. Read endpoints derive their ETags from
+these rows (see conditional_get in main.py).
+
+A table's row is created by its first bump, starting at the current time in
+milliseconds rather than 0, so a table dropped and recreated (seed.py
+--reset) never returns to a version an old ETag was built from. When the triggers are found missing (a new
+database, or seed.py having dropped them for a bulk load) every version is
+bumped, because writes may have gone unrecorded.
+
+Show the current versions with:
+    python table_versions.py
+"""
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+
+VERSIONS_TABLE = "table_versions"
+
+# Tables whose writes read endpoints need to see; campaign_stats and the
+# full-text index are derived from these and change with them
+TRACKED_TABLES = (
+    "contacts", "relationships", "campaigns", "campaign_contacts", "products", "customer_products", "segments",
+)
+
+_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+# A missing row (a new table, or its row deleted) starts again at the current
+# time in milliseconds
+_BUMP = f"""
+    INSERT INTO {VERSIONS_TABLE} (table_name, version, modified_at)
+    VALUES ('{{table}}', CAST({_NOW} * 1000 AS INTEGER), {_NOW})
+    ON CONFLICT (table_name) DO UPDATE SET version = version + 1, modified_at = excluded.modified_at;
+"""
+
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {VERSIONS_TABLE}_{{table}}_{suffix} AFTER {event} ON {{table}} BEGIN
+        {_BUMP}
+    END
+    """
+    for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+]
+
+VERSIONS_SQL = text(
+    f"SELECT table_name, version, modified_at FROM {VERSIONS_TABLE} WHERE table_name IN :tables"
+).bindparams(bindparam("tables", expanding=True))
+
+def _trigger_exists(conn, name):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": name}
+    ).first() is not None
+
+def ensure_table_versions(engine):
+    """
+    Install the triggers if they are missing, bumping those tables' versions.
+
+    The table_versions table itself is created with the other models.
+    Returns False for non-SQLite databases, in which case callers should
+    keep versions in process instead.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        with engine.begin() as conn:
+            for table in TRACKED_TABLES:
+                installed = _trigger_exists(conn, f"{VERSIONS_TABLE}_{table}_ai")
+                for trigger in CREATE_TRIGGERS:
+                    conn.execute(text(trigger.format(table=table)))
+                if not installed:
+                    conn.execute(text(_BUMP.format(table=table)))
+    except OperationalError:
+        return False
+
+    return True
+
+def read_versions(conn, tables) -> dict:
+    """{table: (version, modified_at)} for the given tables"""
+    rows = conn.execute(VERSIONS_SQL, {"tables": list(tables)})
+    return {row.table_name: (row.version, row.modified_at) for row in rows}
+
+if __name__ == "__main__":
+    from datetime import datetime
+
+    from database import engine
+
+    if not ensure_table_versions(engine):
+        raise SystemExit("table_versions triggers are only supported on SQLite")
+
+    with engine.connect() as conn:
+        for table, (version, modified_at) in sorted(read_versions(conn, TRACKED_TABLES).items()):
+            print(f"{table:<20} {version:>16d}  {datetime.fromtimestamp(modified_at).isoformat(timespec='seconds')}")
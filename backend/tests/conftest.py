@@ -0,0 +1,187 @@
+"""
+Shared fixtures: a throwaway SQLite database seeded at a chosen scale and a
+counter for the SQL statements a request runs
+
+The database URL is set before main is imported, so the app's engines point
+at a temporary file rather than crm.db. It is a file rather than :memory:
+because the sync and async engines each open their own connections, and
+every in-memory connection would see a separate, empty database.
+"""
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import warnings
+
+_DB_DIR = tempfile.mkdtemp(prefix="crm-tests-")
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+os.environ["CRM_DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'crm.db')}"
+os.environ.pop("CRM_ASYNC_DATABASE_URL", None)
+os.environ["CRM_SQLITE_MAINTENANCE_INTERVAL"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, insert
+
+import main
+from main import (
+    Base, Campaign, CampaignContact, Contact, CustomerProduct, Product, Relationship, Segment,
+    RESPONSE_STATUSES
+)
+
+# Contacts, organisations, campaigns and products per unit of scale
+PEOPLE_PER_SCALE = 10
+ORGANISATIONS_PER_SCALE = 2  # of each type
+CAMPAIGNS_PER_SCALE = 2
+PRODUCTS_PER_SCALE = 2
+
+# Individuals linked to an estate who hold a product and have not responded
+SEGMENT_FILTER = {"and": [
+    {"field": "contact_type", "op": "eq", "value": "individual"},
+    {"related": {"direction": "outgoing", "where": {"field": "contact_type", "op": "eq", "value": "estate"}}},
+    {"product": {"product_type": "Service"}},
+    {"not": {"campaign": {"last": 2, "status": ["responded", "converted"]}}},
+]}
+
+CREATED_AT = "2024-01-01T00:00:00"
+
+def _contact_row(contact_id, full_name, contact_type, email=None, phone=None, company_name=None):
+    return {
+        "id": contact_id, "full_name": full_name, "contact_type": contact_type, "email": email,
+        "phone": phone, "company_name": company_name, "notes": None, "created_at": CREATED_AT,
+    }
+
+def seed(scale: int) -> dict:
+    """
+    Replace the database contents with a dataset whose fan-out grows with scale.
+
+    Every person works for a business, belongs to an estate, is enrolled in
+    every campaign and holds the first product plus one other; the first
+    person is also linked to every organisation and holds every product.
+    Returns the ids the route requests use.
+    """
+    people = PEOPLE_PER_SCALE * scale
+    orgs = ORGANISATIONS_PER_SCALE * scale
+    person_ids = list(range(1, people + 1))
+    business_ids = list(range(people + 1, people + orgs + 1))
+    estate_ids = list(range(people + orgs + 1, people + 2 * orgs + 1))
+    campaign_ids = list(range(1, CAMPAIGNS_PER_SCALE * scale + 1))
+    product_ids = list(range(1, PRODUCTS_PER_SCALE * scale + 1))
+
+    contacts = [
+        _contact_row(i, f"Person {i} Smith", "individual", f"person{i}@example.com", f"0700 900{i:04d}")
+        for i in person_ids
+    ] + [
+        _contact_row(i, f"Business {i} Ltd", "business", f"office{i}@example.com", company_name=f"Business {i} Ltd")
+        for i in business_ids
+    ] + [
+        _contact_row(i, f"Estate of {i} Smith", "estate")
+        for i in estate_ids
+    ]
+
+    links = {}
+    for n, person in enumerate(person_ids):
+        links[(person, business_ids[n % orgs])] = "works_for"
+        links[(person, estate_ids[n % orgs])] = "member_of"
+    for org in business_ids:
+        links.setdefault((person_ids[0], org), "manages")
+    for org in estate_ids:
+        links.setdefault((person_ids[0], org), "member_of")
+    relationships = [
+        {"from_contact_id": a, "to_contact_id": b, "relationship_type": kind, "created_at": CREATED_AT}
+        for (a, b), kind in links.items()
+    ]
+
+    campaigns = [
+        {"id": i, "name": f"Campaign {i}", "channel": "email", "send_date": "2024-02-01",
+         "status": "sent", "created_at": CREATED_AT}
+        for i in campaign_ids
+    ]
+    campaign_contacts = []
+    for campaign in campaign_ids:
+        for n, person in enumerate(person_ids):
+            status = RESPONSE_STATUSES[n % len(RESPONSE_STATUSES)]
+            campaign_contacts.append({
+                "campaign_id": campaign, "contact_id": person, "response_status": status,
+                "response_date": None if status == "pending" else "2024-02-10", "created_at": CREATED_AT,
+            })
+
+    products = [
+        {"id": i, "name": f"Product {i}", "status": "active", "product_type": "Service", "version": 1,
+         "effective_date": "2024-01-01", "created_at": CREATED_AT, "updated_at": CREATED_AT}
+        for i in product_ids
+    ]
+    holdings = {(person_ids[0], product) for product in product_ids}
+    for n, person in enumerate(person_ids):
+        holdings.add((person, product_ids[0]))
+        holdings.add((person, product_ids[n % len(product_ids)]))
+    customer_products = [
+        {"contact_id": person, "product_id": product, "status": "active", "start_date": "2024-01-01",
+         "created_at": CREATED_AT, "updated_at": CREATED_AT}
+        for person, product in sorted(holdings)
+    ]
+
+    with main.engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+        conn.execute(insert(Segment), [{
+            "id": 1, "name": "Unresponsive estate members", "filter": json.dumps(SEGMENT_FILTER),
+            "created_at": CREATED_AT, "updated_at": CREATED_AT,
+        }])
+        for model, rows in [
+            (Contact, contacts), (Relationship, relationships), (Campaign, campaigns),
+            (CampaignContact, campaign_contacts), (Product, products), (CustomerProduct, customer_products),
+        ]:
+            conn.execute(insert(model), rows)
+
+    main.ENTITY_CACHE.clear()
+    main.load_relationship_index()
+    main.invalidate_stats_cache()
+    main.bump_versions(*Base.metadata.tables)
+
+    return {
+        "scale": scale,
+        "person": person_ids[0],
+        "people": person_ids,
+        "business": business_ids[0],
+        "estate": estate_ids[0],
+        "campaign": campaign_ids[0],
+        "product": product_ids[0],
+        "customer_product": 1,
+        "relationship": 1,
+        "segment": 1,
+    }
+
+class StatementCounter:
+    """Counts statements executed on the sync and async engines while active"""
+
+    def __init__(self):
+        self.engines = [main.engine, main.async_engine.sync_engine]
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,69 @@
+"""
+campaign_stats triggers on large campaigns
+
+Every row removed from a (campaign, status) key that held its latest
+response date makes the trigger look the date up again, so that lookup has
+to be an index seek or deleting a campaign becomes quadratic.
+"""
+import time
+
+from sqlalchemy import insert, text, update
+
+import campaign_summary
+import main
+from conftest import seed
+from main import CampaignContact
+
+LARGE_CAMPAIGN = 20_000
+
+def test_latest_response_lookup_is_an_index_seek(client):
+    seed(1)
+    sql = campaign_summary.LATEST_RESPONSE_SQL.format(campaign_id=":campaign_id", status=":status")
+    with main.engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(
+            text(f"EXPLAIN QUERY PLAN {sql}"), {"campaign_id": 1, "status": "responded"}
+        )]
+
+    lookups = [detail for detail in plan if "campaign_contacts" in detail]
+    assert len(lookups) == 2 and all(
+        detail.startswith("SEARCH") and "ix_campaign_contacts_campaign_status_date" in detail
+        for detail in lookups
+    ), plan
+
+def test_large_campaign_delete_and_status_change(client):
+    seed(1)
+    campaign = client.post("/api/campaigns", json={
+        "name": "Large Campaign", "channel": "email", "send_date": "2024-06-01", "status": "sent",
+    }).json()["id"]
+
+    # One shared response date is the worst case: every removed row held the latest date
+    with main.engine.begin() as conn:
+        conn.execute(insert(CampaignContact), [
+            {"campaign_id": campaign, "contact_id": contact_id,
+             "response_status": (None, "responded", "converted")[contact_id % 3],
+             "response_date": "2024-06-02"}
+            for contact_id in range(1, LARGE_CAMPAIGN + 1)
+        ])
+
+    started = time.perf_counter()
+    with main.engine.begin() as conn:
+        conn.execute(
+            update(CampaignContact)
+            .where(CampaignContact.campaign_id == campaign, CampaignContact.response_status == "responded")
+            .values(response_status="converted")
+        )
+    status_change = time.perf_counter() - started
+
+    with main.engine.connect() as conn:
+        assert campaign_summary.verify_campaign_summary(conn) == []
+
+    started = time.perf_counter()
+    assert client.delete(f"/api/campaigns/{campaign}").status_code == 200
+    delete = time.perf_counter() - started
+
+    with main.engine.connect() as conn:
+        assert campaign_summary.verify_campaign_summary(conn) == []
+
+    # Both take well under a second when the lookup is a seek and about a
+    # minute when it scans the campaign once per row
+    assert status_change < 10 and delete < 10, (status_change, delete)
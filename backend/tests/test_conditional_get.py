@@ -0,0 +1,54 @@
+"""
+ETags follow writes made outside the API
+
+The versions behind the ETags are bumped by triggers in the database, so a
+write from a script or another worker process invalidates them just as an
+API write does, and the body sent with the new ETag must show the write
+rather than a row cached before it.
+"""
+from sqlalchemy import create_engine, text
+
+import main
+from conftest import seed
+
+def _etag(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+def test_unchanged_tables_answer_304(client):
+    d = seed(1)
+    path = f"/api/contacts/{d['person']}"
+    etag = _etag(client, path)
+
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+def test_write_from_another_connection_changes_the_etag(client):
+    d = seed(1)
+    path = f"/api/contacts/{d['person']}"
+    etag = _etag(client, path)
+
+    # A separate engine stands in for a script or another worker process
+    other = create_engine(main.DATABASE_URL)
+    with other.begin() as conn:
+        conn.execute(text("UPDATE contacts SET notes = 'Changed elsewhere' WHERE id = :id"), {"id": d["person"]})
+    other.dispose()
+
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["notes"] == "Changed elsewhere"
+
+    # Later requests for the new ETag agree with the body it was sent with
+    assert client.get(path).json()["notes"] == "Changed elsewhere"
+    assert client.get(path, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+def test_write_to_an_unread_table_keeps_the_etag(client):
+    d = seed(1)
+    path = f"/api/contacts/{d['person']}"
+    etag = _etag(client, path)
+
+    with main.engine.begin() as conn:
+        conn.execute(text("UPDATE products SET description = 'Changed' WHERE id = :id"), {"id": d["product"]})
+
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,207 @@
+"""
+Duplicate detection and contact merging
+
+Scoring is checked on hand-made pairs, including the near misses that must
+stay below the threshold; the API tests run against the seeded dataset, in
+which no two contacts are duplicates.
+"""
+import pytest
+from sqlalchemy import insert, select, text
+
+import campaign_summary
+import dedup
+import main
+from conftest import seed
+from main import CampaignContact, CustomerProduct, Relationship
+
+def _keys(full_name, email=None, phone=None, contact_type="individual", company_name=None):
+    return dedup.contact_keys({
+        "full_name": full_name, "email": email, "phone": phone,
+        "contact_type": contact_type, "company_name": company_name,
+    })
+
+LIKELY = {
+    "same email, title and +tag": (
+        _keys("Jane Smith", "jane.smith@example.com"), _keys("Mrs Jane Smith", "Jane.Smith+crm@Example.com")
+    ),
+    "same phone in another format": (
+        _keys("Jane Smith", phone="07700 900123"), _keys("Jane Smith", phone="+44 7700 900123")
+    ),
+    "same mailbox at another provider": (
+        _keys("Jane Smith", "jane.smith@gmail.com"), _keys("Jane Smith", "jane.smith@hotmail.com")
+    ),
+    "misspelt name, same email": (_keys("Jon Smith", "jon@example.com"), _keys("John Smith", "jon@example.com")),
+}
+
+UNLIKELY = {
+    "household email": (_keys("John Smith", "smiths@gmail.com"), _keys("Mary Smith", "smiths@gmail.com")),
+    "household phone": (_keys("John Smith", phone="01632 960001"), _keys("Mary Smith", phone="01632960001")),
+    "common name only": (_keys("John Smith", "john@one.com"), _keys("John Smith", "jsmith@two.com")),
+    "colleagues": (_keys("John Brown", "john.brown@acme.co.uk"), _keys("Jean Brown", "jean.brown@acme.co.uk")),
+    "shared role mailbox": (
+        _keys("Acme Ltd", "info@acme.com", contact_type="business"),
+        _keys("Acme Trading", "info@acme.com", contact_type="business"),
+    ),
+    "person and their estate": (
+        _keys("John Smith", "john@example.com"),
+        _keys("Estate of John Smith", "john@example.com", contact_type="estate"),
+    ),
+}
+
+@pytest.mark.parametrize("case", LIKELY)
+def test_likely_duplicates_reach_the_threshold(case):
+    score, reasons = dedup.score_pair(*LIKELY[case])
+    assert score >= dedup.DEFAULT_THRESHOLD, reasons
+
+@pytest.mark.parametrize("case", UNLIKELY)
+def test_near_misses_stay_below_the_threshold(case):
+    score, reasons = dedup.score_pair(*UNLIKELY[case])
+    assert score < dedup.DEFAULT_THRESHOLD, reasons
+
+def _add_contacts(*contacts):
+    with main.engine.begin() as conn:
+        ids = [conn.execute(insert(main.Contact).values(**contact)).inserted_primary_key[0] for contact in contacts]
+    return ids
+
+def test_find_duplicates_pairs_only_likely_duplicates(client):
+    d = seed(1)
+    jane, jane_again, john, mary, smith, smith_again = _add_contacts(
+        {"full_name": "Jane Doe", "contact_type": "individual", "email": "jane.doe@example.com"},
+        {"full_name": "Ms Jane Doe", "contact_type": "individual", "email": "JANE.DOE@example.com"},
+        {"full_name": "John Roe", "contact_type": "individual", "email": "roes@gmail.com"},
+        {"full_name": "Mary Roe", "contact_type": "individual", "email": "roes@gmail.com"},
+        {"full_name": "Sam Smith", "contact_type": "individual"},
+        {"full_name": "Sam Smith", "contact_type": "individual"},
+    )
+    with main.engine.connect() as conn:
+        result = dedup.find_duplicates(conn)
+
+    assert [(p["contact_id"], p["duplicate_id"]) for p in result["pairs"]] == [(jane, jane_again)]
+    assert result["candidates"] >= 3  # the household and common-name pairs were scored, not matched
+
+    # A common name alone is not enough, but the same phone tips it over
+    body = client.post("/api/contacts/check-duplicates", json={
+        "full_name": f"Person {d['person']} Smith", "contact_type": "individual",
+        "phone": f"+44 700 900{d['person']:04d}",
+    }).json()
+    assert [match["id"] for match in body["duplicates"]] == [d["person"]]
+
+@pytest.mark.parametrize("email", [
+    "Jane.Smith@Example.com", " jane.smith+crm@example.com\t", "+tag@example.com", "a+b@c@d.com",
+    "no-at-sign", "", None,
+])
+def test_email_key_sql_agrees_with_email_key(email):
+    with main.engine.connect() as conn:
+        stored = conn.execute(text(f"SELECT {dedup.EMAIL_KEY_SQL} FROM (SELECT :email AS email)"), {"email": email})
+        assert stored.scalar() == dedup.email_key(email)
+
+def test_common_name_does_not_crowd_out_an_email_or_phone_match(client):
+    seed(1)
+    namesakes = [{"full_name": "Jane Smith", "contact_type": "individual"}] * (dedup.CANDIDATE_LIMIT + 10)
+    *_, by_email, by_phone = _add_contacts(
+        *namesakes,
+        {"full_name": "Jane Smith", "contact_type": "individual", "email": "Jane.Smith+news@Example.com"},
+        {"full_name": "Jane Smith", "contact_type": "individual", "phone": "+44 7700 900555"},
+    )
+
+    for contact, expected in [
+        ({"email": "jane.smith@example.com"}, by_email),
+        ({"phone": "07700-900-555"}, by_phone),
+    ]:
+        body = client.post("/api/contacts/check-duplicates", json={
+            "full_name": "Jane Smith", "contact_type": "individual", **contact,
+        }).json()
+        assert [match["id"] for match in body["duplicates"]] == [expected]
+
+def test_create_refuses_a_likely_duplicate_unless_allowed(client):
+    d = seed(1)
+    contact = {"full_name": f"Person {d['person']} Smith", "contact_type": "individual",
+               "email": f"PERSON{d['person']}@example.com"}
+
+    response = client.post("/api/contacts", json=contact)
+    assert response.status_code == 400
+    assert [match["id"] for match in response.json()["detail"]["duplicates"]] == [d["person"]]
+
+    response = client.post("/api/contacts", params={"allow_duplicate": True}, json=contact)
+    assert response.status_code == 200
+    assert response.json()["id"] != d["person"]
+
+def test_merge_moves_links_and_keeps_campaign_stats_consistent(client):
+    d = seed(1)
+    keep, campaign = d["person"], d["campaign"]
+    duplicate = client.post("/api/contacts", params={"allow_duplicate": True}, json={
+        "full_name": f"Person {keep} Smith", "contact_type": "individual", "notes": "Met at the expo",
+    }).json()["id"]
+    new_org = client.post("/api/contacts", json={"full_name": "New Org Ltd", "contact_type": "business"}).json()["id"]
+    new_campaign = client.post("/api/campaigns", json={
+        "name": "Merge Campaign", "channel": "email", "send_date": "2024-05-01", "status": "sent",
+    }).json()["id"]
+
+    for source, target, kind in [
+        (duplicate, d["estate"], "member_of"),  # keep already has this link
+        (duplicate, keep, "member_of"),         # would become a self-link
+        (duplicate, new_org, "works_for"),      # moves
+        (d["people"][1], duplicate, "manages"),  # incoming, moves
+    ]:
+        response = client.post("/api/relationships", json={
+            "from_contact_id": source, "to_contact_id": target, "relationship_type": kind,
+        })
+        assert response.status_code == 200, response.text
+
+    with main.engine.begin() as conn:
+        conn.execute(insert(CampaignContact), [
+            # keep's enrollment in campaign is still pending, so it takes this response
+            {"campaign_id": campaign, "contact_id": duplicate, "response_status": "responded",
+             "response_date": "2024-03-01"},
+            {"campaign_id": new_campaign, "contact_id": duplicate, "response_status": "pending",
+             "response_date": None},
+        ])
+        conn.execute(insert(CustomerProduct), [
+            # keep already holds the product actively
+            {"contact_id": duplicate, "product_id": d["product"], "status": "active", "start_date": "2024-01-01"},
+            {"contact_id": duplicate, "product_id": d["product"], "status": "ended", "start_date": "2023-01-01"},
+        ])
+
+    response = client.post(f"/api/contacts/{keep}/merge", json={"duplicate_id": duplicate})
+    assert response.status_code == 200, response.text
+    assert response.json()["notes"] == "Met at the expo"
+    assert client.get(f"/api/contacts/{duplicate}").status_code == 404
+
+    with main.engine.connect() as conn:
+        links = conn.execute(select(
+            Relationship.from_contact_id, Relationship.to_contact_id, Relationship.relationship_type
+        )).all()
+        enrollments = dict(conn.execute(
+            select(CampaignContact.campaign_id, CampaignContact.response_status)
+            .where(CampaignContact.contact_id == keep)
+        ).all())
+        holdings = sorted(conn.execute(
+            select(CustomerProduct.status).where(
+                CustomerProduct.contact_id == keep, CustomerProduct.product_id == d["product"]
+            )
+        ).scalars())
+        leftovers = [
+            conn.scalar(select(model.id).where(column == duplicate).limit(1))
+            for model, column in [
+                (Relationship, Relationship.from_contact_id), (Relationship, Relationship.to_contact_id),
+                (CampaignContact, CampaignContact.contact_id), (CustomerProduct, CustomerProduct.contact_id),
+            ]
+        ]
+        mismatches = campaign_summary.verify_campaign_summary(conn)
+
+    assert leftovers == [None] * 4
+    assert (keep, new_org, "works_for") in links
+    assert (d["people"][1], keep, "manages") in links
+    assert (keep, keep, "member_of") not in links
+    assert len(links) == len({(source, target) for source, target, _ in links})
+    assert enrollments[campaign] == "responded" and enrollments[new_campaign] == "pending"
+    assert holdings == ["active", "ended"]
+    assert mismatches == []
+
+    # The relationship index was patched to match
+    contact_ids = {contact_id for link in links for contact_id in link[:2]} | {duplicate}
+    with main.engine.connect() as conn:
+        expected = conn.execute(select(
+            Relationship.id, Relationship.from_contact_id, Relationship.to_contact_id, Relationship.relationship_type
+        ).order_by(Relationship.id)).all()
+    assert main.RELATIONSHIP_INDEX.edges_between(contact_ids) == [tuple(row) for row in expected]
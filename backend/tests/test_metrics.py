@@ -0,0 +1,30 @@
+"""
+Statement counting survives statements that raise
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import metrics
+
+def test_failing_statement_is_counted_and_leaves_no_start_time():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine, "test")
+    counter = metrics.STATEMENTS.labels(engine="test")
+    before = counter._value.get()
+    usage = metrics.RequestDatabaseUsage()
+    token = metrics._request_usage.set(usage)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            assert conn.info["crm_query_start"] == []
+
+            conn.execute(text("SELECT 1"))
+            assert conn.info["crm_query_start"] == []
+    finally:
+        metrics._request_usage.reset(token)
+        engine.dispose()
+
+    assert usage.statements == 2
+    assert counter._value.get() - before == 2
@@ -0,0 +1,18 @@
+"""
+Hot queries on a database built by seed.py are answered from an index
+
+seed.py loads without indexes, then creates them, applies the migrations
+and runs ANALYZE, so the plans here are the ones a seeded database gets.
+"""
+from sqlalchemy import create_engine
+
+from migrations import check_query_plans
+from seed import seed_database
+from synthetic_data import DEFAULT_SEED, SyntheticDataset
+
+def test_seeded_database_passes_the_plan_check(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seeded.db'}")
+    seed_database(engine, SyntheticDataset(2000, DEFAULT_SEED))
+
+    assert {name: scans for name, scans in check_query_plans(engine).items() if scans} == {}
+    engine.dispose()
@@ -0,0 +1,28 @@
+"""
+GET /api/contacts/{contact_id}/network reports when it is incomplete
+"""
+import main
+from conftest import seed
+
+def test_complete_network_is_not_truncated(client):
+    d = seed(1)
+    body = client.get(f"/api/contacts/{d['person']}/network", params={"depth": 2}).json()
+
+    assert not body["truncated"]
+    assert {node["id"] for node in body["nodes"]} >= {d["person"], d["business"], d["estate"]}
+
+def test_response_limit_truncates(client):
+    d = seed(1)
+    body = client.get(f"/api/contacts/{d['person']}/network", params={"depth": 2, "limit": 2}).json()
+
+    assert body["truncated"]
+    assert len(body["nodes"]) == 2
+
+def test_walk_limit_truncates(client, monkeypatch):
+    d = seed(1)
+    monkeypatch.setattr(main, "NETWORK_WALK_LIMIT", 3)
+    body = client.get(f"/api/contacts/{d['person']}/network", params={"depth": 2}).json()
+
+    # Fewer contacts than the response limit, but the walk stopped early
+    assert len(body["nodes"]) < 500
+    assert body["truncated"]
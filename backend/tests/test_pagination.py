@@ -0,0 +1,50 @@
+"""
+Keyset pagination over sort columns that hold NULLs
+
+The columns are nullable, and rows written outside the API (imports, the
+seed scripts) can leave them empty, so following X-Next-Cursor through
+those sorts must cross a run of NULL rows.
+"""
+import pytest
+from sqlalchemy import insert
+
+import main
+from conftest import _contact_row, seed
+from main import Contact
+
+@pytest.fixture
+def contacts(client):
+    seed(1)
+    with main.engine.begin() as conn:
+        conn.execute(insert(Contact), [
+            {**_contact_row(contact_id, None, "individual"), "created_at": None}
+            for contact_id in range(1000, 1005)
+        ])
+    return client.get("/api/contacts", params={"limit": 1000}).json()
+
+def _expected(contacts, sort):
+    """Ids in paginate()'s order: NULLs first ascending and last descending, id breaking ties"""
+    name = sort.lstrip("-")
+    present = sorted((c for c in contacts if c[name] is not None), key=lambda c: (c[name], c["id"]))
+    missing = sorted((c for c in contacts if c[name] is None), key=lambda c: c["id"])
+    if sort.startswith("-"):
+        return [c["id"] for c in reversed(present)] + [c["id"] for c in reversed(missing)]
+    return [c["id"] for c in missing + present]
+
+@pytest.mark.parametrize("sort", ["full_name", "-full_name", "created_at", "-created_at"])
+def test_cursor_pages_through_null_sort_values(client, contacts, sort):
+    assert any(c[sort.lstrip("-")] is None for c in contacts)
+
+    ids, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/contacts", params=params)
+        assert response.status_code == 200, response.text
+        ids += [c["id"] for c in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert ids == _expected(contacts, sort)
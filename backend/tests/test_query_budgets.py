@@ -0,0 +1,168 @@
+"""
+Per-route SQL query budgets
+
+Every API route is requested against the seeded dataset at two scales while
+a StatementCounter watches both engines. A route fails if it runs more
+statements than its budget, or more statements on the larger dataset than
+on the smaller one: a query per row (an N+1 loop) makes the count grow with
+the data even while it is still under budget.
+
+Budgets of GET routes with an ETag include the one statement conditional_get
+runs to read table_versions.
+
+New routes must be added to QUERY_BUDGETS; test_every_route_has_a_budget
+fails until they are.
+"""
+import pytest
+from fastapi.routing import APIRoute
+
+import main
+from conftest import SEGMENT_FILTER, StatementCounter, seed
+
+SCALES = (1, 4)
+
+def _contact(name):
+    return {"full_name": name, "contact_type": "individual", "email": f"{name.lower()}@example.com"}
+
+# (method, route) -> (maximum statements, function building (path, request kwargs) from seed())
+QUERY_BUDGETS = {
+    ("GET", "/"): (0, lambda d: ("/", {})),
+    ("GET", "/api/contacts"): (2, lambda d: ("/api/contacts", {})),
+    ("GET", "/api/contacts/search"): (3, lambda d: ("/api/contacts/search?q=smith", {})),
+    ("GET", "/api/contacts/duplicates"): (5, lambda d: ("/api/contacts/duplicates", {})),
+    ("POST", "/api/contacts/check-duplicates"): (
+        1, lambda d: ("/api/contacts/check-duplicates", {"json": _contact(f"Person{d['person']}")})
+    ),
+    ("POST", "/api/contacts/{contact_id}/merge"): (
+        14, lambda d: (f"/api/contacts/{d['person']}/merge", {"json": {"duplicate_id": d["people"][1]}})
+    ),
+    ("GET", "/api/contacts/{contact_id}"): (2, lambda d: (f"/api/contacts/{d['person']}", {})),
+    ("POST", "/api/contacts"): (3, lambda d: ("/api/contacts", {"json": _contact("Newcomer")})),
+    ("PUT", "/api/contacts/{contact_id}"): (
+        3, lambda d: (f"/api/contacts/{d['person']}", {"json": _contact("Renamed")})
+    ),
+    ("DELETE", "/api/contacts/{contact_id}"): (3, lambda d: (f"/api/contacts/{d['person']}", {})),
+    ("GET", "/api/stats"): (1, lambda d: ("/api/stats", {})),
+    ("GET", "/api/diagnostics/pool"): (0, lambda d: ("/api/diagnostics/pool", {})),
+    ("GET", "/api/diagnostics/cache"): (0, lambda d: ("/api/diagnostics/cache", {})),
+    ("GET", "/api/diagnostics/relationship-index"): (0, lambda d: ("/api/diagnostics/relationship-index", {})),
+    ("GET", "/metrics"): (0, lambda d: ("/metrics", {})),
+    ("GET", "/api/diagnostics/sqlite"): (6, lambda d: ("/api/diagnostics/sqlite", {})),
+    ("GET", "/api/contacts/{contact_id}/relationships"): (
+        2, lambda d: (f"/api/contacts/{d['person']}/relationships", {})
+    ),
+    ("GET", "/api/contacts/{contact_id}/connected"): (
+        3, lambda d: (f"/api/contacts/{d['estate']}/connected", {})
+    ),
+    ("GET", "/api/contacts/{contact_id}/network"): (
+        3, lambda d: (f"/api/contacts/{d['person']}/network?depth=3", {})
+    ),
+    ("GET", "/api/campaigns"): (2, lambda d: ("/api/campaigns", {})),
+    ("POST", "/api/campaigns"): (2, lambda d: ("/api/campaigns", {"json": {
+        "name": "Spring", "channel": "email", "send_date": "2024-03-01", "status": "draft"
+    }})),
+    ("DELETE", "/api/campaigns/{campaign_id}"): (3, lambda d: (f"/api/campaigns/{d['campaign']}", {})),
+    ("GET", "/api/campaigns/overview"): (2, lambda d: ("/api/campaigns/overview", {})),
+    ("GET", "/api/campaigns/{campaign_id}"): (3, lambda d: (f"/api/campaigns/{d['campaign']}", {})),
+    ("GET", "/api/contacts/export/csv"): (1, lambda d: ("/api/contacts/export/csv", {})),
+    ("GET", "/api/campaigns/{campaign_id}/contacts"): (
+        4, lambda d: (f"/api/campaigns/{d['campaign']}/contacts", {})
+    ),
+    ("GET", "/api/campaigns/contacts/filter"): (3, lambda d: ("/api/campaigns/contacts/filter", {})),
+    ("POST", "/api/campaigns/{campaign_id}/enroll"): (
+        3, lambda d: (f"/api/campaigns/{d['campaign']}/enroll", {"json": {"contact_type": "individual"}})
+    ),
+    ("POST", "/api/campaign-contacts/bulk-responses"): (
+        5, lambda d: ("/api/campaign-contacts/bulk-responses", {"json": {
+            "campaign_id": d["campaign"],
+            "updates": [
+                {"contact_id": person, "response_status": "responded", "response_date": "2024-03-01"}
+                if person % 2 else
+                {"email": f"PERSON{person}@example.com", "response_status": "converted"}
+                for person in d["people"]
+            ],
+        }})
+    ),
+    ("GET", "/api/organisations"): (2, lambda d: ("/api/organisations", {})),
+    ("GET", "/api/organisations/{org_id}"): (3, lambda d: (f"/api/organisations/{d['business']}", {})),
+    ("POST", "/api/relationships"): (5, lambda d: ("/api/relationships", {"json": {
+        "from_contact_id": d["people"][1], "to_contact_id": d["estate"], "relationship_type": "member_of"
+    }})),
+    ("DELETE", "/api/relationships/{relationship_id}"): (
+        2, lambda d: (f"/api/relationships/{d['relationship']}", {})
+    ),
+    ("GET", "/api/contacts/{contact_id}/organisations"): (
+        3, lambda d: (f"/api/contacts/{d['person']}/organisations", {})
+    ),
+    ("POST", "/api/contacts/import"): (1, lambda d: ("/api/contacts/import", {
+        "json": [_contact(f"Imported{n}") for n in range(25 * d["scale"])]
+    })),
+    ("GET", "/api/products"): (3, lambda d: ("/api/products", {})),
+    ("POST", "/api/products"): (2, lambda d: ("/api/products", {"json": {"name": "Pensions Review"}})),
+    ("GET", "/api/products/{product_id}"): (3, lambda d: (f"/api/products/{d['product']}", {})),
+    ("GET", "/api/contacts/{contact_id}/products"): (
+        3, lambda d: (f"/api/contacts/{d['person']}/products", {})
+    ),
+    ("POST", "/api/customer-products"): (5, lambda d: ("/api/customer-products", {"json": {
+        "contact_id": d["business"], "product_id": d["product"], "start_date": "2024-03-01"
+    }})),
+    ("PUT", "/api/customer-products/{customer_product_id}"): (
+        3, lambda d: (f"/api/customer-products/{d['customer_product']}", {"json": {"status": "ended"}})
+    ),
+    ("DELETE", "/api/customer-products/{customer_product_id}"): (
+        2, lambda d: (f"/api/customer-products/{d['customer_product']}", {})
+    ),
+    ("POST", "/api/segments/count"): (1, lambda d: ("/api/segments/count", {"json": {"filter": SEGMENT_FILTER}})),
+    ("POST", "/api/segments/contacts"): (
+        1, lambda d: ("/api/segments/contacts", {"json": {"filter": SEGMENT_FILTER}})
+    ),
+    ("GET", "/api/segments"): (3, lambda d: ("/api/segments", {})),
+    ("POST", "/api/segments"): (2, lambda d: ("/api/segments", {"json": {
+        "name": "Tax clients", "filter": {"product": {"id": d["product"]}}
+    }})),
+    ("GET", "/api/segments/{segment_id}"): (3, lambda d: (f"/api/segments/{d['segment']}", {})),
+    ("GET", "/api/segments/{segment_id}/contacts"): (
+        3, lambda d: (f"/api/segments/{d['segment']}/contacts", {})
+    ),
+    ("PUT", "/api/segments/{segment_id}"): (3, lambda d: (f"/api/segments/{d['segment']}", {"json": {
+        "name": "Individuals", "filter": {"field": "contact_type", "op": "eq", "value": "individual"}
+    }})),
+    ("DELETE", "/api/segments/{segment_id}"): (2, lambda d: (f"/api/segments/{d['segment']}", {})),
+}
+
+def api_routes():
+    return sorted(
+        (method, route.path)
+        for route in main.app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    )
+
+def count_statements(client, method: str, route: str, scale: int):
+    """(statements, response) for one request against a freshly seeded dataset"""
+    _, build_request = QUERY_BUDGETS[(method, route)]
+    path, kwargs = build_request(seed(scale))
+    with StatementCounter() as counter:
+        response = client.request(method, path, **kwargs)
+    return counter, response
+
+def test_every_route_has_a_budget():
+    assert api_routes() == sorted(QUERY_BUDGETS)
+
+@pytest.mark.parametrize("method,route", sorted(QUERY_BUDGETS), ids=lambda value: value)
+def test_query_budget(client, method, route):
+    budget, _ = QUERY_BUDGETS[(method, route)]
+    counts = {}
+    for scale in SCALES:
+        counter, response = count_statements(client, method, route, scale)
+        assert response.status_code < 400, response.text
+        assert counter.count <= budget, (
+            f"{method} {route} ran {counter.count} statements at scale {scale}, budget is {budget}:\n"
+            + "\n".join(counter.statements)
+        )
+        counts[scale] = counter.count
+
+    small, large = counts[SCALES[0]], counts[SCALES[-1]]
+    assert large <= small, (
+        f"{method} {route} ran {small} statements at scale {SCALES[0]} "
+        f"and {large} at scale {SCALES[-1]}; the query count grows with the data"
+    )
@@ -0,0 +1,67 @@
+"""
+RelationshipIndex patches and compaction
+
+Compaction rebuilds the arrays without holding the lock, so lookups and
+patches made while it runs must neither wait for it nor be lost.
+"""
+import random
+import threading
+
+from relationship_index import RelationshipIndex
+
+def _edges(index):
+    """{relationship id: (from, to, type)} as the index sees them"""
+    contacts = {c for slot in range(len(index._ids)) for c in (index._from[slot], index._to[slot])}
+    contacts |= {c for edge in index._extra.values() for c in edge[:2]}
+    return {rel_id: (source, target, rel_type) for rel_id, source, target, rel_type in index.edges_between(contacts)}
+
+def test_random_patches_match_a_reference():
+    rng = random.Random(7)
+    index = RelationshipIndex(compact_ratio=0.01)
+    reference = {rel_id: (rng.randrange(200), rng.randrange(200), rng.choice("abc")) for rel_id in range(1, 3000)}
+    index.load((rel_id, *edge) for rel_id, edge in reference.items())
+
+    next_id = 3000
+    for _ in range(6000):
+        if reference and rng.random() < 0.5:
+            rel_id = rng.choice(list(reference))
+            del reference[rel_id]
+            index.remove(rel_id)
+        else:
+            reference[next_id] = (rng.randrange(200), rng.randrange(200), rng.choice("abc"))
+            index.add(next_id, *reference[next_id])
+            next_id += 1
+
+    assert index.stats()["overlay_added"] < 6000  # compactions ran
+    assert _edges(index) == reference
+
+def test_lookups_and_patches_during_compaction():
+    index = RelationshipIndex()
+    index.load((rel_id, rel_id % 50, 50 + rel_id % 50, "member_of") for rel_id in range(1, 2001))
+    arrays = index._arrays
+    seen = {}
+
+    def build_with_concurrent_calls(edges):
+        # Runs on the compacting thread; would deadlock if the lock were held
+        if edges and "lookup" not in seen:
+            seen["lookup"] = index.component(1)
+            index.add(99999, 1, 2, "works_for")
+            index.remove(1)
+        return arrays(edges)
+
+    index._arrays = build_with_concurrent_calls
+
+    def write():
+        for rel_id in range(1, 1101):
+            index.remove(rel_id + 900) if rel_id % 2 else index.add(10000 + rel_id, 3, 4, "manages")
+
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    writer.join(timeout=10)
+    assert not writer.is_alive(), "compaction blocked a lookup or patch"
+
+    assert "lookup" in seen
+    stats = index.stats()
+    assert not stats["compacting"] and stats["overlay_added"] + stats["overlay_removed"] < 1100
+    outgoing = {rel_id for rel_id, source, _, _ in index.edges_between(range(100)) if source == 1}
+    assert 99999 in outgoing and 1 not in outgoing
@@ -0,0 +1,168 @@
+"""
+Segment filters against the scale-1 seed
+
+People 1-10 are individuals, 11-12 businesses and 13-14 estates. Person n
+works for business 11 + (n - 1) % 2 and belongs to estate 13 + (n - 1) % 2;
+person 1 is linked to every organisation. Every person holds product 1 and
+those with even ids (and person 1) product 2. Every person is enrolled in
+both campaigns with the status RESPONSE_STATUSES[(n - 1) % 4], so people
+1, 5 and 9 are pending and 2, 6 and 10 responded.
+"""
+import pytest
+
+import segments
+from conftest import SEGMENT_FILTER, seed
+
+PEOPLE = list(range(1, 11))
+BUSINESSES = [11, 12]
+ESTATES = [13, 14]
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded(client):
+    seed(1)
+
+def _matches(client, segment_filter):
+    """Ids matched by a filter, checking count mode agrees with list mode"""
+    response = client.post("/api/segments/contacts", params={"limit": 1000, "fields": "id"},
+                           json={"filter": segment_filter})
+    assert response.status_code == 200, response.text
+    ids = [contact["id"] for contact in response.json()]
+    assert client.post("/api/segments/count", json={"filter": segment_filter}).json() == {"count": len(ids)}
+    return ids
+
+def _field(field, op, value=None):
+    condition = {"field": field, "op": op}
+    if value is not None:
+        condition["value"] = value
+    return condition
+
+@pytest.mark.parametrize("segment_filter,expected", [
+    (_field("contact_type", "eq", "estate"), ESTATES),
+    (_field("contact_type", "in", ["business", "estate"]), BUSINESSES + ESTATES),
+    (_field("contact_type", "not_in", ["individual"]), BUSINESSES + ESTATES),
+    (_field("full_name", "contains", "LTD"), BUSINESSES),
+    (_field("full_name", "starts_with", "estate of"), ESTATES),
+    (_field("phone", "is_null"), BUSINESSES + ESTATES),
+    (_field("email", "not_null"), PEOPLE + BUSINESSES),
+    (_field("id", "lte", 3), [1, 2, 3]),
+    (_field("id", "gt", 12), ESTATES),
+])
+def test_field_conditions(client, segment_filter, expected):
+    assert _matches(client, segment_filter) == expected
+
+def test_combinators(client):
+    business_or_estate = {"or": [_field("contact_type", "eq", "business"), _field("contact_type", "eq", "estate")]}
+    assert _matches(client, business_or_estate) == BUSINESSES + ESTATES
+    assert _matches(client, {"not": business_or_estate}) == PEOPLE
+    assert _matches(client, {"and": [_field("id", "gt", 2), _field("id", "lt", 5)]}) == [3, 4]
+    assert _matches(client, {"and": [business_or_estate, {"not": _field("id", "eq", 11)}]}) == [12] + ESTATES
+
+def test_related(client):
+    in_estate_14 = {"related": {"type": "member_of", "direction": "outgoing", "where": _field("id", "eq", 14)}}
+    assert _matches(client, in_estate_14) == [1, 2, 4, 6, 8, 10]
+
+    # Business 12 is linked from its staff and from person 1, who manages it
+    linked_to_12 = {"related": {"direction": "any", "where": _field("id", "eq", 12)}}
+    assert _matches(client, linked_to_12) == [1, 2, 4, 6, 8, 10]
+
+    employers = {"related": {"type": "works_for", "direction": "incoming"}}
+    assert _matches(client, employers) == BUSINESSES
+
+    # Nested: people linked to something that is itself linked to person 3
+    colleagues_of_3 = {"related": {"direction": "outgoing", "where": {
+        "related": {"direction": "incoming", "where": _field("id", "eq", 3)}
+    }}}
+    assert _matches(client, colleagues_of_3) == [1, 3, 5, 7, 9]
+
+def test_product(client):
+    assert _matches(client, {"product": {"id": 2}}) == [1, 2, 4, 6, 8, 10]
+    assert _matches(client, {"product": {"name": ["Product 1"]}}) == PEOPLE
+    assert _matches(client, {"product": {"product_type": "Service", "status": "ended"}}) == []
+    assert _matches(client, {"not": {"product": {"id": 2}}}) == [3, 5, 7, 9] + BUSINESSES + ESTATES
+
+def test_campaign(client):
+    assert _matches(client, {"campaign": {"last": 1, "status": "pending"}}) == [1, 5, 9]
+    assert _matches(client, {"campaign": {"id": [1, 2], "status": ["responded", "converted"]}}) == [2, 3, 6, 7, 10]
+    assert _matches(client, {"campaign": {"id": 99}}) == []
+
+def test_example_segment(client):
+    # Individuals linked to an estate, holding a Service product, who did
+    # not respond to the last two campaigns
+    assert _matches(client, SEGMENT_FILTER) == [1, 4, 5, 8, 9]
+
+def test_list_mode_pages(client):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, "sort": "-id", **({"cursor": cursor} if cursor else {})}
+        response = client.post("/api/segments/contacts", params=params, json={"filter": SEGMENT_FILTER})
+        pages.append([contact["id"] for contact in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert pages == [[9, 8], [5, 4], [1]]
+
+def _nested(depth):
+    node = _field("id", "eq", 1)
+    for _ in range(depth):
+        node = {"not": node}
+    return node
+
+@pytest.mark.parametrize("segment_filter,message", [
+    ({"not": "individual"}, "filter.not: expected an object with one condition"),
+    ({"and": [], "or": []}, "filter: expected an object with one condition"),
+    ({"and": []}, "filter.and: expected a non-empty list"),
+    ({"xor": [_field("id", "eq", 1)]}, "filter: unknown condition 'xor'"),
+    (_field("password", "eq", "x"), "filter: unknown field 'password'"),
+    (_field("id", "like", "1%"), "filter: unknown op 'like'"),
+    ({"field": "id", "op": "eq"}, "filter: op 'eq' needs a value"),
+    (_field("id", "eq", [1]), "filter: op 'eq' needs a single string or number"),
+    (_field("id", "eq", True), "filter: op 'eq' needs a single string or number"),
+    (_field("id", "in", [1, {"a": 1}]), "filter.value[1]: expected a string or number"),
+    (_field("id", "in", [2 ** 70]), "filter.value[0]: expected a string or number"),
+    (_field("full_name", "contains", 5), "filter: op 'contains' needs a string"),
+    ({"not": {"related": {"direction": "sideways"}}}, "filter.not.related.direction: expected one of"),
+    ({"related": {"where": _field("nope", "eq", 1)}}, "filter.related.where: unknown field 'nope'"),
+    ({"product": {"sku": "A1"}}, "filter.product: unknown keys sku"),
+    ({"product": {"id": "1"}}, "filter.product.id: expected an id or a non-empty list of ids"),
+    ({"campaign": {"last": 0}}, "filter.campaign.last: expected a number from 1 to"),
+    ({"campaign": {"last": True}}, "filter.campaign.last: expected a number from 1 to"),
+    ({"campaign": {"status": []}}, "filter.campaign.status: expected a string or a non-empty list of strings"),
+    (_nested(segments.MAX_DEPTH + 1), f"filter{'.not' * (segments.MAX_DEPTH + 1)}: filters nest at most {segments.MAX_DEPTH} deep"),
+    ({"or": [_field("id", "eq", n) for n in range(segments.MAX_CONDITIONS)]},
+     f"filter: at most {segments.MAX_CONDITIONS} conditions are allowed"),
+])
+def test_invalid_filters_are_rejected(client, segment_filter, message):
+    for path in ("/api/segments/count", "/api/segments/contacts"):
+        response = client.post(path, json={"filter": segment_filter})
+        assert response.status_code == 400, response.text
+        assert response.json()["detail"].startswith(message)
+
+    response = client.post("/api/segments", json={"name": "Invalid", "filter": segment_filter})
+    assert response.status_code == 400, response.text
+    assert all(segment["name"] != "Invalid" for segment in client.get("/api/segments").json())
+
+def test_limits_allow_filters_just_inside_them(client):
+    assert _matches(client, _nested(segments.MAX_DEPTH)) == [1]
+    assert _matches(client, {"or": [_field("id", "eq", n) for n in range(1, segments.MAX_CONDITIONS)]}) == (
+        PEOPLE + BUSINESSES + ESTATES
+    )
+
+def test_saved_segment(client):
+    created = client.post("/api/segments", json={"name": "Product 2 holders", "filter": {"product": {"id": 2}}})
+    assert created.status_code == 200, created.text
+    segment_id = created.json()["id"]
+
+    assert client.get(f"/api/segments/{segment_id}").json()["count"] == 6
+    contacts = client.get(f"/api/segments/{segment_id}/contacts", params={"fields": "id"}).json()
+    assert [contact["id"] for contact in contacts] == [1, 2, 4, 6, 8, 10]
+
+    # The cached count follows writes to the tables the filter reads
+    client.post("/api/customer-products", json={"contact_id": 3, "product_id": 2, "start_date": "2024-06-01"})
+    assert client.get(f"/api/segments/{segment_id}").json()["count"] == 7
+
+    updated = client.put(f"/api/segments/{segment_id}", json={"name": "Estates", "filter": _field("contact_type", "eq", "estate")})
+    assert updated.json()["filter"] == _field("contact_type", "eq", "estate")
+    assert client.get(f"/api/segments/{segment_id}").json()["count"] == 2
+
+    assert client.delete(f"/api/segments/{segment_id}").status_code == 200
+    assert client.get(f"/api/segments/{segment_id}").status_code == 404
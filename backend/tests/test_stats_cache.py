@@ -0,0 +1,27 @@
+"""
+The /api/stats cache never keeps a result computed before a write
+"""
+import main
+from conftest import seed
+
+def test_result_racing_a_write_is_not_cached(client, monkeypatch):
+    seed(1)
+    main.invalidate_stats_cache()
+    compute_stats = main.compute_stats
+
+    async def racing_write(db):
+        # A contact write commits after the counts were read
+        stats = await compute_stats(db)
+        main.invalidate_stats_cache()
+        return stats
+
+    monkeypatch.setattr(main, "compute_stats", racing_write)
+    assert client.get("/api/stats").status_code == 200
+    assert main._stats_cache["value"] is None
+
+    monkeypatch.setattr(main, "compute_stats", compute_stats)
+    before = client.get("/api/stats").json()["total_contacts"]
+    assert main._stats_cache["value"] is not None
+
+    client.post("/api/contacts", json={"full_name": "Stats Check", "contact_type": "individual"})
+    assert client.get("/api/stats").json()["total_contacts"] == before + 1
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import ContactList from './components/ContactList'
 import ContactForm from './components/ContactForm'
 import Dashboard from './components/Dashboard'
@@ -19,21 +19,55 @@ export interface Contact {
 
 function App() {
   const [contacts, setContacts] = useState<Contact[]>([])
+  const [contactSearch, setContactSearch] = useState('')
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  // Aborted when the search changes, so a slow reply for an older search
+  // can't replace or extend the list shown for the current one
+  const contactsRequest = useRef<AbortController | null>(null)
   const [editingContact, setEditingContact] = useState<Contact | null>(null)
   const [showForm, setShowForm] = useState(false)
   const [activeTab, setActiveTab] = useState<'dashboard' | 'contacts' | 'campaigns' | 'organisations' | 'products'>('dashboard')
 
   useEffect(() => {
-    fetchContacts()
-  }, [])
+    contactsRequest.current?.abort()
+    setNextCursor(null)
+    // Debounce so typing in the search box doesn't fire a request per keystroke
+    const debounce = setTimeout(fetchContacts, contactSearch ? 300 : 0)
+    return () => clearTimeout(debounce)
+  }, [contactSearch])
+
+  const contactsUrl = (cursor?: string) => {
+    const params = new URLSearchParams({ sort: 'full_name', limit: '100' })
+    if (contactSearch.trim()) params.set('q', contactSearch.trim())
+    if (cursor) params.set('cursor', cursor)
+    return `http://localhost:8000/api/contacts?${params}`
+  }
 
   const fetchContacts = async () => {
+    contactsRequest.current?.abort()
+    const controller = new AbortController()
+    contactsRequest.current = controller
     try {
-      const response = await fetch('http://localhost:8000/api/contacts')
+      const response = await fetch(contactsUrl(), { signal: controller.signal })
       const data = await response.json()
       setContacts(data)
+      setNextCursor(response.headers.get('X-Next-Cursor'))
     } catch (error) {
-      console.error('Error fetching contacts:', error)
+      if (!controller.signal.aborted) console.error('Error fetching contacts:', error)
+    }
+  }
+
+  const loadMoreContacts = async () => {
+    const controller = contactsRequest.current
+    if (!nextCursor || !controller) return
+    try {
+      // Shares the first page's signal, so a new search cancels it too
+      const response = await fetch(contactsUrl(nextCursor), { signal: controller.signal })
+      const data = await response.json()
+      setContacts(current => [...current, ...data])
+      setNextCursor(response.headers.get('X-Next-Cursor'))
+    } catch (error) {
+      if (!controller.signal.aborted) console.error('Error fetching contacts:', error)
     }
   }
 
@@ -48,11 +82,22 @@ function App() {
         })
       } else {
         // Create new contact
-        await fetch('http://localhost:8000/api/contacts', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(contact),
-        })
+        const createContact = (allowDuplicate: boolean) =>
+          fetch(`http://localhost:8000/api/contacts${allowDuplicate ? '?allow_duplicate=true' : ''}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(contact),
+          })
+        const response = await createContact(false)
+        if (response.status === 400) {
+          // The backend refuses likely duplicates unless told to go ahead
+          const { detail } = await response.json()
+          const names = (detail.duplicates || []).map((d: { full_name: string }) => d.full_name).join(', ')
+          if (!window.confirm(`This looks like a duplicate of ${names}. Create it anyway?`)) {
+            return
+          }
+          await createContact(true)
+        }
       }
       fetchContacts()
       setShowForm(false)
@@ -183,6 +228,10 @@ function App() {
             ) : (
               <ContactList
                 contacts={contacts}
+                searchQuery={contactSearch}
+                onSearchChange={setContactSearch}
+                hasMore={nextCursor !== null}
+                onLoadMore={loadMoreContacts}
                 onEdit={handleEditContact}
                 onDelete={handleDeleteContact}
                 onNew={handleNewContact}
@@ -0,0 +1,19 @@
+// List endpoints return one page at a time and put the cursor for the next
+// page in the X-Next-Cursor header. Screens that need the whole list (pickers,
+// client-side filtering) follow it with fetchAllPages rather than reading
+// just the first page.
+export async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    const pageUrl = new URL(url)
+    if (!pageUrl.searchParams.has('limit')) pageUrl.searchParams.set('limit', '1000')
+    if (cursor) pageUrl.searchParams.set('cursor', cursor)
+
+    const response = await fetch(pageUrl)
+    if (!response.ok) throw new Error(`${response.status} fetching ${url}`)
+    items.push(...(await response.json()))
+    cursor = response.headers.get('X-Next-Cursor')
+  } while (cursor)
+  return items
+}
@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { fetchAllPages } from '../api'
 
 interface Campaign {
   id: number
@@ -53,9 +54,7 @@ export default function CampaignOverview({ onBack }: CampaignOverviewProps) {
 
   const fetchCampaigns = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/campaigns')
-      const data = await response.json()
-      setCampaigns(data)
+      setCampaigns(await fetchAllPages<Campaign>('http://localhost:8000/api/campaigns'))
       setLoading(false)
     } catch (error) {
       console.error('Error fetching campaigns:', error)
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import CampaignContactList from './CampaignContactList'
 import CampaignOverview from './CampaignOverview'
+import { fetchAllPages } from '../api'
 
 interface Campaign {
   id: number
@@ -38,9 +39,7 @@ export default function Campaigns() {
 
   const fetchCampaigns = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/campaigns')
-      const data = await response.json()
-      setCampaigns(data)
+      setCampaigns(await fetchAllPages<Campaign>('http://localhost:8000/api/campaigns'))
       setLoading(false)
     } catch (error) {
       console.error('Error fetching campaigns:', error)
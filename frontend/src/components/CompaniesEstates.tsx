@@ -13,25 +13,32 @@ interface Organisation {
 
 export default function CompaniesEstates() {
   const [organisations, setOrganisations] = useState<Organisation[]>([])
-  const [filteredOrganisations, setFilteredOrganisations] = useState<Organisation[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [selectedOrg, setSelectedOrg] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
   const [searchTerm, setSearchTerm] = useState('')
   const [typeFilter, setTypeFilter] = useState<'all' | 'business' | 'estate'>('all')
 
   useEffect(() => {
-    fetchOrganisations()
-  }, [])
-
-  useEffect(() => {
-    filterOrganisations()
-  }, [organisations, searchTerm, typeFilter])
+    // Debounce so typing in the search box doesn't fire a request per keystroke
+    const debounce = setTimeout(fetchOrganisations, searchTerm ? 300 : 0)
+    return () => clearTimeout(debounce)
+  }, [searchTerm, typeFilter])
+
+  const organisationsUrl = (cursor?: string) => {
+    const params = new URLSearchParams({ sort: 'full_name', limit: '100' })
+    if (typeFilter !== 'all') params.set('contact_type', typeFilter)
+    if (searchTerm.trim()) params.set('q', searchTerm.trim())
+    if (cursor) params.set('cursor', cursor)
+    return `http://localhost:8000/api/organisations?${params}`
+  }
 
   const fetchOrganisations = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/organisations')
+      const response = await fetch(organisationsUrl())
       const data = await response.json()
       setOrganisations(data)
+      setNextCursor(response.headers.get('X-Next-Cursor'))
       setLoading(false)
     } catch (error) {
       console.error('Error fetching organisations:', error)
@@ -39,22 +46,16 @@ export default function CompaniesEstates() {
     }
   }
 
-  const filterOrganisations = () => {
-    let filtered = organisations
-
-    if (typeFilter !== 'all') {
-      filtered = filtered.filter(org => org.contact_type === typeFilter)
-    }
-
-    if (searchTerm) {
-      const search = searchTerm.toLowerCase()
-      filtered = filtered.filter(org =>
-        org.full_name.toLowerCase().includes(search) ||
-        (org.email && org.email.toLowerCase().includes(search))
-      )
+  const loadMoreOrganisations = async () => {
+    if (!nextCursor) return
+    try {
+      const response = await fetch(organisationsUrl(nextCursor))
+      const data = await response.json()
+      setOrganisations(current => [...current, ...data])
+      setNextCursor(response.headers.get('X-Next-Cursor'))
+    } catch (error) {
+      console.error('Error fetching organisations:', error)
     }
-
-    setFilteredOrganisations(filtered)
   }
 
   const handleViewOrganisation = (orgId: number) => {
@@ -98,7 +99,7 @@ export default function CompaniesEstates() {
                 type="text"
                 id="search"
                 className="block w-full pl-10 pr-3 py-2 border border-gray-300 rounded-md leading-5 bg-white placeholder-gray-500 focus:outline-none focus:placeholder-gray-400 focus:ring-1 focus:ring-blue-500 focus:border-blue-500 sm:text-sm"
-                placeholder="Search by name or email"
+                placeholder="Search by name, email, or notes"
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
               />
@@ -140,7 +141,7 @@ export default function CompaniesEstates() {
       </div>
 
       {/* Organisation List */}
-      {filteredOrganisations.length === 0 ? (
+      {organisations.length === 0 ? (
         <div className="text-center py-12 bg-white rounded-lg border-2 border-dashed border-gray-300">
           <h3 className="mt-2 text-sm font-semibold text-gray-900">No organisations found</h3>
           <p className="mt-1 text-sm text-gray-500">
@@ -172,7 +173,7 @@ export default function CompaniesEstates() {
               </tr>
             </thead>
             <tbody className="bg-white divide-y divide-gray-200">
-              {filteredOrganisations.map((org) => (
+              {organisations.map((org) => (
                 <tr key={org.id} className="hover:bg-gray-50">
                   <td className="px-6 py-4 whitespace-nowrap">
                     <div className="text-sm font-medium text-gray-900">{org.full_name}</div>
@@ -207,10 +208,18 @@ export default function CompaniesEstates() {
               ))}
             </tbody>
           </table>
-          <div className="px-6 py-4 bg-gray-50 border-t border-gray-200">
+          <div className="px-6 py-4 bg-gray-50 border-t border-gray-200 flex items-center justify-between">
             <p className="text-sm text-gray-700">
-              Showing {filteredOrganisations.length} {filteredOrganisations.length === 1 ? 'organisation' : 'organisations'}
+              Showing {organisations.length} {organisations.length === 1 ? 'organisation' : 'organisations'}
             </p>
+            {nextCursor && (
+              <button
+                onClick={loadMoreOrganisations}
+                className="px-4 py-2 border border-gray-300 rounded-md shadow-sm text-sm font-medium text-gray-700 bg-white hover:bg-gray-50"
+              >
+                Load more
+              </button>
+            )}
           </div>
         </div>
       )}
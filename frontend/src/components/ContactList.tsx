@@ -1,16 +1,26 @@
-import { useState } from 'react'
 import { Contact } from '../App'
 
 interface ContactListProps {
   contacts: Contact[]
+  searchQuery: string
+  onSearchChange: (query: string) => void
+  hasMore: boolean
+  onLoadMore: () => void
   onEdit: (contact: Contact) => void
   onDelete: (id: number) => void
   onNew: () => void
 }
 
-export default function ContactList({ contacts, onEdit, onDelete, onNew }: ContactListProps) {
-  const [searchQuery, setSearchQuery] = useState('')
-
+export default function ContactList({
+  contacts,
+  searchQuery,
+  onSearchChange,
+  hasMore,
+  onLoadMore,
+  onEdit,
+  onDelete,
+  onNew,
+}: ContactListProps) {
   const getContactTypeBadge = (type: string) => {
     const colors = {
       individual: 'bg-blue-100 text-blue-800',
@@ -20,20 +30,6 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
     return colors[type as keyof typeof colors] || 'bg-gray-100 text-gray-800'
   }
 
-  // Filter contacts based on search query
-  const filteredContacts = contacts.filter(contact => {
-    if (!searchQuery) return true
-
-    const query = searchQuery.toLowerCase()
-    return (
-      contact.full_name.toLowerCase().includes(query) ||
-      (contact.email && contact.email.toLowerCase().includes(query)) ||
-      (contact.phone && contact.phone.toLowerCase().includes(query)) ||
-      (contact.company_name && contact.company_name.toLowerCase().includes(query)) ||
-      contact.contact_type.toLowerCase().includes(query)
-    )
-  })
-
   return (
     <div>
       <div className="sm:flex sm:items-center mb-6">
@@ -67,8 +63,8 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
           <input
             type="text"
             value={searchQuery}
-            onChange={(e) => setSearchQuery(e.target.value)}
-            placeholder="Search contacts by name, email, phone, or company..."
+            onChange={(e) => onSearchChange(e.target.value)}
+            placeholder="Search contacts by name, email, company, or notes..."
             className="w-full px-4 py-2 pl-10 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
           />
           <svg
@@ -86,7 +82,7 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
           </svg>
           {searchQuery && (
             <button
-              onClick={() => setSearchQuery('')}
+              onClick={() => onSearchChange('')}
               className="absolute right-3 top-2.5 text-gray-400 hover:text-gray-600"
             >
               <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
@@ -97,12 +93,12 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
         </div>
         {searchQuery && (
           <p className="mt-2 text-sm text-gray-600">
-            Found {filteredContacts.length} contact{filteredContacts.length !== 1 ? 's' : ''} matching "{searchQuery}"
+            Found {contacts.length}{hasMore ? '+' : ''} contact{contacts.length !== 1 ? 's' : ''} matching "{searchQuery}"
           </p>
         )}
       </div>
 
-      {contacts.length === 0 ? (
+      {contacts.length === 0 && !searchQuery ? (
         <div className="text-center py-12 bg-white rounded-lg border-2 border-dashed border-gray-300">
           <svg
             className="mx-auto h-12 w-12 text-gray-400"
@@ -133,7 +129,7 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
             </button>
           </div>
         </div>
-      ) : filteredContacts.length === 0 ? (
+      ) : contacts.length === 0 ? (
         <div className="text-center py-12 bg-white rounded-lg border border-gray-300">
           <svg
             className="mx-auto h-12 w-12 text-gray-400"
@@ -153,7 +149,7 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
             Try adjusting your search to find what you're looking for.
           </p>
           <button
-            onClick={() => setSearchQuery('')}
+            onClick={() => onSearchChange('')}
             className="mt-4 inline-flex items-center px-4 py-2 border border-gray-300 rounded-md shadow-sm text-sm font-medium text-gray-700 bg-white hover:bg-gray-50"
           >
             Clear search
@@ -182,7 +178,7 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
               </tr>
             </thead>
             <tbody className="divide-y divide-gray-200">
-              {filteredContacts.map((contact) => (
+              {contacts.map((contact) => (
                 <tr key={contact.id}>
                   <td className="whitespace-nowrap py-4 pl-4 pr-3 text-sm sm:pl-6">
                     <div className="font-medium text-gray-900">{contact.full_name}</div>
@@ -223,6 +219,16 @@ export default function ContactList({ contacts, onEdit, onDelete, onNew }: Conta
               ))}
             </tbody>
           </table>
+          {hasMore && (
+            <div className="px-4 py-3 border-t border-gray-200 text-center">
+              <button
+                onClick={onLoadMore}
+                className="inline-flex items-center px-4 py-2 border border-gray-300 rounded-md shadow-sm text-sm font-medium text-gray-700 bg-white hover:bg-gray-50"
+              >
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
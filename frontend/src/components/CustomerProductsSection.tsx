@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { fetchAllPages } from '../api'
 
 interface CustomerProduct {
   customer_product_id: number
@@ -52,14 +53,13 @@ export default function CustomerProductsSection({ contactId }: CustomerProductsS
 
   const fetchAvailableProducts = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/products?status=active')
-      const data = await response.json()
+      const data = await fetchAllPages<Product>('http://localhost:8000/api/products?status=active')
 
       // Filter out products already assigned to this customer
       const assignedProductIds = customerProducts
         .filter(cp => cp.status === 'active')
         .map(cp => cp.product_id)
-      const available = data.filter((p: Product) => !assignedProductIds.includes(p.id))
+      const available = data.filter(p => !assignedProductIds.includes(p.id))
 
       setAvailableProducts(available)
     } catch (error) {
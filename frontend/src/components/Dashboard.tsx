@@ -23,8 +23,11 @@ export default function Dashboard({ contacts, onNavigate }: DashboardProps) {
     by_type: { individual: 0, business: 0, estate: 0 },
   })
 
+  const [recentContacts, setRecentContacts] = useState<Contact[]>([])
+
   useEffect(() => {
     fetchStats()
+    fetchRecentContacts()
   }, [contacts])
 
   const fetchStats = async () => {
@@ -37,7 +40,15 @@ export default function Dashboard({ contacts, onNavigate }: DashboardProps) {
     }
   }
 
-  const recentContacts = contacts.slice(-5).reverse()
+  const fetchRecentContacts = async () => {
+    try {
+      const response = await fetch('http://localhost:8000/api/contacts?sort=-id&limit=5')
+      const data = await response.json()
+      setRecentContacts(data)
+    } catch (error) {
+      console.error('Error fetching recent contacts:', error)
+    }
+  }
 
   return (
     <div>
@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react'
 import CustomerProductsSection from './CustomerProductsSection'
+import { fetchAllPages } from '../api'
 
 interface LinkedPerson {
   relationship_id: number
@@ -60,16 +61,14 @@ export default function OrganisationDetail({ orgId, onBack }: OrganisationDetail
 
   const fetchAvailableContacts = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/contacts')
-      const data = await response.json()
+      const data = await fetchAllPages<Contact>(
+        'http://localhost:8000/api/contacts?contact_type=individual&sort=full_name&limit=1000&fields=full_name,contact_type'
+      )
 
-      // Filter to only individuals not already linked
+      // Filter out people already linked
       const linkedIds = organisation?.linked_people.map(p => p.person_id) || []
       const available = data.filter(
-        (contact: Contact) =>
-          contact.contact_type === 'individual' &&
-          contact.id !== orgId &&
-          !linkedIds.includes(contact.id)
+        contact => contact.id !== orgId && !linkedIds.includes(contact.id)
       )
       setAvailableContacts(available)
     } catch (error) {
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import ProductDetail from './ProductDetail'
 import ProductForm from './ProductForm'
+import { fetchAllPages } from '../api'
 
 interface Product {
   id: number
@@ -39,9 +40,7 @@ export default function ProductList() {
 
   const fetchProducts = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/products')
-      const data = await response.json()
-      setProducts(data)
+      setProducts(await fetchAllPages<Product>('http://localhost:8000/api/products'))
       setLoading(false)
     } catch (error) {
       console.error('Error fetching products:', error)